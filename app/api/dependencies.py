@@ -0,0 +1,41 @@
+from fastapi import Request
+from app.services.agentic.registry import AgentRegistry
+from app.services.batch import BatchScheduler, create_batch_scheduler
+from app.services.jobs import JobManager, create_job_manager
+from app.services.single_flight import SingleFlight
+
+
+def get_agent_registry(request: Request) -> AgentRegistry:
+    """Returns the application-wide AgentRegistry, creating it if startup did not run (e.g. bare TestClient)."""
+    registry = getattr(request.app.state, "agent_registry", None)
+    if registry is None:
+        registry = AgentRegistry()
+        request.app.state.agent_registry = registry
+    return registry
+
+
+def get_job_manager(request: Request) -> JobManager:
+    """Returns the application-wide JobManager, creating it if startup did not run."""
+    manager = getattr(request.app.state, "job_manager", None)
+    if manager is None:
+        manager = create_job_manager()
+        request.app.state.job_manager = manager
+    return manager
+
+
+def get_batch_scheduler(request: Request) -> BatchScheduler:
+    """Returns the application-wide BatchScheduler (limits shared by all batch requests)."""
+    scheduler = getattr(request.app.state, "batch_scheduler", None)
+    if scheduler is None:
+        scheduler = create_batch_scheduler()
+        request.app.state.batch_scheduler = scheduler
+    return scheduler
+
+
+def get_single_flight(request: Request) -> SingleFlight:
+    """Returns the application-wide SingleFlight that coalesces identical concurrent analyses."""
+    flights = getattr(request.app.state, "single_flight", None)
+    if flights is None:
+        flights = SingleFlight()
+        request.app.state.single_flight = flights
+    return flights
@@ -1,9 +1,17 @@
-import os
-from fastapi import APIRouter, UploadFile, File, Form
+import json
+import uuid
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import List
+from app.api.dependencies import get_agent_registry, get_batch_scheduler, get_job_manager, get_single_flight
+from app.core.config import settings
 from app.services.agentic.coordinator_agent import CoordinatorAgent
-from app.models.context import AnalyzeResponse, ClientContext
-import tempfile
+from app.services.agentic.registry import AgentRegistry
+from app.services.batch import BatchInputError, BatchScheduler, collect_batch_items
+from app.services.jobs import JobManager, JobQueueFullError
+from app.services.single_flight import SingleFlight, flight_key
+from app.services.uploads import UploadSpool, UploadTooLargeError
+from app.models.context import AnalyzeResponse, ClientContext, JobStatusResponse
 
 
 router = APIRouter(prefix="/context", tags=["context"])
@@ -13,45 +21,277 @@ async def analyze(
     client_name: str | None = Form(default=None),
     raw_text_blocks: str | None = Form(default=None),  # JSON string or line-separated
     files: List[UploadFile] | None = File(default=None),
-    enrich_allowed: bool = Form(default=False)
+    urls: str | None = Form(default=None),  # JSON list or whitespace-separated; fetched concurrently
+    enrich_allowed: bool = Form(default=False),
+    bypass_cache: bool = Form(default=False),
+    registry: AgentRegistry = Depends(get_agent_registry),
+    flights: SingleFlight = Depends(get_single_flight),
 ):
-    coordinator = CoordinatorAgent()
-    # If files are uploaded, save to temp and run pipeline
+    coordinator = CoordinatorAgent(registry=registry)
+
+    # Identical concurrent submissions (same contents, URLs, enrich_allowed and bypass_cache) share one pipeline run
+    def run_once(key, source):
+        return flights.run(key, lambda: coordinator.run_pipeline(**source, enrich_allowed=enrich_allowed, use_cache=not bypass_cache))
+
+    url_list = _parse_urls(urls)
+    # If files are uploaded, stream them to the spool and run pipeline
     if files:
         if len(files) > 5:
             return {"detail": "You can upload up to 5 files only."}
-        temp_paths = []
-        for f in files:
-            suffix = os.path.splitext(f.filename)[1]
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                tmp.write(await f.read())
-                temp_paths.append(tmp.name)
-        # Process all files together
-        result = await coordinator.run_pipeline(file_paths=temp_paths, enrich_allowed=enrich_allowed)
-        # Clean up temp files
-        for path in temp_paths:
-            os.remove(path)
-        # Convert result to AnalyzeResponse
+        async with UploadSpool() as spool:
+            source = await _spool_inputs(spool, files, None, url_list)
+            # Process all files together; the spool is removed even if the pipeline raises
+            result = await run_once(flight_key(spool.content_key(), url_list, enrich_allowed, bypass_cache), source)
         return _to_analyze_response(result, client_name)
 
-    # If raw text blocks are provided, write to temp txt and run pipeline
+    # If raw text blocks are provided, spool them as a txt file and run pipeline
     if raw_text_blocks:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".txt", mode="w", encoding="utf-8") as tmp:
-            tmp.write(raw_text_blocks)
-            tmp_path = tmp.name
-        result = await coordinator.run_pipeline(file_path=tmp_path, enrich_allowed=enrich_allowed)
-        os.remove(tmp_path)
+        async with UploadSpool() as spool:
+            source = await _spool_inputs(spool, None, raw_text_blocks, url_list)
+            result = await run_once(flight_key(spool.content_key(), url_list, enrich_allowed, bypass_cache), source)
+        return _to_analyze_response(result, client_name)
+
+    # URLs only: nothing to spool
+    if url_list:
+        result = await run_once(flight_key("", url_list, enrich_allowed, bypass_cache), {"urls": url_list})
         return _to_analyze_response(result, client_name)
 
     return {"detail": "No input provided."}
 
 
+@router.post("/analyze/stream")
+async def analyze_stream(
+    client_name: str | None = Form(default=None),
+    raw_text_blocks: str | None = Form(default=None),
+    files: List[UploadFile] | None = File(default=None),
+    urls: str | None = Form(default=None),
+    enrich_allowed: bool = Form(default=False),
+    bypass_cache: bool = Form(default=False),
+    registry: AgentRegistry = Depends(get_agent_registry),
+):
+    """
+    Streaming variant of /analyze: Server-Sent Events for each pipeline stage (with timings and
+    partial results), the Extractor's model tokens as they arrive, and a final `result` event
+    carrying the AnalyzeResponse.
+    """
+    url_list = _parse_urls(urls)
+    if files and len(files) > 5:
+        return {"detail": "You can upload up to 5 files only."}
+    if not files and not raw_text_blocks and not url_list:
+        return {"detail": "No input provided."}
+
+    spool = UploadSpool()
+    source = await _spool_inputs(spool, files, raw_text_blocks, url_list)
+    coordinator = CoordinatorAgent(registry=registry)
+
+    async def events():
+        try:
+            async for event in coordinator.stream_pipeline(
+                **source, enrich_allowed=enrich_allowed, use_cache=not bypass_cache, stream_tokens=True,
+            ):
+                if event["event"] == "result":
+                    response = _to_analyze_response(event, client_name)
+                    event = {"event": "result", "response": response.model_dump(), "timings": event["timings"]}
+                yield _sse(event)
+        except Exception as e:
+            yield _sse({"event": "error", "detail": str(e)})
+        finally:
+            spool.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+def _sse(event: dict) -> str:
+    payload = {k: v for k, v in event.items() if k != "event"}
+    return f"event: {event['event']}\ndata: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/analyze/batch")
+async def analyze_batch(
+    files: List[UploadFile] | None = File(default=None),
+    archive: UploadFile | None = File(default=None),
+    directory: str | None = Form(default=None),
+    enrich_allowed: bool = Form(default=False),
+    bypass_cache: bool = Form(default=False),
+    registry: AgentRegistry = Depends(get_agent_registry),
+    scheduler: BatchScheduler = Depends(get_batch_scheduler),
+):
+    """
+    Analyzes many clients in one request. Items come from multipart `files` (grouped by the
+    folder in each filename, e.g. 'acme/rfp.pdf'), a ZIP `archive` (one item per top-level
+    folder) and/or a server-side `directory` under BATCH_INPUT_ROOT (one item per subfolder).
+    Root-level files are items on their own. Streams NDJSON: one `item` line per client as it
+    finishes (completed with its AnalyzeResponse, or failed with the error), then a `summary` line.
+    """
+    spool = UploadSpool(max_request_bytes=settings.batch_max_request_bytes)
+    try:
+        items = await collect_batch_items(spool, files=files, archive=archive, directory=directory)
+    except UploadTooLargeError as e:
+        spool.close()
+        raise HTTPException(status_code=413, detail=str(e))
+    except BatchInputError as e:
+        spool.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        spool.close()
+        raise
+    coordinator = CoordinatorAgent(registry=registry)
+
+    async def run(item):
+        if len(item["file_paths"]) > settings.batch_max_files_per_item:
+            raise BatchInputError(f"{len(item['file_paths'])} files; the limit per item is {settings.batch_max_files_per_item}.")
+        result = await coordinator.run_pipeline(file_paths=item["file_paths"], enrich_allowed=enrich_allowed, use_cache=not bypass_cache)
+        return _to_analyze_response(result, item["name"]).model_dump()
+
+    async def lines():
+        counts = {"completed": 0, "failed": 0}
+        try:
+            async for outcome in scheduler.run(items, run):
+                counts[outcome["status"]] += 1
+                yield _ndjson({"event": "item", **outcome})
+            yield _ndjson({"event": "summary", "items": len(items), **counts})
+        finally:
+            spool.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+
+def _ndjson(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+@router.post("/jobs", response_model=JobStatusResponse, status_code=202)
+async def submit_job(
+    client_name: str | None = Form(default=None),
+    raw_text_blocks: str | None = Form(default=None),
+    files: List[UploadFile] | None = File(default=None),
+    urls: str | None = Form(default=None),
+    enrich_allowed: bool = Form(default=False),
+    bypass_cache: bool = Form(default=False),
+    registry: AgentRegistry = Depends(get_agent_registry),
+    jobs: JobManager = Depends(get_job_manager),
+    flights: SingleFlight = Depends(get_single_flight),
+):
+    """Queues an analysis and returns its id immediately; poll GET /context/jobs/{analysis_id}."""
+    url_list = _parse_urls(urls)
+    if files and len(files) > 5:
+        raise HTTPException(status_code=400, detail="You can upload up to 5 files only.")
+    if not files and not raw_text_blocks and not url_list:
+        raise HTTPException(status_code=400, detail="No input provided.")
+
+    spool = UploadSpool()
+    source = await _spool_inputs(spool, files, raw_text_blocks, url_list)
+    coordinator = CoordinatorAgent(registry=registry)
+    key = flight_key(spool.content_key(), url_list, enrich_allowed, bypass_cache)
+
+    async def run(job_id):
+        result = await flights.run(key, lambda: coordinator.run_pipeline(**source, enrich_allowed=enrich_allowed, use_cache=not bypass_cache))
+        return _to_analyze_response(result, client_name, analysis_id=job_id).model_dump()
+
+    try:
+        job_id = await jobs.submit(run, on_done=spool.close)
+    except JobQueueFullError as e:
+        spool.close()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return _to_job_response(await jobs.get(job_id))
+
+
+@router.get("/jobs/{analysis_id}", response_model=JobStatusResponse)
+async def get_job(analysis_id: str, jobs: JobManager = Depends(get_job_manager)):
+    job = await jobs.get(analysis_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return _to_job_response(job)
+
+
+@router.delete("/jobs/{analysis_id}", response_model=JobStatusResponse)
+async def cancel_job(analysis_id: str, jobs: JobManager = Depends(get_job_manager)):
+    job = await jobs.cancel(analysis_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return _to_job_response(job)
+
+
+@router.get("/cache/stats")
+async def cache_stats(registry: AgentRegistry = Depends(get_agent_registry)):
+    """Hit/miss counters and size of the pipeline result cache (and of the incremental partials)."""
+    cache = registry.cache
+    if cache is None:
+        return {"enabled": False}
+    partials = registry.partials_cache
+    return {"enabled": True, **cache.stats(), "partials": partials.stats() if partials is not None else None}
+
+
+@router.get("/validation/stats")
+async def validation_stats_endpoint(registry: AgentRegistry = Depends(get_agent_registry)):
+    """How validations were resolved: valid as-is, fixed by local coercion, or repaired by the model."""
+    return registry.validation_stats.snapshot()
+
+
+@router.get("/dedup/stats")
+async def dedup_stats(flights: SingleFlight = Depends(get_single_flight)):
+    """Single-flight counters: pipeline runs led, requests coalesced onto one, leader failures/cancellations."""
+    return flights.stats()
+
+
+def _parse_urls(urls: str | None) -> list:
+    """The `urls` form field: a JSON list or whitespace-separated URLs."""
+    if not urls or not urls.strip():
+        return []
+    try:
+        parsed = json.loads(urls)
+    except ValueError:
+        parsed = urls.split()
+    if isinstance(parsed, str):
+        parsed = [parsed]
+    parsed = [u.strip() for u in parsed if isinstance(u, str) and u.strip()]
+    if parsed and not settings.url_ingest_enabled:
+        raise HTTPException(status_code=403, detail="URL input is disabled on this server (URL_INGEST_ENABLED).")
+    if len(parsed) > settings.url_max_per_request:
+        raise HTTPException(status_code=400, detail=f"You can submit up to {settings.url_max_per_request} URLs only.")
+    return parsed
+
+
+async def _spool_inputs(spool: UploadSpool, files, raw_text_blocks, urls=None):
+    """
+    Writes uploads (or the raw text) into `spool`, removing it again if that fails.
+    Returns the run_pipeline source kwargs (with `urls` added when there are any).
+    """
+    try:
+        if urls:
+            paths = [await spool.add_upload(f) for f in files] if files else []
+            if not files and raw_text_blocks:
+                paths.append(spool.add_text(raw_text_blocks))
+            return {"file_paths": paths, "urls": urls}
+        if files:
+            return {"file_paths": [await spool.add_upload(f) for f in files]}
+        return {"file_path": spool.add_text(raw_text_blocks)}
+    except UploadTooLargeError as e:
+        spool.close()
+        raise HTTPException(status_code=413, detail=str(e))
+    except BaseException:
+        spool.close()
+        raise
+
+
+def _to_job_response(job):
+    return JobStatusResponse(
+        analysis_id=job["id"],
+        status=job["status"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+        result=job.get("result"),
+        error=job.get("error"),
+    )
+
+
 # Helper to convert pipeline output to AnalyzeResponse
-def _to_analyze_response(result, client_name):
+def _to_analyze_response(result, client_name, analysis_id: str = None):
     final = result.get("final_json", {})
     ctx = ClientContext(**{k: final.get(k) for k in ClientContext.model_fields})
     return AnalyzeResponse(
-        analysis_id="autogen-pipeline",
+        analysis_id=analysis_id or uuid.uuid4().hex,
         status="completed" if final else "error",
-        summary=ctx
+        summary=ctx,
+        reuse=result.get("reuse") or [],
     )
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.api.dependencies import get_agent_registry
+from app.core.metrics import metrics
+from app.services.agentic.registry import AgentRegistry
+
+router = APIRouter()
+
+@router.get("/metrics", tags=["metrics"], response_class=PlainTextResponse)
+async def prometheus_metrics(registry: AgentRegistry = Depends(get_agent_registry)):
+    """Prometheus text exposition of pipeline timings, token usage, cache and validation stats."""
+    gauges, counters = [], []
+    cache = registry.cache
+    if cache is not None:
+        stats = cache.stats()
+        counters += [
+            ("nexa_cache_hits_total", {}, stats["hits"]),
+            ("nexa_cache_misses_total", {}, stats["misses"]),
+        ]
+        gauges += [
+            ("nexa_cache_entries", {}, stats["entries"]),
+            ("nexa_cache_bytes", {}, stats["bytes"]),
+        ]
+    snapshot = registry.validation_stats.snapshot()
+    for outcome in ("valid", "coerced", "model_repaired", "repair_failed"):
+        counters.append(("nexa_validations_total", {"outcome": outcome}, snapshot[outcome]))
+    gauges.append(("nexa_validation_repair_rate", {}, snapshot["repair_rate"]))
+    return PlainTextResponse(metrics.render(gauges, counters), media_type="text/plain; version=0.0.4")
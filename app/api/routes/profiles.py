@@ -0,0 +1,46 @@
+import asyncio
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.api.dependencies import get_agent_registry
+from app.services.agentic.registry import AgentRegistry
+from app.services.company_profiles import CompanyProfileStore
+
+router = APIRouter(prefix="/context/profiles", tags=["profiles"])
+
+
+def _store(registry: AgentRegistry) -> CompanyProfileStore:
+    store = registry.company_profiles
+    if store is None:
+        raise HTTPException(status_code=404, detail="Company profiles are disabled.")
+    return store
+
+
+@router.get("")
+async def list_profiles(registry: AgentRegistry = Depends(get_agent_registry)):
+    """Stored company profiles (each field with its age in seconds) and lookup counters."""
+    store = _store(registry)
+    entries = await asyncio.to_thread(store.entries)  # purges expired fields, which commits to SQLite
+    return {**store.stats(), "entries": entries}
+
+
+@router.get("/{key}")
+async def get_profile(key: str, registry: AgentRegistry = Depends(get_agent_registry)):
+    """One profile with values, sources and timestamps. `key` may also be a company name."""
+    profile = await asyncio.to_thread(_store(registry).get, key)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired.")
+    return profile
+
+
+@router.delete("/{key}")
+async def invalidate_profile(key: str, fields: List[str] = Query(default=None), registry: AgentRegistry = Depends(get_agent_registry)):
+    """Invalidates a profile, or only the given `fields`, so the next request researches them again."""
+    if not await asyncio.to_thread(_store(registry).invalidate, key, fields):
+        raise HTTPException(status_code=404, detail="Profile not found or expired.")
+    return {"invalidated": key, "fields": fields or "all"}
+
+
+@router.delete("")
+async def clear_profiles(registry: AgentRegistry = Depends(get_agent_registry)):
+    """Drops every stored profile."""
+    return {"removed": await asyncio.to_thread(_store(registry).clear)}
@@ -6,6 +6,171 @@ class Settings(BaseSettings):
     version: str = "0.1.0"
     cors_origins: str | None = None  # Comma-separated origins e.g. "http://localhost:5173,http://127.0.0.1:5173"
 
+    # Model client / shared HTTP pool
+    openai_model: str = "gpt-4o"
+    openai_timeout_seconds: float = 120.0
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry_seconds: float = 30.0
+
+    # Model-call gateway around every model client: RPM/TPM token buckets (0 = no limit), retries
+    # with jitter honouring Retry-After, per-attempt timeout and overall deadline, optional hedging
+    # (0 = off) and a circuit breaker. The OpenAI SDK's own retries are turned off when it is enabled.
+    model_gateway_enabled: bool = True
+    model_rpm_limit: float = 0
+    model_tpm_limit: float = 0
+    model_expected_completion_tokens: int = 1000
+    model_attempt_timeout_seconds: float = 90.0
+    model_call_deadline_seconds: float = 240.0
+    model_max_retries: int = 3
+    model_retry_backoff_seconds: float = 0.5
+    model_retry_backoff_max_seconds: float = 20.0
+    model_hedge_after_seconds: float = 0.0
+    model_circuit_failure_threshold: int = 5
+    model_circuit_reset_seconds: float = 30.0
+
+    # Production serving (python -m app.serve): gunicorn with uvicorn workers when gunicorn is
+    # installed, uvicorn's own multi-process mode otherwise. 0 workers = one per CPU.
+    serve_host: str = "0.0.0.0"
+    serve_port: int = 8000
+    serve_workers: int = 1
+    serve_timeout_seconds: float = 300.0  # a worker silent this long is restarted (gunicorn)
+    serve_graceful_timeout_seconds: float = 30.0
+    serve_keepalive_seconds: float = 5.0
+    serve_max_requests: int = 0  # recycle a worker after this many requests (0 = never)
+    serve_max_requests_jitter: int = 0
+    serve_log_level: str = "info"
+    # Parser backends, model client libraries and agents load on first use. At startup, "background"
+    # loads them (and starts the ingestion workers) in a thread while requests are already served,
+    # "blocking" finishes that before the app accepts requests, "none" leaves it to the first request.
+    startup_warmup: str = "background"
+
+    # State shared by every worker process/pod: result cache tier, in-flight leases, job records and
+    # model rate-limit windows. "none" keeps all of it local to each process; "memory" routes it
+    # through the in-process backend; "redis" through any Redis-protocol server at shared_redis_url.
+    shared_backend: str = "none"  # "none" | "memory" | "redis"
+    shared_redis_url: str = "redis://localhost:6379/0"
+    shared_redis_pool_size: int = 8
+    shared_redis_timeout_seconds: float = 2.0
+    shared_key_prefix: str = "nexa:"
+    shared_lease_seconds: float = 300.0  # how long one worker may own an in-flight analysis
+    shared_lease_poll_seconds: float = 0.1
+
+    # "fake" swaps every agent's model client for the offline FakeChatCompletionClient (benchmarks, demos)
+    model_backend: str = "openai"  # "openai" | "fake"
+    fake_model_latency_ms: float = 800.0
+    fake_model_latency_jitter_ms: float = 300.0
+    fake_model_latency_distribution: str = "lognormal"  # "fixed" | "uniform" | "lognormal"
+    fake_model_tokens_per_second: float = 80.0
+    fake_model_failure_rate: float = 0.0
+    fake_model_seed: int | None = None
+
+    # Ingestion executor (0 process workers parses PDF/DOCX in the thread pool instead)
+    ingest_process_workers: int = 2
+    ingest_thread_workers: int = 8
+    ingest_timeout_seconds: float = 60.0
+    # TXT lines / DOCX paragraphs are grouped into section-level blocks of at most this many characters
+    ingest_group_blocks: bool = True
+    ingest_block_max_chars: int = 1500
+
+    # URL ingestion: pooled async fetches with a timeout and size cap; pages with ETag/Last-Modified
+    # are kept on disk (url_cache_dir, defaults to the system temp dir) and re-fetched conditionally
+    url_fetch_timeout_seconds: float = 15.0
+    url_fetch_max_bytes: int = 5 * 1024 * 1024
+    url_fetch_max_connections: int = 20
+    url_fetch_max_concurrency: int = 8  # per process, across requests
+    url_max_per_request: int = 10
+    url_cache_enabled: bool = True
+    url_cache_dir: str | None = None
+    url_cache_max_bytes: int = 256 * 1024 * 1024  # least recently used pages are dropped beyond this
+    url_cache_max_age_seconds: float = 30 * 24 * 3600  # pages unused for this long are dropped
+    url_user_agent: str = "NexaContextAnalyzer/0.1"
+    # The `urls` form field makes the server fetch caller-supplied URLs, so it is off by default. Each
+    # request and redirect hop must resolve to public addresses, unless url_allowed_hosts (comma-
+    # separated, subdomains included) is set: then only those hosts can be fetched.
+    url_ingest_enabled: bool = False
+    url_allowed_hosts: str | None = None
+    url_allow_private_hosts: bool = False  # skips the public-address check; trusted networks only
+    url_fetch_max_redirects: int = 5
+
+    # PDF text extraction: "auto" uses pypdf and re-reads layout/table-heavy pages with pdfplumber
+    pdf_backend: str = "auto"  # "auto" | "pypdf" | "pdfplumber"
+    pdf_layout_min_drawing_ops: int = 40
+    pdf_parallel_min_pages: int = 60  # larger PDFs are split into page ranges across the process pool
+    pdf_pages_per_task: int = 30
+
+    # Pipeline result cache (set cache_sqlite_path to persist across restarts)
+    cache_enabled: bool = True
+    cache_max_entries: int = 256
+    cache_max_bytes: int = 64 * 1024 * 1024
+    cache_ttl_seconds: float = 7 * 24 * 3600
+    cache_sqlite_path: str | None = None
+
+    # BM25 relevance filter between ingest and extract (inputs within the budget pass unchanged).
+    # The budget is never taken below extract_chunk_tokens: inputs of several chunks still reach
+    # map-reduce extraction, and only what exceeds the budget is trimmed (reported in the run log).
+    relevance_filter_enabled: bool = True
+    relevance_token_budget: int = 48000
+    relevance_top_k: int = 0  # most blocks kept (0 = only the token budget applies)
+    relevance_min_score: float = 0.0  # per-field normalized score (0-1) a block must exceed
+    relevance_keep_leading_blocks: int = 1
+
+    # Incremental re-analysis: per-file / per-chunk extraction results are kept in their own cache
+    # (same TTL, SQLite file and shared backend as the result cache, separate capacity) and only
+    # files or chunks with new fingerprints are re-extracted. Off by default: it extracts every
+    # file separately, so a first analysis of N files costs at least N model calls instead of one.
+    incremental_enabled: bool = False
+    incremental_cache_max_entries: int = 2048
+    incremental_cache_max_bytes: int = 64 * 1024 * 1024
+
+    # Map-reduce extraction for inputs larger than one chunk; "fanout" extracts each field group
+    # (identity / narrative / lists) as a concurrent structured-output call
+    extract_mode: str = "single"  # "single" | "fanout"
+    extract_chunk_tokens: int = 12000
+    extract_max_concurrency: int = 4
+
+    # Research starts from the extracted identity fields and runs concurrently with validation;
+    # false runs it after validation, on the validated object
+    speculative_research_enabled: bool = True
+
+    # Company profiles: public research per company (keyed by normalized name) is reused until each
+    # field's TTL expires; set company_profile_sqlite_path to keep profiles across restarts
+    company_profiles_enabled: bool = True
+    company_profile_ttl_seconds: float = 30 * 24 * 3600
+    company_profile_field_ttl_seconds: dict[str, float] = {}  # per-field overrides, e.g. {"company_info": 604800}
+    company_profile_match_threshold: float = 0.9  # fuzzy name match cutoff (1 = exact keys only)
+    company_profile_max_entries: int = 10000
+    company_profile_sqlite_path: str | None = None
+
+    # Upload spooling. The raw body is capped before multipart parsing (request limit plus the
+    # framing allowance, or batch_max_request_bytes for /context/analyze/batch); the per-file and
+    # per-request limits are then checked again while the parsed files are copied to the spool.
+    upload_spool_dir: str | None = None  # defaults to the system temp dir
+    upload_max_file_bytes: int = 50 * 1024 * 1024
+    upload_max_request_bytes: int = 150 * 1024 * 1024
+    upload_multipart_overhead_bytes: int = 1024 * 1024  # boundaries, headers and form fields
+    upload_chunk_bytes: int = 1024 * 1024
+
+    # Instrumentation (/metrics) and optional Server-Timing response headers
+    metrics_enabled: bool = True
+    metrics_timing_headers: bool = False
+
+    # Async job API (/context/jobs)
+    jobs_backend: str = "memory"  # "memory" | "sqlite"
+    jobs_sqlite_path: str = "jobs.sqlite"
+    jobs_workers: int = 4
+    jobs_max_queue: int = 100
+    jobs_result_ttl_seconds: float = 3600
+
+    # Batch analysis (/context/analyze/batch): items share one concurrency limit and start rate
+    # across all batch requests; server-side directories must live under batch_input_root
+    batch_max_concurrency: int = 4
+    batch_max_starts_per_minute: float = 0  # 0 = no rate limit
+    batch_max_items: int = 500
+    batch_max_files_per_item: int = 20
+    batch_max_request_bytes: int = 2 * 1024 * 1024 * 1024
+    batch_input_root: str | None = None  # None disables the `directory` input
+
     # Pydantic v2 style configuration
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
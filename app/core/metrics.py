@@ -0,0 +1,150 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from app.core.config import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Per-request stage timings (ms), set by the timing-header middleware when enabled
+request_timings: ContextVar[dict | None] = ContextVar("request_timings", default=None)
+
+
+class _NoopCall:
+    def record_usage(self, result):
+        pass
+
+
+class _ModelCall:
+    def __init__(self, metrics, agent):
+        self.metrics = metrics
+        self.agent = agent
+
+    def record_usage(self, result):
+        """Adds prompt/completion tokens from an autogen TaskResult (or CreateResult) to the counters."""
+        messages = getattr(result, "messages", None)
+        usages = [getattr(m, "models_usage", None) for m in messages] if messages is not None else [getattr(result, "usage", None)]
+        for usage in usages:
+            if usage is None:
+                continue
+            self.metrics.inc("nexa_model_tokens_total", usage.prompt_tokens, agent=self.agent, kind="prompt")
+            self.metrics.inc("nexa_model_tokens_total", usage.completion_tokens, agent=self.agent, kind="completion")
+
+
+class Metrics:
+    """
+    Minimal in-process counters and histograms rendered in the Prometheus text format.
+    Every recording method returns immediately when disabled, so instrumentation left in hot
+    paths costs one attribute check.
+    """
+    def __init__(self, enabled: bool = True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., count, sum]
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += 1
+            hist[-1] += value
+
+    def record_stage(self, stage: str, elapsed_ms: float):
+        """Pipeline stage duration: histogram plus the current request's timing header, if any."""
+        if not self.enabled:
+            return
+        self.observe("nexa_stage_seconds", elapsed_ms / 1000, stage=stage)
+        timings = request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0) + elapsed_ms
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def model_call(self, agent: str, prompt: str = ""):
+        """Times one model call for `agent` and counts its outcome; use `.record_usage(result)` for tokens."""
+        if not self.enabled:
+            yield _NoopCall()
+            return
+        self.observe("nexa_model_prompt_chars", len(prompt), agent=agent)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            yield _ModelCall(self, agent)
+            outcome = "ok"
+        finally:
+            self.observe("nexa_model_call_seconds", time.perf_counter() - started, agent=agent)
+            self.inc("nexa_model_calls_total", agent=agent, outcome=outcome)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self, gauges=None, counters=None) -> str:
+        """
+        Prometheus text exposition.
+        Args:
+            gauges (list|None): Extra (name, labels dict, value) samples computed at scrape time.
+            counters (list|None): Same, for monotonic totals kept elsewhere (e.g. cache hit counts).
+        """
+        lines = []
+        with self._lock:
+            recorded = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        extra = [((name, tuple(sorted(labels.items()))), value) for name, labels, value in counters or []]
+        typed = set()
+        for (name, labels), value in recorded + extra:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), hist in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, count in zip(self.buckets, hist):
+                lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {count}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {hist[-2]}")
+            lines.append(f"{name}_count{_labels(labels)} {hist[-2]}")
+            lines.append(f"{name}_sum{_labels(labels)} {round(hist[-1], 6)}")
+        for name, labels, value in gauges or []:
+            if name not in typed:
+                lines.append(f"# TYPE {name} gauge")
+                typed.add(name)
+            lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+metrics = Metrics(enabled=settings.metrics_enabled)
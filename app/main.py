@@ -1,13 +1,53 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from app.core.config import settings, get_cors_origin_list
+from app.core.metrics import request_timings
 from app.api.routes.health import router as health_router
 from app.api.routes.context import router as context_router
+from app.api.routes.metrics import router as metrics_router
+from app.api.routes.profiles import router as profiles_router
+from app.services.agentic.ingestion import IngestionTimeoutError
+from app.services.agentic.model_gateway import ModelUnavailableError
+from app.services.agentic.registry import AgentRegistry
+from app.services.agentic.url_fetcher import UrlFetchError
+from app.services.batch import create_batch_scheduler
+from app.services.jobs import create_job_manager
+from app.services.single_flight import SingleFlight
+from app.services.uploads import RequestSizeLimitMiddleware
 
 load_dotenv()
 
-app = FastAPI(title=settings.app_name, debug=settings.debug, version=settings.version)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One registry (shared HTTP pool + model clients) for the whole process lifetime
+    app.state.agent_registry = AgentRegistry()
+    app.state.job_manager = create_job_manager()
+    app.state.job_manager.start()
+    app.state.batch_scheduler = create_batch_scheduler()
+    app.state.single_flight = SingleFlight()
+    warmup = None
+    if settings.startup_warmup == "blocking":
+        await app.state.agent_registry.warmup()
+    elif settings.startup_warmup == "background":
+        warmup = asyncio.create_task(app.state.agent_registry.warmup())
+    try:
+        yield
+    finally:
+        if warmup is not None:
+            # Stop it before its pools are closed. A failed warmup is not fatal; the same error
+            # surfaces on first use.
+            warmup.cancel()
+            await asyncio.gather(warmup, return_exceptions=True)
+        await app.state.job_manager.stop()
+        await app.state.agent_registry.aclose()
+
+
+app = FastAPI(title=settings.app_name, debug=settings.debug, version=settings.version, lifespan=lifespan)
 
 # CORS
 origins = get_cors_origin_list()
@@ -18,9 +58,48 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Refuse oversized bodies before multipart parsing spools them to disk
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    path_limits={"/context/analyze/batch": settings.batch_max_request_bytes + settings.upload_multipart_overhead_bytes},
+)
+
+async def server_timing_header(request: Request, call_next):
+    # Stage timings recorded while handling the request, as a Server-Timing header
+    timings = {}
+    token = request_timings.set(timings)
+    try:
+        response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    # Headers go out before a streamed body (SSE, NDJSON) is produced, so its timings would be
+    # partial; only responses rendered in full carry a Content-Length
+    if timings and "content-length" in response.headers:
+        response.headers["Server-Timing"] = ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in timings.items())
+    return response
+
+if settings.metrics_timing_headers:
+    app.middleware("http")(server_timing_header)
+
+@app.exception_handler(ModelUnavailableError)
+async def model_unavailable_handler(request: Request, exc: ModelUnavailableError):
+    # Open circuit / exhausted deadline: a fast 503 the client can retry, instead of a 500
+    headers = {"Retry-After": str(max(int(exc.retry_after or 1), 1))}
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
+
+@app.exception_handler(IngestionTimeoutError)
+async def ingestion_timeout_handler(request: Request, exc: IngestionTimeoutError):
+    # A source took longer than ingest_timeout_seconds to fetch or parse
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.exception_handler(UrlFetchError)
+async def url_fetch_error_handler(request: Request, exc: UrlFetchError):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
 
 app.include_router(health_router)
 app.include_router(context_router)
+app.include_router(metrics_router)
+app.include_router(profiles_router)
 
 @app.get("/", tags=["root"])
 async def root():
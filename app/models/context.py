@@ -5,7 +5,7 @@ class ClientContext(BaseModel):
     client_name: Optional[str] = None
     industry: Optional[str] = None
     location: Optional[str] = None
-    engagement_age: int = 0  # in years
+    engagement_age: int = 0  # in months
     business_overview: Optional[str] = None
     objectives: List[str] = []
     company_info: Optional[str] = None
@@ -16,7 +16,25 @@ class AnalyzeRequest(BaseModel):
     client_name: Optional[str] = None
     raw_text_blocks: List[str] = []
 
+class PartReuse(BaseModel):
+    file_index: int
+    file_type: str
+    fingerprint: str
+    status: str  # reused | partial | extracted | failed
+    chunks_total: int
+    chunks_reused: int
+    chunks_failed: int = 0
+
 class AnalyzeResponse(BaseModel):
     analysis_id: str
     status: str
-    summary: ClientContext
\ No newline at end of file
+    summary: ClientContext
+    reuse: List[PartReuse] = []  # per-file reuse of earlier extractions (incremental re-analysis)
+
+class JobStatusResponse(BaseModel):
+    analysis_id: str
+    status: str  # queued | running | completed | failed | cancelled
+    created_at: float
+    updated_at: float
+    result: Optional[AnalyzeResponse] = None
+    error: Optional[str] = None
@@ -0,0 +1,82 @@
+"""
+Production entry point: python -m app.serve
+
+Runs app.main:app on `serve_workers` worker processes, configured from Settings (SERVE_* env vars).
+With gunicorn installed (`pip install gunicorn`), it manages uvicorn workers: health checks,
+restarts after `serve_timeout_seconds` of silence, graceful reloads and request-count recycling.
+Without it, uvicorn's own multi-process supervisor is used.
+
+Every worker has its own registry, job workers and caches. Set SHARED_BACKEND=redis so the result
+cache, in-flight leases, job records and model rate limits are shared between them.
+"""
+import logging
+import os
+from app.core.config import settings
+
+APP = "app.main:app"
+
+log = logging.getLogger("app.serve")
+
+
+def worker_count(config=settings) -> int:
+    return config.serve_workers if config.serve_workers > 0 else os.cpu_count() or 1
+
+
+def gunicorn_options(config=settings) -> dict:
+    """Gunicorn settings for uvicorn workers, from Settings."""
+    return {
+        "bind": f"{config.serve_host}:{config.serve_port}",
+        "workers": worker_count(config),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "timeout": int(config.serve_timeout_seconds),
+        "graceful_timeout": int(config.serve_graceful_timeout_seconds),
+        "keepalive": int(config.serve_keepalive_seconds),
+        "max_requests": config.serve_max_requests,
+        "max_requests_jitter": config.serve_max_requests_jitter,
+        "loglevel": config.serve_log_level,
+        # Each worker builds its registry, pools and backend connections after the fork
+        "preload_app": False,
+    }
+
+
+def uvicorn_options(config=settings) -> dict:
+    """Fallback uvicorn.run settings when gunicorn is not installed."""
+    return {
+        "host": config.serve_host,
+        "port": config.serve_port,
+        "workers": worker_count(config),
+        "timeout_keep_alive": int(config.serve_keepalive_seconds),
+        "timeout_graceful_shutdown": int(config.serve_graceful_timeout_seconds),
+        "limit_max_requests": config.serve_max_requests or None,
+        "log_level": config.serve_log_level,
+    }
+
+
+def main():
+    logging.basicConfig(level=settings.serve_log_level.upper())
+    if worker_count() > 1 and settings.shared_backend != "redis":
+        log.warning(
+            "Running %d workers with SHARED_BACKEND=%s: caches, jobs and rate limits are per worker",
+            worker_count(), settings.shared_backend,
+        )
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        import uvicorn
+        uvicorn.run(APP, **uvicorn_options())
+        return
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in gunicorn_options().items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app.main import app
+            return app
+
+    Application().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import re
+from collections.abc import Sequence
+
+_BULLET = re.compile(r"^\s*(?:[-*•·▪–]|\d+[.)]|[a-zA-Z][.)])\s+")
+_NUMBERED_HEADING = re.compile(r"^\s*(?:\d+(?:\.\d+)*\.?|[IVXLC]+\.)\s+\S")
+_MAX_HEADING_CHARS = 80
+
+
+class TextBlock:
+    """One block as an object with `text` and `anchor` slots; `block["text"]` also works."""
+    __slots__ = ("text", "anchor")
+
+    def __init__(self, text: str, anchor: str):
+        self.text = text
+        self.anchor = anchor
+
+    def __getitem__(self, key):
+        if key == "text":
+            return self.text
+        if key == "anchor":
+            return self.anchor
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        try:
+            return (self.text, self.anchor) == (other["text"], other["anchor"])
+        except (KeyError, TypeError):
+            return NotImplemented
+
+    def __repr__(self):
+        return f"TextBlock({self.text!r}, {self.anchor!r})"
+
+
+class TextBlocks(Sequence):
+    """
+    Ingested blocks stored as two parallel lists (texts, anchors) instead of one dict per block.
+    Pickles compactly across the ingestion process pool and iterates as TextBlock objects, so code
+    written against lists of `{ 'text', 'anchor' }` dicts keeps working; hot paths use `pairs()`.
+    """
+    __slots__ = ("texts", "anchors")
+
+    def __init__(self, texts=None, anchors=None):
+        self.texts = list(texts or [])
+        self.anchors = list(anchors or [])
+
+    @classmethod
+    def from_dicts(cls, blocks):
+        if isinstance(blocks, TextBlocks):
+            return blocks
+        blocks = list(blocks)
+        return cls([b["text"] for b in blocks], [b["anchor"] for b in blocks])
+
+    def append(self, text: str, anchor: str):
+        self.texts.append(text)
+        self.anchors.append(anchor)
+
+    def extend(self, blocks):
+        blocks = TextBlocks.from_dicts(blocks)
+        self.texts.extend(blocks.texts)
+        self.anchors.extend(blocks.anchors)
+
+    def pairs(self):
+        return zip(self.texts, self.anchors)
+
+    def to_dicts(self):
+        return [{"text": text, "anchor": anchor} for text, anchor in self.pairs()]
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TextBlocks(self.texts[index], self.anchors[index])
+        return TextBlock(self.texts[index], self.anchors[index])
+
+    def __eq__(self, other):
+        if not isinstance(other, (TextBlocks, list)):
+            return NotImplemented
+        return list(self.pairs()) == list(iter_blocks(other))
+
+    def __repr__(self):
+        return f"TextBlocks({len(self)} blocks)"
+
+
+def iter_blocks(text_blocks):
+    """Yields (text, anchor) for a TextBlocks or a list of `{ 'text', 'anchor' }` dicts."""
+    if isinstance(text_blocks, TextBlocks):
+        return text_blocks.pairs()
+    return ((block["text"], block["anchor"]) for block in text_blocks)
+
+
+def anchor_range(prefix: str, first: int, last: int) -> str:
+    """`line_12-40`, or `line_12` for a single unit."""
+    return f"{prefix}_{first}" if first == last else f"{prefix}_{first}-{last}"
+
+
+def is_bullet(text: str) -> bool:
+    return bool(_BULLET.match(text))
+
+
+def looks_like_heading(text: str) -> bool:
+    """Plain-text heading guess: a short line that is markdown, numbered, ALL CAPS or ends with ':'."""
+    text = text.strip()
+    if not text or len(text) > _MAX_HEADING_CHARS:
+        return False
+    if text.startswith("#"):
+        return True
+    if text.endswith(":"):
+        return True
+    if _NUMBERED_HEADING.match(text) and not text.endswith((".", ";", ",")):
+        return True
+    letters = [c for c in text if c.isalpha()]
+    return len(letters) >= 3 and all(c.isupper() for c in letters)
+
+
+class BlockGrouper:
+    """
+    Groups consecutive units (lines, paragraphs) into section-level blocks.
+
+    A new block starts at a heading, after a run of `blank_run` blank units, or when the current
+    block would go over `max_chars` (at a paragraph boundary when possible). Bullet runs are kept
+    with the line that introduces them. Each block gets an anchor range such as `line_12-40`.
+    """
+    def __init__(self, prefix: str, max_chars: int, blank_run: int = 2):
+        self.prefix = prefix
+        self.max_chars = max_chars
+        self.blank_run = blank_run
+        self.blocks = TextBlocks()
+        self.sections = 0
+        self._lines = []
+        self._first = None
+        self._last = None
+        self._chars = 0
+        self._blanks = 0
+
+    def flush(self):
+        if self._lines:
+            self.blocks.append("\n".join(self._lines), anchor_range(self.prefix, self._first, self._last))
+        self._lines = []
+        self._first = None
+        self._chars = 0
+
+    def add_blank(self):
+        self._blanks += 1
+        if self._blanks >= self.blank_run:
+            self.flush()
+
+    def add(self, number: int, text: str, heading: bool = False):
+        paragraph_break = self._blanks > 0
+        self._blanks = 0
+        if heading:
+            self.flush()
+            self.sections += 1
+        elif self._lines and self._chars + len(text) > self.max_chars:
+            # Over budget: split here, unless the line continues a bullet run (up to twice the budget)
+            continues_list = not paragraph_break and is_bullet(text) and self._chars <= 2 * self.max_chars
+            if not continues_list:
+                self.flush()
+        if self._first is None:
+            self._first = number
+        self._last = number
+        self._lines.append(text)
+        self._chars += len(text) + 1
+
+    def finish(self) -> TextBlocks:
+        self.flush()
+        return self.blocks
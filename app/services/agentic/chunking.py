@@ -0,0 +1,68 @@
+from functools import lru_cache
+from .blocks import TextBlocks, iter_blocks
+
+# Rough per-block overhead of the anchor and separators in the prompt.
+BLOCK_OVERHEAD_TOKENS = 8
+
+
+@lru_cache(maxsize=8)
+def _encoding_for(model: str):
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # tiktoken downloads its BPE files on first use; without network access fall back to estimates
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Token count for `text` with the model's tokenizer, or a ~4 chars/token estimate if unavailable."""
+    encoding = _encoding_for(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _split_text(text: str, max_tokens: int, model: str):
+    encoding = _encoding_for(model)
+    if encoding is None:
+        step = max_tokens * 4
+        return [text[i:i + step] for i in range(0, len(text), step)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def chunk_text_blocks(text_blocks, max_tokens: int, model: str = "gpt-4o"):
+    """
+    Packs text blocks, in order, into windows of at most `max_tokens` tokens.
+    A block larger than the budget is split into several blocks that keep its anchor.
+    Args:
+        text_blocks (TextBlocks|list): Blocks, or a list of dicts with 'text' and 'anchor'.
+        max_tokens (int): Token budget per window.
+        model (str): Model whose tokenizer is used for counting.
+    Returns:
+        list[TextBlocks]: The windows; a single window when everything fits.
+    """
+    budget = max(max_tokens - BLOCK_OVERHEAD_TOKENS, 1)
+    chunks = []
+    current = TextBlocks()
+    used = 0
+    for text, anchor in iter_blocks(text_blocks):
+        tokens = count_tokens(text, model) + BLOCK_OVERHEAD_TOKENS
+        if tokens > max_tokens:
+            pieces = [(piece, count_tokens(piece, model) + BLOCK_OVERHEAD_TOKENS) for piece in _split_text(text, budget, model)]
+        else:
+            pieces = [(text, tokens)]
+        for piece, piece_tokens in pieces:
+            if current and used + piece_tokens > max_tokens:
+                chunks.append(current)
+                current = TextBlocks()
+                used = 0
+            current.append(piece, anchor)
+            used += piece_tokens
+    if current:
+        chunks.append(current)
+    return chunks
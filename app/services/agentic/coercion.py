@@ -0,0 +1,148 @@
+import re
+import threading
+from typing import get_args, get_origin
+from .merge import split_value_evidence, as_anchor_list
+
+_BULLET = re.compile(r"^\s*(?:[-*•·]|\d+[.)])\s*")
+_INT = re.compile(r"-?\d+")
+_DURATION = re.compile(r"(\d+(?:[.,]\d+)?)\s*(years?|yrs?|años?|anos?|months?|mos?|meses|mes)\b", re.IGNORECASE)
+# Integer fields measured in months; "2 years" is converted instead of read as 2
+MONTH_FIELDS = ("engagement_age",)
+# Wrapper keys the model sometimes nests the whole object under
+_WRAPPER_KEYS = ("data", "result", "client_context", "context", "json")
+
+
+def _field_kind(annotation):
+    origin = get_origin(annotation)
+    if origin is list:
+        return "list"
+    if annotation is int:
+        return "int"
+    if annotation is str or str in get_args(annotation):
+        return "str"
+    return None
+
+
+def _to_str(value):
+    if value is None:
+        return None
+    if isinstance(value, list):
+        parts = [_to_str(split_value_evidence(v)[0]) for v in value]
+        value = "; ".join(p for p in parts if p)
+    elif isinstance(value, dict):
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return int(value)
+    m = _INT.search(str(value)) if value is not None else None
+    return int(m.group(0)) if m else 0
+
+
+def _to_months(value):
+    m = _DURATION.search(value) if isinstance(value, str) else None
+    if m is None:
+        return _to_int(value)
+    amount = float(m.group(1).replace(",", "."))
+    unit = m.group(2).casefold()
+    return round(amount * 12) if unit.startswith(("y", "a")) else round(amount)
+
+
+def _to_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.splitlines()
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    items = []
+    seen = set()
+    for item in value:
+        item, _ = split_value_evidence(item)
+        if isinstance(item, (dict, list)):
+            continue
+        text = _BULLET.sub("", str(item)).strip() if item is not None else ""
+        if text and text.casefold() not in seen:
+            seen.add(text.casefold())
+            items.append(text)
+    return items
+
+
+def coerce_to_schema(data, schema_model):
+    """
+    Rule-based repair of Extractor output before any model round trip.
+    Unwraps `{value, evidence}` pairs (and a top-level 'evidence' map) into a separate evidence map,
+    coerces strings/ints (e.g. `engagement_age` null -> 0, "3 years" -> 36 months) and normalizes lists
+    (string -> list, bullets stripped, duplicates removed).
+    Args:
+        data (dict): Raw JSON object from the Extractor.
+        schema_model (BaseModel): Pydantic model whose fields drive the coercion.
+    Returns:
+        tuple[dict, dict]: (values for `schema_model`, { field: [anchors] }).
+    """
+    fields = schema_model.model_fields
+    if not any(name in data for name in fields):
+        for key in _WRAPPER_KEYS:
+            if isinstance(data.get(key), dict):
+                data = data[key]
+                break
+
+    top_evidence = data.get("evidence") if isinstance(data.get("evidence"), dict) else {}
+    values = {}
+    evidence = {}
+    for name, field in fields.items():
+        if name not in data:
+            continue
+        value, anchor = split_value_evidence(data[name])
+        anchors = as_anchor_list(anchor) + as_anchor_list(top_evidence.get(name))
+        kind = _field_kind(field.annotation)
+        if kind == "list":
+            if isinstance(value, list):
+                for item in value:
+                    anchors.extend(as_anchor_list(split_value_evidence(item)[1]))
+            value = _to_list(value)
+        elif kind == "int":
+            value = _to_months(value) if name in MONTH_FIELDS else _to_int(value)
+        elif kind == "str":
+            value = _to_str(value)
+        values[name] = value
+        if anchors:
+            evidence[name] = list(dict.fromkeys(anchors))
+    return values, evidence
+
+
+class ValidationStats:
+    """
+    Counts how each validation was resolved: valid as-is, coerced locally, repaired by the model,
+    or still invalid after the model repair (repair_failed). `repair_rate` is the share that
+    needed the model.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.valid = 0
+        self.coerced = 0
+        self.model_repaired = 0
+        self.repair_failed = 0
+
+    def record(self, outcome: str):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            needed_model = self.model_repaired + self.repair_failed
+            total = self.valid + self.coerced + needed_model
+            return {
+                "validations": total,
+                "valid": self.valid,
+                "coerced": self.coerced,
+                "model_repaired": self.model_repaired,
+                "repair_failed": self.repair_failed,
+                "repair_rate": round(needed_model / total, 4) if total else 0.0,
+            }
+
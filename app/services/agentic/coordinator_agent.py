@@ -1,81 +1,268 @@
-import os
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from .ingestor_agent import IngestorAgent
-from .extractor_agent import ExtractorAgent
-from .validator_agent import ValidatorAgent
-from .researcher_agent import ResearcherAgent
+import asyncio
+import time
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.cache import make_cache_key
+from .extractor_agent import DEFAULT_SCHEMA, PROMPT_VERSION
+from .incremental import IncrementalExtractor
+from .merge import as_anchor_list, merge_research, research_request, same_identity
+from .prompt_encoding import summarize_metadata
+from .registry import AgentRegistry
+from .relevance import effective_token_budget, select_relevant_blocks
+from .stage_graph import StageGraph
 
 class CoordinatorAgent:
-    def __init__(self, name="coordinator", api_key: str = None, system_message: str = None):
-        if api_key is None:
-            api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY must be set in environment or passed explicitly.")
-
-        if system_message is None:
-            system_message = (
-                "You are the Coordinator agent. Your job is to orchestrate the Ingestor, Extractor, Validator, and Researcher agents to process client-provided materials and produce a final, validated business context JSON. "
-                "You must manage the workflow: Ingestor → Extractor → Validator → (Researcher, if allowed), and ensure the output is complete, accurate, and ready for downstream consumption. "
-                "Return the final JSON object and a log of the workflow steps."
-            )
-
-        self.model_client = OpenAIChatCompletionClient(model="gpt-4o", api_key=api_key)
-        self.agent = AssistantAgent(
-            name=name,
-            model_client=self.model_client,
-            system_message=system_message,
-        )
-    async def run_pipeline(self, file_path: str = None, file_paths: list = None, url: str = None, enrich_allowed: bool = False):
+    """
+    Orchestrates Ingestor → Extractor → Validator → (Researcher, if allowed).
+    Model clients and agents come from an AgentRegistry, normally the application-wide one
+    created at startup; a private registry is created when none is given.
+    """
+    def __init__(self, name="coordinator", registry: AgentRegistry = None, api_key: str = None):
+        self.name = name
+        self.registry = registry if registry is not None else AgentRegistry(api_key=api_key)
+
+    async def run_pipeline(self, file_path: str = None, file_paths: list = None, url: str = None, enrich_allowed: bool = False, use_cache: bool = True, urls: list = None):
         """
         Orchestrates the workflow: Ingestor → Extractor → Validator → (Researcher, if allowed).
         Args:
             file_path (str): Path to the input file (PDF, DOCX, TXT).
             url (str): URL to ingest.
+            urls (list[str]): Several URLs (fetched concurrently), alone or together with `file_paths`.
             enrich_allowed (bool): Whether to allow enrichment with public info.
+            use_cache (bool): Look up / store the result in the registry's result cache.
         Returns:
-            dict: { 'final_json': ..., 'log': [...] }
+            dict: { 'final_json': ..., 'log': [...], 'reuse': [...] } ('reuse' reports per-file reuse of earlier extractions)
         """
-        log = []
+        result = None
+        async for event in self.stream_pipeline(file_path=file_path, file_paths=file_paths, url=url, urls=urls, enrich_allowed=enrich_allowed, use_cache=use_cache):
+            if event["event"] == "result":
+                result = {"final_json": event["final_json"], "log": event["log"], "reuse": event.get("reuse", [])}
+        return result
 
-        ingestor = IngestorAgent()
-        extractor = ExtractorAgent()
-        validator = ValidatorAgent()
-        researcher = ResearcherAgent()
+    async def stream_pipeline(self, file_path: str = None, file_paths: list = None, url: str = None, enrich_allowed: bool = False, use_cache: bool = True, stream_tokens: bool = False, urls: list = None):
+        """
+        Same workflow as run_pipeline, yielding progress events as each stage finishes.
+        Events (dicts with an 'event' key):
+            started: emitted immediately.
+            stage:   { 'stage', 'elapsed_ms', 'data' } after ingest, cache lookup, filter, extract, validate, research
+                     (validate and research may overlap and arrive in either order).
+            token:   { 'stage': 'extract', 'text' } model output deltas, only if `stream_tokens`.
+            result:  { 'final_json', 'log', 'timings', 'reuse' } last event.
+        """
+        log = []
+        timings = {}
+        pipeline_started = time.perf_counter()
+        yield {"event": "started"}
 
-        # Step 1: Ingest
+        # Step 1: Ingest (off the event loop, files in parallel)
         log.append("Ingesting input...")
-        if file_paths:
-            # Ingest all files and merge their text_blocks and metadata
-            all_blocks = []
-            all_metadata = {"files": []}
-            for fp in file_paths:
-                result = ingestor.ingest(file_path=fp)
-                all_blocks.extend(result["text_blocks"])
-                all_metadata["files"].append(result["metadata"])
-            ingest_result = {"text_blocks": all_blocks, "metadata": all_metadata}
+        started = time.perf_counter()
+        if file_paths or urls:
+            ingest_result = await self.registry.ingestion.ingest_many(file_paths, urls=urls)
         else:
-            ingest_result = ingestor.ingest(file_path=file_path, url=url)
+            ingest_result = await self.registry.ingestion.ingest(file_path=file_path, url=url)
         log.append({"ingest_result": ingest_result["metadata"]})
+        timings["ingest"] = _elapsed_ms(started)
+        metrics.record_stage("ingest", timings["ingest"])
+        yield _stage_event("ingest", timings["ingest"], ingest_result["metadata"])
 
-        # Step 2: Extract (async)
-        log.append("Extracting structured JSON...")
-        extract_result = await extractor.extract(ingest_result["text_blocks"], ingest_result["metadata"])
-        log.append({"extract_result": extract_result})
-
-        # Step 3: Validate (async)
-        log.append("Validating and repairing JSON...")
-        validate_result = await validator.validate(extract_result)
-        log.append({"validate_result": validate_result})
-
-        # Step 4: Research (optional, async)
-        if enrich_allowed:
-            log.append("Enriching missing/ambiguous fields with public info...")
-            enrich_result = await researcher.enrich(validate_result, allowed=True)
-            log.append({"enrich_result": enrich_result})
-            final_json = enrich_result
-        else:
+        # Identical input (same text, file metadata, schema, prompts and model) gives back the stored result
+        cache = self.registry.cache if use_cache else None
+        cache_key = None
+        lease = None
+        if cache is not None:
+            cache_key = _cache_key(ingest_result, self.registry.model, enrich_allowed)
+            # Another worker analysing the same input right now: wait for its result rather
+            # than repeating the model calls (only with a shared backend; local leases always succeed)
+            cached, lease, waited = await cache.get_or_lease(cache_key, poll_seconds=settings.shared_lease_poll_seconds)
+            if waited:
+                log.append({"cache": "wait", "key": cache_key})
+            if cached is not None:
+                metrics.inc("nexa_cache_lookups_total", result="hit")
+                metrics.record_stage("pipeline", _elapsed_ms(pipeline_started))
+                log.append({"cache": "hit", "key": cache_key})
+                log.append("Pipeline complete.")
+                yield _stage_event("cache", 0.0, {"status": "hit"})
+                yield {"event": "result", "final_json": cached, "log": log, "timings": timings}
+                return
+            metrics.inc("nexa_cache_lookups_total", result="miss")
+            log.append({"cache": "miss", "key": cache_key})
+            yield _stage_event("cache", 0.0, {"status": "miss"})
+
+        try:
+            # Step 2a: Keep only the blocks relevant to the schema fields (local BM25, no model call).
+            # With incremental extraction every file is filtered on its own, so an unchanged file
+            # keeps the same blocks (and fingerprints) whatever else is in the request.
+            partials = self.registry.partials_cache if cache is not None else None
+            incremental = partials is not None
+            parts = ingest_result.get("parts") or [ingest_result]
+            if not incremental:
+                parts = [ingest_result]
+            if settings.relevance_filter_enabled:
+                started = time.perf_counter()
+                filtered = []
+                relevance = {"blocks_in": 0, "blocks_kept": 0, "tokens_in": 0, "tokens_kept": 0}
+                budget_limited = False
+                for part in parts:
+                    text_blocks, stats = select_relevant_blocks(part["text_blocks"])
+                    filtered.append({"text_blocks": text_blocks, "metadata": part["metadata"]})
+                    for key in relevance:
+                        relevance[key] += stats[key]
+                    budget_limited = budget_limited or stats["budget_limited"]
+                parts = filtered
+                relevance["dropped_fraction"] = round(1 - relevance["tokens_kept"] / relevance["tokens_in"], 4) if relevance["tokens_in"] else 0.0
+                relevance["budget_limited"] = budget_limited
+                log.append({"relevance_filter": relevance})
+                if budget_limited:
+                    # Relevant content was cut, not just boilerplate: say so in the run log
+                    log.append(f"Relevance filter: input over the {effective_token_budget()} token budget; "
+                               f"kept {relevance['blocks_kept']} of {relevance['blocks_in']} blocks")
+                    metrics.inc("nexa_relevance_budget_limited_total")
+                timings["filter"] = _elapsed_ms(started)
+                metrics.record_stage("filter", timings["filter"])
+                metrics.inc("nexa_relevance_tokens_total", relevance["tokens_in"], kind="in")
+                metrics.inc("nexa_relevance_tokens_total", relevance["tokens_kept"], kind="kept")
+                yield _stage_event("filter", timings["filter"], relevance)
+
+            # Step 2b: Extract (async), optionally forwarding model tokens as they arrive.
+            # Incremental mode reuses per-file / per-chunk results of earlier runs.
+            log.append("Extracting structured JSON...")
+            started = time.perf_counter()
+            extractor = self.registry.extractor()
+            reuse = []
+
+            async def extract(on_token=None):
+                nonlocal reuse
+                if incremental:
+                    result, reuse = await IncrementalExtractor(extractor, partials, self.registry.model).extract(parts, on_token=on_token)
+                    return result
+                return await extractor.extract(parts[0]["text_blocks"], ingest_result["metadata"], on_token=on_token)
+
+            if stream_tokens:
+                tokens = asyncio.Queue()
+                task = asyncio.create_task(extract(on_token=tokens.put_nowait))
+                task.add_done_callback(lambda _: tokens.put_nowait(None))
+                try:
+                    while (text := await tokens.get()) is not None:
+                        yield {"event": "token", "stage": "extract", "text": text}
+                finally:
+                    if not task.done():
+                        task.cancel()
+                extract_result = await task
+            else:
+                extract_result = await extract()
+            if incremental:
+                log.append({"incremental": reuse})
+            log.append({"extract_result": extract_result})
+            timings["extract"] = _elapsed_ms(started)
+            metrics.record_stage("extract", timings["extract"])
+            yield _stage_event("extract", timings["extract"], extract_result)
+
+            # Steps 3-4: Validate and, if allowed, Research, as a stage graph. With the company identity
+            # already in the extraction, research starts right away and overlaps validation / repair;
+            # otherwise it waits for the validated object. Document values win when merging.
+            log.append("Validating and repairing JSON...")
+            graph = StageGraph({"extract": extract_result})
+            graph.add("validate", self._validate, after=("extract",))
+            request = research_request(extract_result) if enrich_allowed else None
+            if enrich_allowed:
+                log.append("Enriching missing/ambiguous fields with public info...")
+                if request is not None and settings.speculative_research_enabled:
+                    graph.add("research", lambda results: self._research(request, log), after=("extract",))
+                else:
+                    graph.add("research", lambda results: self._research(research_request(results["validate"]), log), after=("validate",))
+            async for stage, data, elapsed_ms in graph.run():
+                log.append({"validate_result" if stage == "validate" else "enrich_result": data})
+                timings[stage] = elapsed_ms
+                metrics.record_stage(stage, elapsed_ms)
+                yield _stage_event(stage, elapsed_ms, data)
+
+            validate_result = graph.results["validate"]
             final_json = validate_result
+            if enrich_allowed:
+                enrich_result = graph.results["research"]
+                if request is not None and settings.speculative_research_enabled:
+                    if same_identity(request["identity"], validate_result):
+                        metrics.inc("nexa_speculative_research_total", result="used")
+                    else:
+                        # Validation changed who the client is: the speculative research is about someone else
+                        metrics.inc("nexa_speculative_research_total", result="discarded")
+                        log.append({"speculative_research": "discarded"})
+                        started = time.perf_counter()
+                        enrich_result = await self._research(research_request(validate_result), log)
+                        log.append({"enrich_result": enrich_result})
+                        timings["research"] = _elapsed_ms(started)
+                        metrics.record_stage("research", timings["research"])
+                        yield _stage_event("research", timings["research"], enrich_result)
+                final_json, merge_report = merge_research(validate_result, enrich_result)
+                log.append({"research_merge": merge_report})
+
+            # A chunk (or file) whose extraction failed leaves the result incomplete: say so, and
+            # do not cache it, so the next request extracts everything again
+            partial_failure = extract_result.get("partial_failure") if isinstance(extract_result, dict) else None
+            if partial_failure and isinstance(final_json, dict) and "error" not in final_json:
+                notes = as_anchor_list(final_json.get("notes")) + [f"Extraction failed for {f}" for f in partial_failure]
+                final_json = {**final_json, "partial_failure": partial_failure, "notes": list(dict.fromkeys(notes))}
+                log.append({"partial_failure": partial_failure})
+
+            if cache_key is not None and final_json and "error" not in final_json and not partial_failure:
+                await cache.aset(cache_key, final_json)
+
+            metrics.record_stage("pipeline", _elapsed_ms(pipeline_started))
+            log.append("Pipeline complete.")
+            yield {"event": "result", "final_json": final_json, "log": log, "timings": timings, "reuse": reuse}
+        finally:
+            if lease is not None:
+                await cache.release_lease(cache_key, lease)
+
+
+    async def _validate(self, results):
+        return await self.registry.validator().validate(results["extract"])
+
+    async def _research(self, request, log):
+        # Only the identity and the fields the document left empty are researched; company-level
+        # fields still fresh in the profile store are not asked again
+        if request is None:
+            return {"error": "No client name to research."}
+        store = self.registry.company_profiles
+        known = {"values": {}, "sources": {}}
+        if store is not None:
+            known = await store.afresh(request["identity"]["client_name"], request["missing"])
+        remaining = [f for f in request["missing"] if f not in known["values"]]
+        log.append({"company_profile": {"key": known.get("key"), "fresh": list(known["values"]), "research": remaining}})
+        if not remaining:
+            return {**known["values"], "sources": known["sources"]} if known["values"] else {}
+
+        enriched = await self.registry.researcher().enrich(request["identity"], allowed=True, fields=remaining)
+        if "error" in enriched:
+            if not known["values"]:
+                return enriched
+            enriched = {"notes": [f"Research failed: {enriched['error']}"]}
+        sources = enriched.get("sources") if isinstance(enriched.get("sources"), dict) else {}
+        if store is not None:
+            await store.aupdate(request["identity"]["client_name"], {f: enriched.get(f) for f in remaining}, sources)
+        return {**enriched, **known["values"], "sources": {**sources, **known["sources"]}}
+
+
+def _cache_key(ingest_result: dict, model: str, enrich_allowed: bool) -> str:
+    # The metadata summary (file types, page/line counts) is part of the extraction prompt
+    return make_cache_key(
+        ingest_result["text_blocks"], DEFAULT_SCHEMA, PROMPT_VERSION, model,
+        enrich_allowed=enrich_allowed, relevance=_relevance_config(), extract_mode=settings.extract_mode,
+        metadata=summarize_metadata(ingest_result["metadata"]),
+    )
+
+
+def _relevance_config():
+    # Part of the cache key: the filter settings change what the Extractor sees
+    if not settings.relevance_filter_enabled:
+        return None
+    return [effective_token_budget(), settings.relevance_top_k, settings.relevance_min_score, settings.relevance_keep_leading_blocks]
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
 
-        log.append("Pipeline complete.")
-        return {"final_json": final_json, "log": log}
+def _stage_event(stage: str, elapsed_ms: float, data) -> dict:
+    return {"event": "stage", "stage": stage, "elapsed_ms": elapsed_ms, "data": data}
@@ -2,15 +2,40 @@
 import os
 import json
 import re
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+import asyncio
+import time
+from app.core.config import settings
+from app.core.metrics import metrics
+from .chunking import chunk_text_blocks
+from .field_groups import FIELD_DESCRIPTIONS, FIELD_GROUPS, group_output_model
+from .merge import merge_partial_contexts
+from .prompt_encoding import encode_text_blocks, summarize_metadata
+from .stateless_agent import StatelessAgent
+
+# Bump whenever the extraction/validation/research prompts change: it is part of the result cache key.
+PROMPT_VERSION = "3"
+
+DEFAULT_SCHEMA = '''{
+    "client_name": "string | null",
+    "industry": "string | null",
+    "location": "string | null",
+    "engagement_age": "int",
+    "business_overview": "string | null",
+    "objectives": ["string"],
+    "company_info": "string | null",
+    "additional_context_questions": ["string"],
+    "potential_future_opportunities": ["string"]
+}'''
 
 class ExtractorAgent:
-    def __init__(self, name="extractor", api_key: str = None, system_message: str = None):
-        if api_key is None:
-            api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY must be set in environment or passed explicitly.")
+    def __init__(self, name="extractor", api_key: str = None, system_message: str = None, model_client=None):
+        if model_client is None:
+            if api_key is None:
+                api_key = os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY must be set in environment or passed explicitly.")
+            from autogen_ext.models.openai import OpenAIChatCompletionClient  # heavy: only without an injected client
+            model_client = OpenAIChatCompletionClient(model="gpt-4o", api_key=api_key)
 
         if system_message is None:
             system_message = (
@@ -20,43 +45,64 @@ class ExtractorAgent:
                 "Output must be a valid JSON object matching the schema provided."
             )
 
-        self.model_client = OpenAIChatCompletionClient(model="gpt-4o", api_key=api_key)
-        self.agent = AssistantAgent(
-            name=name,
-            model_client=self.model_client,
-            system_message=system_message,
-        )
-    async def extract(self, text_blocks, metadata, schema=None):
+        self.name = name
+        self.system_message = system_message
+        self.model_client = model_client
+        # Stateless: safe to share across concurrent requests, nothing accumulates between calls
+        self.agent = StatelessAgent(name, self.model_client, system_message)
+
+    async def extract(self, text_blocks, metadata, schema=None, on_token=None):
         """
         Extracts structured JSON from text_blocks and metadata using GPT-4o, matching the ClientContext schema.
+        Inputs larger than `settings.extract_chunk_tokens` are split into token-budgeted chunks that are
+        extracted concurrently (map) and merged field by field (reduce).
+        With `settings.extract_mode == "fanout"` each chunk is extracted as one concurrent
+        structured-output call per field group (see field_groups.FIELD_GROUPS) instead of a single call.
         Args:
-            text_blocks (list): List of dicts with 'text' and 'anchor'.
+            text_blocks (TextBlocks|list): Ingested blocks ('text' + 'anchor').
             metadata (dict): Metadata from the ingestor.
             schema (str|None): Optional JSON schema string. If None, uses default ClientContext schema.
+            on_token (callable|None): Called with each model output delta while the reply streams in.
+                Only used when the input fits in a single chunk, in the "single" mode.
         Returns:
             dict: Extracted JSON with evidence pointers.
         """
         if schema is None:
-            schema = '''{
-                "client_name": "string | null",
-                "industry": "string | null",
-                "location": "string | null",
-                "engagement_age": "int",
-                "business_overview": "string | null",
-                "objectives": ["string"],
-                "company_info": "string | null",
-                "additional_context_questions": ["string"],
-                "potential_future_opportunities": ["string"]
-            }'''
+            schema = DEFAULT_SCHEMA
+
+        chunks = chunk_text_blocks(text_blocks, settings.extract_chunk_tokens, model=settings.openai_model)
+        if len(chunks) <= 1:
+            return await self.extract_chunk(text_blocks, metadata, schema, on_token=on_token)
 
+        semaphore = asyncio.Semaphore(settings.extract_max_concurrency)
+
+        async def run_chunk(chunk):
+            waiting = time.perf_counter()
+            async with semaphore:
+                metrics.observe("nexa_extract_chunk_wait_seconds", time.perf_counter() - waiting)
+                return await self.extract_chunk(chunk, metadata, schema)
+
+        metrics.inc("nexa_extract_chunks_total", len(chunks))
+        partials = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+        return merge_partial_contexts(partials)
+
+    async def extract_chunk(self, text_blocks, metadata, schema=None, on_token=None):
+        """
+        Extracts one chunk (no further splitting). Safe to call concurrently: every call is a
+        single stateless model request.
+        """
+        if settings.extract_mode == "fanout":
+            return await self._extract_groups(text_blocks, metadata)
+        schema = schema or DEFAULT_SCHEMA
         prompt = (
             "You are an expert information extractor. Given the following text blocks and metadata, extract the required fields for the business context JSON schema. "
             "For each field, provide the value and an evidence pointer (anchor) from the text_blocks. "
             "If a field is missing or ambiguous, leave it null or empty and add a note. Do not invent data.\n"
             f"Schema: {schema}\n"
-            f"Metadata: {metadata}\n"
-            f"Text blocks: {text_blocks}\n"
-                        "Client Name refers to the official name of the client organization.\n"
+            f"Metadata: {summarize_metadata(metadata)}\n"
+            "Text blocks (one per line, prefixed by its [anchor]):\n"
+            f"{encode_text_blocks(text_blocks)}\n"
+            "Client Name refers to the official name of the client organization.\n"
             "Industry refers to the primary sector in which the client operates (e.g., Healthcare, Finance, Technology).\n"
             "Location refers to the primary geographic location of the client (e.g., city, country).\n"
             "Engagement Age refers to the duration (in months) of the client's engagement with Endava. You have no access to this information so leave it blank.\n"
@@ -69,16 +115,61 @@ class ExtractorAgent:
         )
 
         # ✅ Run the agent (async) and get the final message
-        result = await self.agent.run(task=prompt)
-        content = result.messages[-1].content  # final reply content
-
-        try:
-            return json.loads(content)
-        except Exception as e:
-            m = re.search(r'\{[\s\S]*\}', content)
-            if m:
-                try:
-                    return json.loads(m.group(0))
-                except Exception:
-                    pass
-            return {"error": f"Failed to parse JSON: {e}", "raw_response": content}
+        with metrics.model_call("extractor", prompt) as call:
+            result = await self.agent.run(prompt, on_token=on_token)
+            call.record_usage(result)
+        return _parse_json_reply(result.content)
+
+    async def _extract_groups(self, text_blocks, metadata):
+        """
+        Fan-out extraction: one structured-output call per field group, all in flight at once,
+        so wall-clock time is that of the slowest group. Replies follow a strict JSON schema
+        generated from ClientContext and are merged with merge_partial_contexts.
+        """
+        encoded_blocks = encode_text_blocks(text_blocks)
+        summary = summarize_metadata(metadata)
+
+        async def run_group(group):
+            fields = FIELD_GROUPS[group]
+            prompt = (
+                "You are an expert information extractor. Given the following text blocks and metadata, extract only these "
+                f"fields of the business context: {', '.join(fields)}. "
+                "For each field, list the anchors of the text blocks that support it under 'evidence'. "
+                "If a field is missing or ambiguous, leave it null or empty and add a note. Do not invent data.\n"
+                f"Metadata: {summary}\n"
+                "Text blocks (one per line, prefixed by its [anchor]):\n"
+                f"{encoded_blocks}\n"
+                + "\n".join(FIELD_DESCRIPTIONS[f] for f in fields)
+            )
+            with metrics.model_call("extractor", prompt) as call:
+                result = await self.agent.run(prompt, json_output=group_output_model(group))
+                call.record_usage(result)
+            reply = _parse_json_reply(result.content)
+            if "error" in reply:
+                return reply
+            # Keep only this group's fields, in case the model answered more than it was asked
+            partial = {f: reply.get(f) for f in fields if f in reply}
+            evidence = reply.get("evidence")
+            if isinstance(evidence, dict):
+                partial["evidence"] = {f: evidence[f] for f in fields if f in evidence}
+            if reply.get("notes"):
+                partial["notes"] = reply["notes"]
+            return partial
+
+        metrics.inc("nexa_extract_group_calls_total", len(FIELD_GROUPS))
+        partials = await asyncio.gather(*(run_group(group) for group in FIELD_GROUPS))
+        return merge_partial_contexts(partials, label="field group")
+
+
+def _parse_json_reply(content):
+    """Parses a model reply as JSON, falling back to the outermost {...} span."""
+    try:
+        return json.loads(content)
+    except Exception as e:
+        m = re.search(r'\{[\s\S]*\}', content)
+        if m:
+            try:
+                return json.loads(m.group(0))
+            except Exception:
+                pass
+        return {"error": f"Failed to parse JSON: {e}", "raw_response": content}
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import random
+from typing import AsyncGenerator, Mapping, Optional, Sequence, Union
+from autogen_core.models import ChatCompletionClient, CreateResult, ModelFamily, ModelInfo, RequestUsage
+from .chunking import count_tokens
+
+# Canned replies per pipeline role. The extractor reply validates against ClientContext as-is, so
+# the validator normally never reaches the model; its reply is only used for the repair path.
+CANNED_RESPONSES = {
+    "extractor": {
+        "client_name": "ACME Logistics S.A.",
+        "industry": "Logistics",
+        "location": "Madrid, Spain",
+        "engagement_age": 2,
+        "business_overview": "Regional logistics operator modernising its warehouse and transport platforms.",
+        "objectives": ["Integrate the WMS with SAP S/4HANA", "Improve regional inventory visibility"],
+        "company_info": "Mid-size third-party logistics provider with 40 warehouses.",
+        "additional_context_questions": ["What is the expected go-live date?"],
+        "potential_future_opportunities": ["Demand forecasting", "Route optimisation"],
+        "evidence": {"client_name": ["page_1"], "objectives": ["page_2"]},
+    },
+    "researcher": {
+        "client_name": "ACME Logistics S.A.",
+        "industry": "Logistics",
+        "location": "Madrid, Spain",
+        "engagement_age": 2,
+        "business_overview": "Regional logistics operator modernising its warehouse and transport platforms.",
+        "objectives": ["Integrate the WMS with SAP S/4HANA", "Improve regional inventory visibility"],
+        "company_info": "Mid-size third-party logistics provider with 40 warehouses.",
+        "additional_context_questions": ["What is the expected go-live date?"],
+        "potential_future_opportunities": ["Demand forecasting", "Route optimisation"],
+        "sources": {"company_info": "https://example.com/acme"},
+    },
+}
+CANNED_RESPONSES["validator"] = {k: v for k, v in CANNED_RESPONSES["extractor"].items() if k != "evidence"}
+
+# Substrings of the agents' prompts used to tell which role a request comes from
+_ROLE_MARKERS = (
+    ("information extractor", "extractor"),
+    ("research agent", "researcher"),
+    ("Validation error", "validator"),
+)
+
+_MODEL_INFO = ModelInfo(
+    vision=False, function_calling=False, json_output=True, family=ModelFamily.UNKNOWN, structured_output=False,
+)
+
+
+class FakeModelError(Exception):
+    """Injected failure; `status_code` and `retry_after` mimic the provider error it stands in for."""
+    def __init__(self, message: str = "Injected model failure", status_code: int = 503, retry_after: float = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class FakeChatCompletionClient(ChatCompletionClient):
+    """
+    Offline stand-in for OpenAIChatCompletionClient, used by the load benchmark and tests.
+
+    Each call sleeps for a sampled latency (time to first token) plus completion tokens divided by
+    `tokens_per_second`, fails with probability `failure_rate`, and returns the canned JSON for the
+    calling role (detected from the prompt). Token usage is reported like the real client, so the
+    metrics and anything that budgets tokens see realistic numbers.
+    Args:
+        latency_ms (float): Median time to first token.
+        latency_jitter_ms (float): Spread: half-width for "uniform", ~standard deviation for "lognormal".
+        latency_distribution (str): "fixed" | "uniform" | "lognormal".
+        tokens_per_second (float|None): Completion token rate; None or 0 returns the whole reply at once.
+        failure_rate (float): Probability in [0, 1] that a call raises FakeModelError.
+        responses (dict|None): Overrides per role ('extractor', 'validator', 'researcher', 'default'):
+            a dict (serialized as JSON), a string, or a callable taking the prompt and returning either.
+        seed (int|None): Seed for latency and failure sampling, for reproducible runs.
+    """
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        latency_distribution: str = "fixed",
+        tokens_per_second: float = None,
+        failure_rate: float = 0.0,
+        responses: dict = None,
+        seed: int = None,
+    ):
+        if latency_distribution not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.latency_distribution = latency_distribution
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self.responses = {**CANNED_RESPONSES, **(responses or {})}
+        self.calls = {}  # role -> number of create() calls
+        self._random = random.Random(seed)
+        self._last_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._total_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    def _latency_seconds(self) -> float:
+        if self.latency_distribution == "uniform":
+            latency = self._random.uniform(self.latency_ms - self.latency_jitter_ms, self.latency_ms + self.latency_jitter_ms)
+        elif self.latency_distribution == "lognormal" and self.latency_ms > 0:
+            # median = latency_ms; sigma derived from the jitter relative to the median
+            sigma = self.latency_jitter_ms / self.latency_ms
+            latency = self.latency_ms * self._random.lognormvariate(0, sigma)
+        else:
+            latency = self.latency_ms
+        return max(latency, 0) / 1000
+
+    def _prompt(self, messages) -> str:
+        return "\n".join(m.content for m in messages if isinstance(getattr(m, "content", None), str))
+
+    def _reply(self, prompt: str):
+        role = next((role for marker, role in _ROLE_MARKERS if marker in prompt), "default")
+        self.calls[role] = self.calls.get(role, 0) + 1
+        reply = self.responses.get(role, self.responses.get("default", self.responses["extractor"]))
+        if callable(reply):
+            reply = reply(prompt)
+        return reply if isinstance(reply, str) else json.dumps(reply)
+
+    def _start_call(self, messages):
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise FakeModelError()
+        prompt = self._prompt(messages)
+        content = self._reply(prompt)
+        usage = RequestUsage(prompt_tokens=count_tokens(prompt), completion_tokens=count_tokens(content))
+        return content, usage
+
+    def _finish_call(self, content: str, usage: RequestUsage) -> CreateResult:
+        self._last_usage = usage
+        self._total_usage = RequestUsage(
+            prompt_tokens=self._total_usage.prompt_tokens + usage.prompt_tokens,
+            completion_tokens=self._total_usage.completion_tokens + usage.completion_tokens,
+        )
+        return CreateResult(finish_reason="stop", content=content, usage=usage, cached=False)
+
+    async def create(
+        self,
+        messages: Sequence,
+        *,
+        tools: Sequence = [],
+        tool_choice="auto",
+        json_output: Optional[Union[bool, type]] = None,
+        extra_create_args: Mapping = {},
+        cancellation_token=None,
+    ) -> CreateResult:
+        await asyncio.sleep(self._latency_seconds())
+        content, usage = self._start_call(messages)
+        if self.tokens_per_second:
+            await asyncio.sleep(usage.completion_tokens / self.tokens_per_second)
+        return self._finish_call(content, usage)
+
+    async def create_stream(
+        self,
+        messages: Sequence,
+        *,
+        tools: Sequence = [],
+        tool_choice="auto",
+        json_output: Optional[Union[bool, type]] = None,
+        extra_create_args: Mapping = {},
+        cancellation_token=None,
+        max_consecutive_empty_chunk_tolerance: int = 0,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        await asyncio.sleep(self._latency_seconds())
+        content, usage = self._start_call(messages)
+        # ~4 characters per token, paced at tokens_per_second
+        step = 16
+        for i in range(0, len(content), step):
+            if self.tokens_per_second:
+                await asyncio.sleep(step / 4 / self.tokens_per_second)
+            yield content[i:i + step]
+        yield self._finish_call(content, usage)
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self._last_usage
+
+    def total_usage(self) -> RequestUsage:
+        return self._total_usage
+
+    def count_tokens(self, messages: Sequence, *, tools: Sequence = []) -> int:
+        return count_tokens(self._prompt(messages))
+
+    def remaining_tokens(self, messages: Sequence, *, tools: Sequence = []) -> int:
+        return max(128000 - self.count_tokens(messages), 0)
+
+    @property
+    def capabilities(self):
+        return _MODEL_INFO
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return _MODEL_INFO
@@ -0,0 +1,39 @@
+from functools import lru_cache
+from typing import List
+from pydantic import BaseModel, ConfigDict, create_model
+from app.models.context import ClientContext
+
+# ClientContext fields extracted together by one call in the "fanout" extraction mode.
+# Short identity fields come back fast; narrative and list fields set the wall-clock time.
+FIELD_GROUPS = {
+    "identity": ("client_name", "industry", "location", "engagement_age"),
+    "narrative": ("business_overview", "company_info"),
+    "lists": ("objectives", "additional_context_questions", "potential_future_opportunities"),
+}
+
+FIELD_DESCRIPTIONS = {
+    "client_name": "Client Name refers to the official name of the client organization.",
+    "industry": "Industry refers to the primary sector in which the client operates (e.g., Healthcare, Finance, Technology).",
+    "location": "Location refers to the primary geographic location of the client (e.g., city, country).",
+    "engagement_age": "Engagement Age refers to the duration (in months) of the client's engagement with Endava. You have no access to this information so leave it 0.",
+    "business_overview": "Business Overview is a brief summary of the client's business operations and goals. Try to be complete and thorough.",
+    "objectives": "Objectives are the main goals the client aims to achieve through their partnership with Endava. Try to be complete, specific and detailed.",
+    "company_info": "Company Info includes relevant details about the client's size, market position, and key offerings. Try to be complete and thorough.",
+    "additional_context_questions": "Additional Context Questions are any questions that arise from the provided materials that need clarification from the client.",
+    "potential_future_opportunities": "Potential Future Opportunities are possible areas for growth or collaboration that could be explored in the future.",
+}
+
+
+@lru_cache(maxsize=None)
+def group_output_model(group: str) -> type[BaseModel]:
+    """
+    Structured-output model for one field group, generated from ClientContext.
+    Every property is required (nullable where ClientContext allows None) and extra keys are
+    forbidden, as OpenAI's strict JSON-schema mode expects. Evidence is a list of anchors per field.
+    """
+    fields = FIELD_GROUPS[group]
+    name = group.capitalize()
+    strict = ConfigDict(extra="forbid")
+    evidence = create_model(f"{name}Evidence", __config__=strict, **{f: (List[str], ...) for f in fields})
+    values = {f: (ClientContext.model_fields[f].annotation, ...) for f in fields}
+    return create_model(f"{name}Fields", __config__=strict, **values, evidence=(evidence, ...), notes=(List[str], ...))
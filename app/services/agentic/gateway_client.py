@@ -0,0 +1,79 @@
+from typing import AsyncGenerator, Mapping, Optional, Sequence, Union
+from autogen_core.models import ChatCompletionClient, CreateResult
+from .model_gateway import ModelGateway
+
+
+class GatewayChatCompletionClient(ChatCompletionClient):
+    """
+    ChatCompletionClient that sends every create / create_stream of `inner` through a ModelGateway.
+    Agents get it from the registry, so every pipeline model call shares one policy.
+    """
+    def __init__(self, inner: ChatCompletionClient, gateway: ModelGateway):
+        self.inner = inner
+        self.gateway = gateway
+
+    async def create(
+        self,
+        messages: Sequence,
+        *,
+        tools: Sequence = [],
+        tool_choice="auto",
+        json_output: Optional[Union[bool, type]] = None,
+        extra_create_args: Mapping = {},
+        cancellation_token=None,
+    ) -> CreateResult:
+        return await self.gateway.call(
+            lambda: self.inner.create(
+                messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args, cancellation_token=cancellation_token,
+            ),
+            messages,
+        )
+
+    async def create_stream(
+        self,
+        messages: Sequence,
+        *,
+        tools: Sequence = [],
+        tool_choice="auto",
+        json_output: Optional[Union[bool, type]] = None,
+        extra_create_args: Mapping = {},
+        cancellation_token=None,
+        max_consecutive_empty_chunk_tolerance: int = 0,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        stream_args = {}
+        if max_consecutive_empty_chunk_tolerance:
+            # Only the OpenAI client takes it; others (e.g. ReplayChatCompletionClient) reject the keyword
+            stream_args["max_consecutive_empty_chunk_tolerance"] = max_consecutive_empty_chunk_tolerance
+        stream = self.gateway.stream(
+            lambda: self.inner.create_stream(
+                messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args, cancellation_token=cancellation_token, **stream_args,
+            ),
+            messages,
+        )
+        async for chunk in stream:
+            yield chunk
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+    def actual_usage(self):
+        return self.inner.actual_usage()
+
+    def total_usage(self):
+        return self.inner.total_usage()
+
+    def count_tokens(self, messages: Sequence, *, tools: Sequence = []) -> int:
+        return self.inner.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages: Sequence, *, tools: Sequence = []) -> int:
+        return self.inner.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self):
+        return self.inner.capabilities
+
+    @property
+    def model_info(self):
+        return self.inner.model_info
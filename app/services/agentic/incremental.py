@@ -0,0 +1,115 @@
+import asyncio
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.cache import make_cache_key
+from .chunking import chunk_text_blocks
+from .extractor_agent import DEFAULT_SCHEMA, PROMPT_VERSION
+from .merge import merge_partial_contexts
+from .prompt_encoding import summarize_metadata
+
+
+class IncrementalExtractor:
+    """
+    Extraction that reuses per-file and per-chunk results from earlier runs.
+
+    Every file is fingerprinted from its (normalized) blocks, and every chunk from the blocks it
+    contains, together with the file's metadata summary (it is part of the prompt), the schema,
+    prompt version, model and extraction mode. Partial results are stored in a ResultCache of
+    their own (AgentRegistry.partials_cache), so they neither evict nor are evicted by full
+    results, and they persist when that cache has a SQLite tier.
+    Only files and chunks whose fingerprints are new are sent to the model. The partials are
+    then reduced with merge_partial_contexts, the same reduce step used for map-reduce chunks.
+    A chunk whose extraction failed is never stored, nor is the file it belongs to; the file is
+    reported as 'failed' and the merged result carries the failure in 'partial_failure'.
+    """
+    def __init__(self, extractor, cache, model: str):
+        self.extractor = extractor
+        self.cache = cache
+        self.model = model
+
+    def fingerprint(self, text_blocks, metadata: dict, kind: str) -> str:
+        return make_cache_key(
+            text_blocks, DEFAULT_SCHEMA, PROMPT_VERSION, self.model,
+            kind=kind, extract_mode=settings.extract_mode, metadata=summarize_metadata(metadata),
+        )
+
+    async def extract(self, parts, on_token=None):
+        """
+        Args:
+            parts (list[dict]): One { 'text_blocks', 'metadata' } per file, in request order.
+            on_token (callable|None): Forwarded when exactly one chunk has to be extracted.
+        Returns:
+            tuple[dict, list[dict]]: Merged extraction, and one reuse entry per file:
+                { 'file_index', 'file_type', 'fingerprint', 'status', 'chunks_total', 'chunks_reused', 'chunks_failed' }
+                with status 'reused' (whole file), 'partial' (some chunks), 'extracted' or 'failed'
+                (some chunk could not be extracted, so the file's result is incomplete).
+        """
+        report = []
+        file_results = [None] * len(parts)
+        file_keys = [None] * len(parts)
+        chunk_results = {}  # file index -> list of chunk partials (None = still to extract)
+        pending = []        # (file index, chunk index, chunk, chunk key)
+        for i, part in enumerate(parts):
+            file_keys[i] = self.fingerprint(part["text_blocks"], part["metadata"], "file")
+            entry = {
+                "file_index": i,
+                "file_type": part["metadata"].get("file_type", "unknown"),
+                "fingerprint": file_keys[i][:16],
+                "chunks_failed": 0,
+            }
+            cached = await self.cache.aget(file_keys[i])
+            if cached is not None:
+                file_results[i] = cached["result"]
+                report.append({**entry, "status": "reused", "chunks_total": cached["chunks"], "chunks_reused": cached["chunks"]})
+                continue
+
+            chunks = chunk_text_blocks(part["text_blocks"], settings.extract_chunk_tokens, model=self.model)
+            chunk_results[i] = [None] * len(chunks)
+            reused = 0
+            for c, chunk in enumerate(chunks):
+                chunk_key = self.fingerprint(chunk, part["metadata"], "chunk")
+                partial = await self.cache.aget(chunk_key)
+                if partial is not None:
+                    chunk_results[i][c] = partial
+                    reused += 1
+                else:
+                    pending.append((i, c, chunk, chunk_key))
+            report.append({
+                **entry,
+                "status": "partial" if reused else "extracted",
+                "chunks_total": len(chunks),
+                "chunks_reused": reused,
+            })
+
+        semaphore = asyncio.Semaphore(settings.extract_max_concurrency)
+        stream_to = on_token if len(pending) == 1 else None
+
+        async def run(i, c, chunk, chunk_key):
+            async with semaphore:
+                partial = await self.extractor.extract_chunk(chunk, parts[i]["metadata"], on_token=stream_to)
+            if not _failed(partial):
+                await self.cache.aset(chunk_key, partial)
+            chunk_results[i][c] = partial
+
+        await asyncio.gather(*(run(*job) for job in pending))
+        metrics.inc("nexa_incremental_chunks_total", len(pending), result="extracted")
+        metrics.inc("nexa_incremental_chunks_total", sum(e["chunks_reused"] for e in report), result="reused")
+
+        for i, partials in chunk_results.items():
+            merged = partials[0] if len(partials) == 1 else merge_partial_contexts(partials, label=f"file {i + 1}, chunk")
+            file_results[i] = merged
+            failed = sum(1 for partial in partials if _failed(partial))
+            if failed:
+                report[i].update(status="failed", chunks_failed=failed)
+                metrics.inc("nexa_incremental_chunks_total", failed, result="failed")
+            else:
+                await self.cache.aset(file_keys[i], {"result": merged, "chunks": len(partials)})
+
+        if len(file_results) == 1:
+            return file_results[0], report
+        return merge_partial_contexts(file_results, label="file"), report
+
+
+def _failed(partial) -> bool:
+    # An error, or a result that is itself missing some part (e.g. a failed field group)
+    return not isinstance(partial, dict) or "error" in partial or bool(partial.get("partial_failure"))
@@ -0,0 +1,224 @@
+import asyncio
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app.core.config import settings
+from app.core.metrics import metrics
+from .blocks import TextBlocks, iter_blocks
+from .ingestor_agent import IngestorAgent
+from .pdf_backends import pdf_page_count
+from .url_fetcher import create_url_fetcher
+
+# Parsing these formats is CPU-bound (pdfminer / lxml), so they go to the process pool.
+CPU_BOUND_EXTENSIONS = (".pdf", ".docx", ".doc")
+# Parser libraries that ingestor_agent / pdf_backends import on first use; warmup() loads them early
+PARSER_MODULES = ("pypdf", "pdfplumber", "docx", "bs4")
+
+
+def _ingest_source(file_path: str = None, url: str = None):
+    # Module-level so it can be pickled into a worker process.
+    return IngestorAgent().ingest(file_path=file_path, url=url)
+
+
+def _import_parsers():
+    for name in PARSER_MODULES:
+        importlib.import_module(name)
+    return os.getpid()
+
+
+def _ingest_timed(file_path: str = None, url: str = None):
+    # Wall-clock start so the caller can tell queue wait from parse time, even across processes
+    started = time.time()
+    return started, _ingest_source(file_path=file_path, url=url)
+
+
+def _ingest_web_timed(fetched: dict):
+    started = time.time()
+    return started, IngestorAgent().ingest_web(fetched)
+
+
+def _ingest_pdf_range(file_path: str, first_page: int, last_page: int):
+    started = time.time()
+    return started, IngestorAgent().ingest_pdf_pages(file_path, first_page, last_page)
+
+
+class IngestionTimeoutError(TimeoutError):
+    pass
+
+
+class IngestionExecutor:
+    """
+    Runs IngestorAgent off the event loop.
+
+    PDF/DOCX parsing goes to a bounded process pool and TXT sources to a thread pool. URLs are
+    downloaded by a shared async UrlFetcher (pooled connections, conditional GETs) and only their
+    HTML-to-text conversion runs in the thread pool. PDFs
+    of at least `pdf_parallel_min_pages` pages are split into page ranges parsed in parallel
+    across the process pool. Every source gets its own timeout, and multi-file results are merged
+    in input order, so the output does not depend on which file finishes first. Pools are
+    created on first use.
+
+    A worker cannot be interrupted, so a timed-out parse keeps running and would hold its pool slot
+    until it finishes. The pool it ran in is therefore recycled: new work goes to a fresh pool, and
+    the old one is shut down without cancelling, letting the work already queued on it (including
+    other requests') finish before its workers exit.
+    """
+    def __init__(self, process_workers: int = None, thread_workers: int = None, timeout: float = None,
+                 pdf_parallel_min_pages: int = None, pdf_pages_per_task: int = None):
+        self.process_workers = settings.ingest_process_workers if process_workers is None else process_workers
+        self.thread_workers = settings.ingest_thread_workers if thread_workers is None else thread_workers
+        self.timeout = settings.ingest_timeout_seconds if timeout is None else timeout
+        self.pdf_parallel_min_pages = settings.pdf_parallel_min_pages if pdf_parallel_min_pages is None else pdf_parallel_min_pages
+        self.pdf_pages_per_task = settings.pdf_pages_per_task if pdf_pages_per_task is None else pdf_pages_per_task
+        self._process_pool = None
+        self._thread_pool = None
+        self._url_fetcher = None
+
+    @property
+    def url_fetcher(self):
+        if self._url_fetcher is None:
+            self._url_fetcher = create_url_fetcher()
+        return self._url_fetcher
+
+    def _pool_for(self, file_path: str = None):
+        ext = os.path.splitext(file_path)[1].lower() if file_path else ""
+        if ext in CPU_BOUND_EXTENSIONS and self.process_workers > 0:
+            return self._processes()
+        return self._threads()
+
+    def _processes(self):
+        if self._process_pool is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._process_pool
+
+    def _threads(self):
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="ingest")
+        return self._thread_pool
+
+    async def _ingest_pdf_ranges(self, loop, pool, file_path: str):
+        """Parses a PDF in page ranges across the process pool; small PDFs stay a single task."""
+        pages = await loop.run_in_executor(self._threads(), pdf_page_count, file_path)
+        if pages < self.pdf_parallel_min_pages:
+            return await loop.run_in_executor(pool, _ingest_timed, file_path, None)
+        step = max(self.pdf_pages_per_task, 1)
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(pool, _ingest_pdf_range, file_path, first, min(first + step - 1, pages))
+            for first in range(1, pages + 1, step)
+        ))
+        metrics.inc("nexa_ingest_pdf_ranges_total", len(parts))
+        result = {"text_blocks": TextBlocks(), "metadata": {"file_type": "pdf", "pages": []}}
+        for _, part in parts:
+            result["text_blocks"].extend(part["text_blocks"])
+            result["metadata"]["pages"].extend(part["metadata"]["pages"])
+        return min(started for started, _ in parts), result
+
+    async def ingest(self, file_path: str = None, url: str = None):
+        """
+        Ingests a single file or URL in the appropriate pool.
+        Returns:
+            dict: { 'text_blocks': [...], 'metadata': {...} } as produced by IngestorAgent.ingest.
+        Raises:
+            IngestionTimeoutError: If fetching/parsing takes longer than the configured timeout.
+            UrlFetchError: If a URL cannot be downloaded (status, size cap, fetch timeout).
+        """
+        loop = asyncio.get_running_loop()
+        pool = self._pool_for(file_path)
+        pool_name = "process" if pool is self._process_pool else "thread"
+        submitted = time.time()
+        if not file_path and url:
+            future = self._ingest_url(loop, url)
+        elif pool_name == "process" and file_path.lower().endswith(".pdf"):
+            future = self._ingest_pdf_ranges(loop, pool, file_path)
+        else:
+            future = loop.run_in_executor(pool, _ingest_timed, file_path, url)
+        try:
+            started, result = await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            metrics.inc("nexa_ingest_timeouts_total")
+            self._recycle(pool)
+            source = os.path.basename(file_path) if file_path else url
+            raise IngestionTimeoutError(f"Ingestion of {source} exceeded {self.timeout}s")
+        if not metrics.enabled:
+            return result
+
+        finished = time.time()
+        file_type = result["metadata"].get("file_type", "unknown")
+        metrics.observe("nexa_ingest_queue_wait_seconds", max(started - submitted, 0), pool=pool_name)
+        metrics.observe("nexa_ingest_seconds", finished - started, file_type=file_type)
+        metrics.inc("nexa_ingest_pages_total", len(result["metadata"].get("pages", [])), file_type=file_type)
+        metrics.inc("nexa_ingest_blocks_total", len(result["text_blocks"]), file_type=file_type)
+        metrics.inc("nexa_ingest_chars_total", sum(len(text) for text, _ in iter_blocks(result["text_blocks"])), file_type=file_type)
+        return result
+
+    async def _ingest_url(self, loop, url):
+        # Download on the event loop (async, pooled), then convert the HTML in the thread pool
+        fetched = await self.url_fetcher.fetch(url)
+        return await loop.run_in_executor(self._threads(), _ingest_web_timed, fetched)
+
+    async def ingest_many(self, file_paths: list, urls: list = None):
+        """
+        Ingests several files and URLs concurrently and merges them, preserving the order of
+        `file_paths` followed by `urls`.
+        Returns:
+            dict: { 'text_blocks': TextBlocks, 'metadata': { 'files': [...] }, 'parts': [per-source results] }
+        """
+        results = await asyncio.gather(
+            *(self.ingest(file_path=fp) for fp in file_paths or []),
+            *(self.ingest(url=url) for url in urls or []),
+        )
+        all_blocks = TextBlocks()
+        all_metadata = {"files": []}
+        for result in results:
+            all_blocks.extend(result["text_blocks"])
+            all_metadata["files"].append(result["metadata"])
+        return {"text_blocks": all_blocks, "metadata": all_metadata, "parts": results}
+
+    async def warmup(self):
+        """
+        Does the work the first request would otherwise pay for: imports the parser libraries,
+        starts the process workers (each importing them too) and opens the URL fetcher's pool.
+        Runs on the event loop, like the requests that share these lazily built pools, so it never
+        races them into building a second one; only the imports go to a thread.
+        Returns the number of process workers started.
+        """
+        await asyncio.to_thread(_import_parsers)
+        self.url_fetcher.http_client
+        if self.process_workers <= 0:
+            return 0
+        pool = self._processes()
+        futures = [asyncio.wrap_future(pool.submit(_import_parsers)) for _ in range(self.process_workers)]
+        done, _ = await asyncio.wait(futures, timeout=self.timeout)
+        return len({f.result() for f in done if f.exception() is None})
+
+    async def aclose(self):
+        """Closes the URL fetcher's connection pool and shuts the worker pools down."""
+        if self._url_fetcher is not None:
+            await self._url_fetcher.aclose()
+            self._url_fetcher = None
+        self.shutdown()
+
+    def _recycle(self, pool):
+        """Replaces `pool` after a timeout; its running work finishes and then its workers exit."""
+        if pool is self._process_pool:
+            self._process_pool = None
+        elif pool is self._thread_pool:
+            self._thread_pool = None
+        else:
+            return  # already recycled by another timeout
+        pool.shutdown(wait=False)
+        metrics.inc("nexa_ingest_pool_recycles_total", pool="process" if isinstance(pool, ProcessPoolExecutor) else "thread")
+
+    def shutdown(self):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
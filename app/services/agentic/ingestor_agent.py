@@ -1,36 +1,43 @@
+import asyncio
 import os
-import pdfplumber
-from docx import Document
-import requests
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+import re
+from app.core.config import settings
+from .blocks import BlockGrouper, TextBlocks, is_bullet, looks_like_heading
+from .pdf_backends import get_pdf_backend
+
+# Elements that never carry page content
+HTML_DROP_TAGS = ("script", "style", "noscript", "template", "svg", "canvas", "iframe", "form", "button",
+                  "nav", "header", "footer", "aside", "select", "input")
+# Elements whose text becomes one unit of the page (the innermost ones win when nested)
+HTML_TEXT_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "pre", "blockquote", "dt", "dd", "td", "th", "figcaption")
+HTML_HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+
+def _html_parser():
+    # lxml is much faster when installed; html.parser ships with Python
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
 
 class IngestorAgent:
-    def __init__(self, name="ingestor", api_key: str = None, system_message: str = None):
-        if api_key is None:
-            api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY must be set in environment or passed explicitly.")
+    """
+    Reads and normalizes client-provided materials (PDF, DOCX, TXT or URL) into text blocks with
+    anchors plus metadata. Parsing is purely local, so this agent does not hold a model client.
 
-        if system_message is None:
-            system_message = (
-                "You are the Ingestor agent. Your job is to read and process client-provided materials, such as RFPs, briefing documents, or public information, in PDF, DOCX, TXT, or from URLs. "
-                "You must extract and normalize all text content, preserving as much structure as possible (e.g., section headers, bullet points), and generate metadata including page numbers, anchors, and source references. "
-                "Return a dictionary with two keys: 'text_blocks' (a list of normalized text blocks with their anchors) and 'metadata' (including file type, page numbers, and any other relevant info). "
-                "Do not summarize or interpret content; only extract and structure it for downstream processing."
-            )
+    TXT lines and DOCX paragraphs are grouped into section-level blocks (headings, blank-line runs,
+    bullet lists) anchored by ranges such as `line_12-40`; PDFs keep one block per page. Web pages
+    are reduced to their readable text (see ingest_web) and grouped the same way into `block_*` ranges.
+    """
+    def __init__(self, name="ingestor"):
+        self.name = name
 
-        self.model_client = OpenAIChatCompletionClient(model="gpt-4o", api_key=api_key)
-        self.agent = AssistantAgent(
-            name=name,
-            model_client=self.model_client,
-            system_message=system_message,
-        )
     def ingest(self, file_path: str = None, url: str = None):
         """
         Ingests a document (PDF, DOCX, TXT) or a URL and returns normalized text blocks and metadata.
         Returns:
-            dict: { 'text_blocks': [ { 'text': ..., 'anchor': ... } ], 'metadata': { ... } }
+            dict: { 'text_blocks': TextBlocks, 'metadata': { ... } }
         """
         if file_path:
             ext = os.path.splitext(file_path)[1].lower()
@@ -48,50 +55,119 @@ class IngestorAgent:
             raise ValueError("Either file_path or url must be provided.")
 
     def _ingest_pdf(self, file_path):
-        text_blocks = []
+        return self.ingest_pdf_pages(file_path)
+
+    def ingest_pdf_pages(self, file_path, first_page: int = 1, last_page: int = None, backend: str = None):
+        """
+        Ingests a page range of a PDF (1-based, inclusive) with the configured PDF backend.
+        Page anchors are absolute, so results for consecutive ranges can simply be concatenated.
+        """
+        text_blocks = TextBlocks()
         metadata = {"file_type": "pdf", "pages": []}
-        with pdfplumber.open(file_path) as pdf:
-            for i, page in enumerate(pdf.pages, 1):
-                text = page.extract_text() or ""
-                anchor = f"page_{i}"
-                text_blocks.append({"text": text, "anchor": anchor})
-                metadata["pages"].append({"page": i, "anchor": anchor})
+        for i, text, used_backend in get_pdf_backend(backend).extract_pages(file_path, first_page, last_page):
+            anchor = f"page_{i}"
+            text_blocks.append(text, anchor)
+            metadata["pages"].append({"page": i, "anchor": anchor, "backend": used_backend})
         return {"text_blocks": text_blocks, "metadata": metadata}
 
     def _ingest_docx(self, file_path):
+        from docx import Document
         doc = Document(file_path)
-        text_blocks = []
-        metadata = {"file_type": "docx", "paragraphs": []}
+        grouper = BlockGrouper("para", settings.ingest_block_max_chars if settings.ingest_group_blocks else 0)
+        paragraphs = 0
         for i, para in enumerate(doc.paragraphs, 1):
             text = para.text.strip()
-            if text:
-                anchor = f"para_{i}"
-                text_blocks.append({"text": text, "anchor": anchor})
-                metadata["paragraphs"].append({"index": i, "anchor": anchor})
+            if not text:
+                grouper.add_blank()
+                continue
+            paragraphs += 1
+            style = (para.style.name if para.style is not None else "") or ""
+            heading = style.startswith(("Heading", "Title")) or (
+                not style.startswith("List") and not is_bullet(text) and looks_like_heading(text)
+            )
+            grouper.add(i, text, heading=heading)
+        text_blocks = grouper.finish()
+        metadata = {"file_type": "docx", "paragraphs": paragraphs, "blocks": len(text_blocks), "sections": grouper.sections}
         return {"text_blocks": text_blocks, "metadata": metadata}
 
     def _ingest_txt(self, file_path):
-        text_blocks = []
-        metadata = {"file_type": "txt"}
+        grouper = BlockGrouper("line", settings.ingest_block_max_chars if settings.ingest_group_blocks else 0)
+        lines = 0
+        # Iterate the spooled file lazily instead of loading every line at once
         with open(file_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        for i, line in enumerate(lines, 1):
-            text = line.strip()
-            if text:
-                anchor = f"line_{i}"
-                text_blocks.append({"text": text, "anchor": anchor})
-        metadata["lines"] = len(text_blocks)
+            for i, line in enumerate(f, 1):
+                text = line.strip()
+                if not text:
+                    grouper.add_blank()
+                    continue
+                lines += 1
+                grouper.add(i, text, heading=not is_bullet(text) and looks_like_heading(text))
+        text_blocks = grouper.finish()
+        metadata = {"file_type": "txt", "lines": lines, "blocks": len(text_blocks), "sections": grouper.sections}
         return {"text_blocks": text_blocks, "metadata": metadata}
 
     def _ingest_url(self, url):
-        resp = requests.get(url)
-        resp.raise_for_status()
-        text = resp.text
-        text_blocks = []
-        for i, para in enumerate(text.split("\n\n"), 1):
-            para = para.strip()
-            if para:
-                anchor = f"block_{i}"
-                text_blocks.append({"text": para, "anchor": anchor})
-        metadata = {"file_type": "url", "url": url, "blocks": len(text_blocks)}
+        # Standalone (blocking) path; IngestionExecutor fetches URLs with its shared async UrlFetcher
+        from .url_fetcher import UrlFetcher
+
+        async def fetch():
+            fetcher = UrlFetcher(cache_dir=None)
+            try:
+                return await fetcher.fetch(url)
+            finally:
+                await fetcher.aclose()
+
+        return self.ingest_web(asyncio.run(fetch()))
+
+    def ingest_web(self, fetched: dict):
+        """
+        Converts a fetched web resource (see UrlFetcher.fetch) into text blocks. HTML is parsed with
+        BeautifulSoup: scripts, styles, navigation, headers/footers and forms are dropped, the
+        <main>/<article> element is used when present, and headings, paragraphs, list items and
+        table cells become units grouped into section-level blocks. Other text types are split by line.
+        """
+        content_type = (fetched.get("content_type") or "").lower()
+        body = fetched["body"]
+        grouper = BlockGrouper("block", settings.ingest_block_max_chars if settings.ingest_group_blocks else 0)
+        title = None
+        if "html" in content_type or (not content_type and body.lstrip()[:1] == b"<"):
+            from bs4 import BeautifulSoup
+            soup = BeautifulSoup(body, _html_parser(), from_encoding=fetched.get("encoding"))
+            if soup.title is not None and soup.title.string:
+                title = " ".join(soup.title.string.split())
+            for tag in soup(HTML_DROP_TAGS):
+                tag.decompose()
+            root = soup.find("main") or soup.find("article") or soup.body or soup
+            units = [el for el in root.find_all(HTML_TEXT_TAGS) if el.find(HTML_TEXT_TAGS) is None]
+            if not units:
+                units = [None]  # no structure at all: fall back to the text lines of the root
+            number = 0
+            for el in units:
+                texts = [el.get_text(" ")] if el is not None else root.get_text("\n").splitlines()
+                for text in texts:
+                    text = re.sub(r"\s+", " ", text).strip()
+                    if not text:
+                        continue
+                    number += 1
+                    grouper.add(number, text, heading=el is not None and el.name in HTML_HEADING_TAGS)
+        else:
+            text = body.decode(fetched.get("encoding") or "utf-8", errors="replace")
+            number = 0
+            for line in text.splitlines():
+                line = line.strip()
+                if not line:
+                    grouper.add_blank()
+                    continue
+                number += 1
+                grouper.add(number, line, heading=not is_bullet(line) and looks_like_heading(line))
+        text_blocks = grouper.finish()
+        metadata = {
+            "file_type": "url",
+            "url": fetched["url"],
+            "title": title,
+            "bytes": len(body),
+            "cached": fetched.get("cached", False),
+            "blocks": len(text_blocks),
+            "sections": grouper.sections,
+        }
         return {"text_blocks": text_blocks, "metadata": metadata}
@@ -0,0 +1,194 @@
+import re
+from collections import Counter
+from typing import get_origin
+from app.models.context import ClientContext
+
+LIST_FIELDS = tuple(name for name, f in ClientContext.model_fields.items() if get_origin(f.annotation) is list)
+NARRATIVE_FIELDS = ("business_overview", "company_info")
+INT_FIELDS = ("engagement_age",)
+# Facts about the engagement with Endava, which public sources cannot know: only the documents fill them
+DOCUMENT_ONLY_FIELDS = ("engagement_age",)
+
+
+def _norm(text) -> str:
+    return re.sub(r"\s+", " ", str(text)).strip().rstrip(".;").casefold()
+
+
+def split_value_evidence(value):
+    """Unwraps `{ "value": ..., "evidence": ... }` objects the Extractor sometimes emits."""
+    if isinstance(value, dict) and "value" in value:
+        return value.get("value"), value.get("evidence", value.get("anchor"))
+    return value, None
+
+
+def as_anchor_list(evidence):
+    """Flattens an evidence pointer (string, list or nested lists) into a list of anchor strings."""
+    if evidence is None or evidence == "":
+        return []
+    if isinstance(evidence, (list, tuple)):
+        anchors = []
+        for item in evidence:
+            anchors.extend(as_anchor_list(item))
+        return anchors
+    return [str(evidence)]
+
+
+def _is_empty(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip()) or value == []
+
+
+def merge_partial_contexts(partials, label: str = "chunk"):
+    """
+    Reduces per-chunk (or per-file) extraction results into one ClientContext-shaped dict.
+
+    - List fields are unioned, dropping case/whitespace duplicates, in first-seen order.
+    - Narrative fields keep every distinct non-empty text (texts contained in a longer one are dropped).
+    - Other scalars take the most frequent non-empty value, ties going to the earliest partial.
+    - Evidence anchors are collected per field under an 'evidence' key.
+    - Partials with an 'error' key are left out but not forgotten: each one is described under
+      'partial_failure' (and in 'notes'), so callers know the result is incomplete.
+    Args:
+        partials (list[dict]): Extractor outputs.
+        label (str): What one partial is ("chunk", "file"...), for the failure descriptions.
+    Returns:
+        dict: Merged result, or the first error when every partial failed.
+    """
+    usable = [p for p in partials if isinstance(p, dict) and "error" not in p]
+    if not usable:
+        return partials[0] if partials else {}
+    failures = [
+        f"{label} {i + 1} of {len(partials)}: {p.get('error') if isinstance(p, dict) else p}"
+        for i, p in enumerate(partials)
+        if not (isinstance(p, dict) and "error" not in p)
+    ]
+
+    values = {name: [] for name in ClientContext.model_fields}
+    evidence = {name: [] for name in ClientContext.model_fields}
+    notes = [f"Extraction failed for {failure}" for failure in failures]
+    for partial in usable:
+        failures.extend(partial.get("partial_failure") or [])  # a part that was itself incomplete
+        partial_evidence = partial.get("evidence") if isinstance(partial.get("evidence"), dict) else {}
+        for name in ClientContext.model_fields:
+            value, anchor = split_value_evidence(partial.get(name))
+            evidence[name].extend(as_anchor_list(anchor) + as_anchor_list(partial_evidence.get(name)))
+            if name in LIST_FIELDS:
+                items = value if isinstance(value, list) else ([] if _is_empty(value) else [value])
+                for item in items:
+                    item, item_anchor = split_value_evidence(item)
+                    evidence[name].extend(as_anchor_list(item_anchor))
+                    if not _is_empty(item):
+                        values[name].append(item)
+            elif not _is_empty(value):
+                values[name].append(value)
+        extra_notes = partial.get("notes")
+        notes.extend(extra_notes if isinstance(extra_notes, list) else as_anchor_list(extra_notes))
+
+    merged = {}
+    for name, found in values.items():
+        if name in LIST_FIELDS:
+            seen = set()
+            merged[name] = []
+            for item in found:
+                key = _norm(item)
+                if key not in seen:
+                    seen.add(key)
+                    merged[name].append(item)
+        elif name in INT_FIELDS:
+            ints = [int(v) for v in found if isinstance(v, (int, float)) or str(v).strip().isdigit()]
+            merged[name] = max(ints) if ints else 0
+        elif name in NARRATIVE_FIELDS:
+            texts = []
+            for text in sorted({str(v).strip() for v in found}, key=len, reverse=True):
+                if not any(_norm(text) in _norm(kept) for kept in texts):
+                    texts.append(text)
+            ordered = [str(v).strip() for v in found if str(v).strip() in texts]
+            merged[name] = "\n".join(dict.fromkeys(ordered)) or None
+        else:
+            counts = Counter(_norm(v) for v in found)
+            best = max(found, key=lambda v: counts[_norm(v)], default=None)
+            merged[name] = best
+
+    merged["evidence"] = {name: list(dict.fromkeys(anchors)) for name, anchors in evidence.items() if anchors}
+    if notes:
+        merged["notes"] = list(dict.fromkeys(str(n) for n in notes))
+    if failures:
+        merged["partial_failure"] = failures
+    return merged
+
+
+IDENTITY_FIELDS = ("client_name", "industry", "location")
+
+
+def research_request(extracted: dict):
+    """
+    What the Researcher needs to start before validation: the identity fields found in the
+    document and the names of the fields the document left empty.
+    Returns:
+        dict|None: { 'identity': {...}, 'missing': [...] }, or None without a client name.
+    """
+    if not isinstance(extracted, dict) or "error" in extracted:
+        return None
+    identity = {}
+    for name in IDENTITY_FIELDS:
+        value, _ = split_value_evidence(extracted.get(name))
+        if not _is_empty(value) and not isinstance(value, (dict, list)):
+            identity[name] = str(value).strip()
+    if "client_name" not in identity:
+        return None
+    missing = [
+        name for name in ClientContext.model_fields
+        if name not in DOCUMENT_ONLY_FIELDS and _is_empty(split_value_evidence(extracted.get(name))[0])
+    ]
+    return {"identity": identity, "missing": missing}
+
+
+def same_identity(a: dict, b: dict) -> bool:
+    return _norm(a.get("client_name") or "") == _norm(b.get("client_name") or "")
+
+
+def merge_research(document: dict, research: dict):
+    """
+    Combines the validated document context with the Researcher's output; document evidence wins.
+
+    - Fields the document filled are kept as they are; a different research value is reported
+      as a conflict instead of overwriting them.
+    - Empty document fields take the research value, and its source is kept under 'sources'.
+      DOCUMENT_ONLY_FIELDS (engagement_age) are never taken from research.
+    - 'evidence' (document anchors) and 'notes' from both sides are preserved.
+    Args:
+        document (dict): Validator output.
+        research (dict): Researcher output (may carry 'sources', 'notes' or an 'error').
+    Returns:
+        tuple[dict, dict]: (merged context, report { 'filled': [...], 'conflicts': [...] }).
+    """
+    report = {"filled": [], "conflicts": []}
+    if not isinstance(research, dict) or "error" in research or "error" in document:
+        return document, report
+
+    merged = dict(document)
+    all_sources = research.get("sources") if isinstance(research.get("sources"), dict) else {}
+    sources = {}
+    for name in ClientContext.model_fields:
+        if name in DOCUMENT_ONLY_FIELDS:
+            continue
+        found, _ = split_value_evidence(research.get(name))
+        if _is_empty(found):
+            continue
+        current = document.get(name)
+        if _is_empty(current):
+            merged[name] = found
+            report["filled"].append(name)
+            if name in all_sources:
+                sources[name] = all_sources[name]
+        elif name in LIST_FIELDS or _norm(current) == _norm(found):
+            continue
+        else:
+            report["conflicts"].append({"field": name, "document": current, "research": found})
+
+    if sources:
+        merged["sources"] = sources
+    notes = as_anchor_list(document.get("notes")) + as_anchor_list(research.get("notes"))
+    notes += [f"Public sources disagree on {c['field']}; kept the document value." for c in report["conflicts"]]
+    if notes:
+        merged["notes"] = list(dict.fromkeys(notes))
+    return merged, report
@@ -0,0 +1,403 @@
+import asyncio
+import random
+import time
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.shared_state import SharedRateLimiter, create_shared_backend
+from .chunking import count_tokens
+
+# Provider statuses worth another attempt; other 4xx are the caller's fault and fail at once
+RETRYABLE_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+# Errors without a status code (connection resets, read timeouts) are retried when their name says so
+_TRANSIENT_ERROR_NAMES = ("Timeout", "Connection")
+
+
+class ModelUnavailableError(Exception):
+    """The model call could not be completed; `retry_after` (seconds) is a hint for the client."""
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ModelUnavailableError):
+    pass
+
+
+class ModelDeadlineError(ModelUnavailableError):
+    pass
+
+
+def error_status(error: Exception):
+    """HTTP status of a provider error (openai.APIStatusError, FakeModelError), or None."""
+    return getattr(error, "status_code", None)
+
+
+def retry_after_seconds(error: Exception):
+    """Retry-After of a provider error, from `retry_after` or the retry-after(-ms) response headers."""
+    value = getattr(error, "retry_after", None)
+    if value is not None:
+        return float(value)
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except ValueError:
+        pass  # HTTP-date form; fall back to the backoff schedule
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return any(name in type(error).__name__ for name in _TRANSIENT_ERROR_NAMES)
+
+
+async def _bucket_call(method, *args):
+    # SharedRateLimiter does backend round trips: keep them off the event loop
+    if isinstance(getattr(method, "__self__", None), SharedRateLimiter):
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+class TokenBucket:
+    """
+    Refills `rate_per_minute` units per minute up to `capacity` (one minute's worth by default).
+    `reserve` takes the units immediately, letting the level go negative, and returns how long the
+    caller must wait for the debt to be refilled. Callers are therefore served in arrival order.
+    `book` is `reserve` that also returns what was taken, so `refund` can hand exactly that back.
+    """
+    def __init__(self, rate_per_minute: float, capacity: float = None, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.level = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        return self.book(amount)[0]
+
+    def book(self, amount: float):
+        self._refill()
+        # A request larger than the bucket only waits for a full bucket, never forever
+        taken = min(amount, self.capacity)
+        self.level -= taken
+        return (0.0 if self.level >= 0 else -self.level / self.rate), taken
+
+    def refund(self, booking: float, amount: float = None):
+        """Gives back a booking (or `amount` of it; negative charges more)."""
+        self.adjust(-(booking if amount is None else amount))
+
+    def adjust(self, amount: float):
+        """Returns (negative amount) or charges units once the actual usage is known."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+class CircuitBreaker:
+    """
+    Closed → open after `failure_threshold` consecutive upstream failures; while open, calls fail
+    immediately. After `reset_seconds` one probe call is let through (half-open): success closes
+    the circuit, failure opens it again.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._clock = clock
+
+    def before_call(self):
+        """Raises CircuitOpenError while the circuit is open (or a half-open probe is in flight)."""
+        if self.state == "closed":
+            return
+        remaining = self._opened_at + self.reset_seconds - self._clock()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        metrics.inc("nexa_model_circuit_rejections_total")
+        raise CircuitOpenError(
+            f"Model upstream is unavailable ({self.failures} consecutive failures); failing fast",
+            retry_after=max(remaining, 1.0),
+        )
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                metrics.inc("nexa_model_circuit_opened_total")
+            self.state = "open"
+            self._opened_at = self._clock()
+
+    def release(self):
+        """A call ended without telling anything about upstream health (e.g. a 400 or a cancellation)."""
+        self._probing = False
+
+
+class ModelGateway:
+    """
+    Shared policy for every model call of a registry: RPM/TPM token buckets, retries with full
+    jitter that honour Retry-After, a per-attempt timeout within an overall deadline, optional
+    hedging, and a circuit breaker. A 429 also pauses every caller until its Retry-After has passed,
+    so one throttled request slows the whole process down instead of each one retrying blindly.
+    Args:
+        rpm_limit / tpm_limit (float): Requests / tokens per minute; 0 disables that bucket.
+        expected_completion_tokens (int): Added to the tiktoken prompt estimate when reserving TPM.
+        attempt_timeout (float): Seconds one attempt may take (to the first chunk when streaming).
+        deadline (float): Seconds for the whole call, including rate-limit waits and retries.
+        max_retries (int): Retries after the first attempt.
+        backoff_base / backoff_max (float): Exponential backoff bounds (full jitter).
+        hedge_after (float): Start a second identical request if the first has not answered after
+            this many seconds; the first success wins. The hedge books its own request and TPM
+            units, and is skipped when they are not free right now. 0 disables hedging.
+        failure_threshold / reset_seconds: Circuit breaker settings.
+        clock, sleep, seed: Injectable for deterministic tests.
+    """
+    def __init__(
+        self,
+        rpm_limit: float = 0,
+        tpm_limit: float = 0,
+        expected_completion_tokens: int = 1000,
+        attempt_timeout: float = 90.0,
+        deadline: float = 240.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        hedge_after: float = 0.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock=time.monotonic,
+        sleep=asyncio.sleep,
+        seed: int = None,
+    ):
+        self.requests = TokenBucket(rpm_limit, clock=clock) if rpm_limit else None
+        self.tokens = TokenBucket(tpm_limit, clock=clock) if tpm_limit else None
+        self.expected_completion_tokens = expected_completion_tokens
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds, clock=clock)
+        self._clock = clock
+        self._sleep = sleep
+        self._random = random.Random(seed)
+        self._paused_until = 0.0
+
+    def estimate_tokens(self, messages) -> int:
+        prompt = "\n".join(m.content for m in messages if isinstance(getattr(m, "content", None), str))
+        return count_tokens(prompt) + self.expected_completion_tokens
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        delay = self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = retry_after_seconds(error)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    async def _book(self, tokens: int):
+        """
+        Books one request and `tokens` TPM units without waiting.
+        Returns:
+            tuple: (seconds to wait, [(bucket, booking)] of what was taken, whether a shared limiter
+            had no window left and took nothing).
+        """
+        wait, bookings, full = 0.0, [], False
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is None or not amount:
+                continue
+            bucket_wait, booking = await _bucket_call(bucket.book, amount)
+            wait = max(wait, bucket_wait)
+            if booking is not None:
+                bookings.append((bucket, booking))
+            elif bucket_wait > 0:
+                full = True
+        return wait, bookings, full
+
+    async def _acquire(self, tokens: int, deadline_at: float):
+        """
+        Books one request and `tokens` TPM units (0 when a retry reuses the call's earlier
+        booking) and waits for them. If the deadline would pass first, or every shared window is
+        full, whatever was booked is handed back.
+        Returns:
+            The TPM booking, or None when no TPM units were booked.
+        """
+        wait, bookings, full = await self._book(tokens)
+        wait = max(wait, self._paused_until - self._clock())
+        if full or (wait > 0 and self._clock() + wait > deadline_at):
+            await self._refund(bookings)
+            raise ModelDeadlineError("Model call deadline would pass while waiting for rate limits", retry_after=wait)
+        if wait > 0:
+            metrics.observe("nexa_model_rate_limit_wait_seconds", wait)
+            await self._sleep(wait)
+        return next((booking for bucket, booking in bookings if bucket is self.tokens), None)
+
+    async def _refund(self, bookings):
+        for bucket, booking in bookings:
+            await _bucket_call(bucket.refund, booking)
+
+    async def _settle(self, result, estimated_tokens: int, booking):
+        # Replace the estimate with the real usage so the TPM bucket tracks what was actually spent
+        usage = getattr(result, "usage", None)
+        if self.tokens is not None and booking is not None and usage is not None:
+            await _bucket_call(self.tokens.refund, booking, estimated_tokens - usage.prompt_tokens - usage.completion_tokens)
+
+    def _on_error(self, error: Exception):
+        if error_status(error) == 429:
+            retry_after = retry_after_seconds(error)
+            if retry_after:
+                self._paused_until = max(self._paused_until, self._clock() + retry_after)
+            self.breaker.release()  # throttling says nothing about upstream health
+        elif is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    async def call(self, attempt_fn, messages, hedge: bool = True):
+        """
+        Runs `attempt_fn()` (a coroutine factory for one model request) under the gateway policy.
+        `hedge=False` never starts a duplicate request (used for streams).
+
+        Every attempt takes a request from the RPM bucket, but the TPM estimate is reserved once
+        per call: retries carry it over, a success settles it against the real usage, and a call
+        that gives up (error, deadline, open circuit, cancellation) hands it back.
+        Raises:
+            CircuitOpenError: The upstream is marked unhealthy.
+            ModelDeadlineError: The deadline passed (rate-limit waits, slow attempts, retries).
+            Exception: The last provider error when it is not retryable or retries are exhausted.
+        """
+        estimated = self.estimate_tokens(messages)
+        deadline_at = self._clock() + self.deadline
+        attempt = 0
+        booking = None  # TPM units this call holds
+        try:
+            while True:
+                if attempt and self._clock() >= deadline_at:
+                    raise ModelDeadlineError(f"Model call deadline of {self.deadline}s passed after {attempt} attempts")
+                self.breaker.before_call()
+                try:
+                    acquired = await self._acquire(0 if booking is not None else estimated, deadline_at)
+                    booking = booking if booking is not None else acquired
+                    result = await self._attempt(attempt_fn, deadline_at, hedge, estimated)
+                except (ModelDeadlineError, asyncio.CancelledError):
+                    self.breaker.release()
+                    raise
+                except Exception as e:
+                    self._on_error(e)
+                    if not is_retryable(e) or attempt >= self.max_retries:
+                        if isinstance(e, asyncio.TimeoutError):
+                            raise ModelDeadlineError(f"Model call timed out after {attempt + 1} attempts") from e
+                        raise
+                    delay = self.backoff(attempt, e)
+                    if self._clock() + delay > deadline_at:
+                        raise ModelDeadlineError(f"Model call deadline passed after {attempt + 1} attempts: {e}", retry_after=delay) from e
+                    attempt += 1
+                    metrics.inc("nexa_model_retries_total", reason=str(error_status(e) or type(e).__name__))
+                    await self._sleep(delay)
+                    continue
+                self.breaker.record_success()
+                settled, booking = booking, None
+                await self._settle(result, estimated, settled)
+                return result
+        finally:
+            if booking is not None:
+                await self._refund([(self.tokens, booking)])
+
+    async def _attempt(self, attempt_fn, deadline_at: float, hedge: bool, tokens: int):
+        timeout = max(min(self.attempt_timeout, deadline_at - self._clock()), 0.0)
+        if not hedge or not self.hedge_after or self.hedge_after >= timeout:
+            return await asyncio.wait_for(attempt_fn(), timeout)
+        return await asyncio.wait_for(self._hedged(attempt_fn, tokens), timeout)
+
+    async def _hedged(self, attempt_fn, tokens: int):
+        # The hedge is a real upstream request: it books its own RPM/TPM units, only hedges when
+        # they are free now, and hands them back if it is cancelled before finishing
+        tasks = [asyncio.create_task(attempt_fn())]
+        hedge_bookings = []
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if done:
+                return tasks[0].result()
+            wait, hedge_bookings, full = await self._book(tokens)
+            if wait > 0 or full:
+                await self._refund(hedge_bookings)
+                hedge_bookings = []
+                metrics.inc("nexa_model_hedges_skipped_total")
+                return await tasks[0]
+            metrics.inc("nexa_model_hedges_total")
+            tasks.append(asyncio.create_task(attempt_fn()))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            hedge_unfinished = len(tasks) > 1 and not tasks[1].done()
+            for task in tasks:
+                task.cancel()
+            if hedge_unfinished:
+                await self._refund(hedge_bookings)
+
+    async def stream(self, stream_fn, messages):
+        """
+        Streaming counterpart of `call`: the policy applies until the first chunk arrives.
+        Once output has been forwarded the call cannot be retried, so later errors propagate.
+        """
+        first = {}
+
+        async def start():
+            stream = stream_fn()
+            first["chunk"] = await stream.__anext__()
+            return stream
+
+        stream = await self.call(start, messages, hedge=False)
+        yield first["chunk"]
+        async for chunk in stream:
+            yield chunk
+
+
+def create_model_gateway():
+    """ModelGateway configured from settings; with a shared backend the RPM/TPM limits hold across workers."""
+    gateway = ModelGateway(
+        rpm_limit=settings.model_rpm_limit,
+        tpm_limit=settings.model_tpm_limit,
+        expected_completion_tokens=settings.model_expected_completion_tokens,
+        attempt_timeout=settings.model_attempt_timeout_seconds,
+        deadline=settings.model_call_deadline_seconds,
+        max_retries=settings.model_max_retries,
+        backoff_base=settings.model_retry_backoff_seconds,
+        backoff_max=settings.model_retry_backoff_max_seconds,
+        hedge_after=settings.model_hedge_after_seconds,
+        failure_threshold=settings.model_circuit_failure_threshold,
+        reset_seconds=settings.model_circuit_reset_seconds,
+    )
+    backend = create_shared_backend()
+    if backend is not None:
+        # The local buckets stay as fallbacks while the backend is unreachable
+        if settings.model_rpm_limit:
+            gateway.requests = SharedRateLimiter(backend, "ratelimit:requests", settings.model_rpm_limit, fallback=gateway.requests)
+        if settings.model_tpm_limit:
+            gateway.tokens = SharedRateLimiter(backend, "ratelimit:tokens", settings.model_tpm_limit, fallback=gateway.tokens)
+    return gateway
+
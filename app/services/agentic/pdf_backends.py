@@ -0,0 +1,109 @@
+import re
+from app.core.config import settings
+
+# pypdf and pdfplumber (pdfminer) are imported on first use: most requests carry no PDF, and
+# importing them costs more than the rest of the ingestion package together.
+
+# Path-construction operators in a page content stream: rectangles and line segments.
+# Ruled tables and form-like layouts are drawn with many of them; running text is not.
+_DRAWING_OPS = re.compile(rb"(?<![A-Za-z])(?:re|l)(?![A-Za-z])")
+
+
+def pdf_page_count(file_path: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(file_path).pages)
+
+
+def _page_range(total: int, first_page: int = 1, last_page: int = None):
+    last_page = total if last_page is None else min(last_page, total)
+    return range(max(first_page, 1), last_page + 1)
+
+
+class PypdfBackend:
+    """Fast text extraction with pypdf; reading order follows the content stream."""
+    name = "pypdf"
+
+    def extract_pages(self, file_path: str, first_page: int = 1, last_page: int = None):
+        """
+        Returns:
+            list[tuple[int, str, str]]: (page number, text, backend name) for each page in the range.
+        """
+        from pypdf import PdfReader
+        reader = PdfReader(file_path)
+        return [
+            (number, reader.pages[number - 1].extract_text() or "", self.name)
+            for number in _page_range(len(reader.pages), first_page, last_page)
+        ]
+
+
+class PdfplumberBackend:
+    """Layout-aware extraction (characters grouped by position); much slower than pypdf."""
+    name = "pdfplumber"
+
+    def extract_pages(self, file_path: str, first_page: int = 1, last_page: int = None, only=None):
+        """
+        Args:
+            only (set|None): Restrict extraction to these page numbers within the range.
+        """
+        if last_page is None:
+            last_page = pdf_page_count(file_path)
+        numbers = [n for n in range(max(first_page, 1), last_page + 1) if only is None or n in only]
+        import pdfplumber
+        # Restricting `pages` keeps pdfplumber from building layout objects for the other pages
+        with pdfplumber.open(file_path, pages=numbers) as pdf:
+            return [(page.page_number, page.extract_text() or "", self.name) for page in pdf.pages]
+
+
+class AutoPdfBackend:
+    """
+    pypdf for every page, re-extracting with pdfplumber only the pages a cheap heuristic flags as
+    layout-sensitive: many drawing operators (ruled tables, forms) or a content stream that pypdf
+    could not turn into text.
+    """
+    name = "auto"
+
+    def __init__(self, min_drawing_ops: int = None):
+        self.min_drawing_ops = settings.pdf_layout_min_drawing_ops if min_drawing_ops is None else min_drawing_ops
+
+    def needs_layout(self, page, text: str) -> bool:
+        try:
+            contents = page.get_contents()
+            data = contents.get_data() if contents is not None else b""
+        except Exception:
+            return True
+        if not text.strip():
+            # Drawn or oddly encoded text that pypdf missed; skip pages that are truly empty
+            return b"Tj" in data or b"TJ" in data
+        return len(_DRAWING_OPS.findall(data)) >= self.min_drawing_ops
+
+    def extract_pages(self, file_path: str, first_page: int = 1, last_page: int = None):
+        from pypdf import PdfReader
+        reader = PdfReader(file_path)
+        pages = {}
+        layout_pages = set()
+        for number in _page_range(len(reader.pages), first_page, last_page):
+            page = reader.pages[number - 1]
+            text = page.extract_text() or ""
+            pages[number] = (number, text, PypdfBackend.name)
+            if self.needs_layout(page, text):
+                layout_pages.add(number)
+        if layout_pages:
+            relaid = PdfplumberBackend().extract_pages(file_path, min(layout_pages), max(layout_pages), only=layout_pages)
+            pages.update((page[0], page) for page in relaid)
+        return [pages[number] for number in sorted(pages)]
+
+
+PDF_BACKENDS = {
+    PypdfBackend.name: PypdfBackend,
+    PdfplumberBackend.name: PdfplumberBackend,
+    AutoPdfBackend.name: AutoPdfBackend,
+}
+
+
+def get_pdf_backend(name: str = None):
+    """Returns a backend instance by name (defaults to `settings.pdf_backend`)."""
+    name = name or settings.pdf_backend
+    try:
+        return PDF_BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown PDF backend: {name}. Choose one of {', '.join(PDF_BACKENDS)}")
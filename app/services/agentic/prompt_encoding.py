@@ -0,0 +1,103 @@
+import json
+import re
+from collections import Counter
+from .blocks import TextBlocks
+
+# Only the first/last line of a block, and only short lines, are header/footer candidates.
+EDGE_LINES = 1
+MAX_EDGE_LINE_CHARS = 100
+_DIGITS = re.compile(r"\d+")
+
+
+def normalize_whitespace(text: str) -> str:
+    return " ".join(str(text).split())
+
+
+def _edge_key(line: str) -> str:
+    # "Page 3 of 40" and "Page 4 of 40" are the same footer
+    return _DIGITS.sub("#", normalize_whitespace(line)).casefold()
+
+
+def strip_repeated_edges(text_blocks, min_blocks: int = 3, ratio: float = 0.5):
+    """
+    Removes header/footer lines repeated across PDF pages (`page_*` anchors; section-level blocks
+    from TXT/DOCX often start with similar headings, which must be kept).
+    A short line at the top or bottom of a page is dropped when its digit-insensitive form appears
+    at the edge of at least `ratio` of the pages (and at least `min_blocks` of them).
+    Returns:
+        TextBlocks: New blocks; inputs with fewer than `min_blocks` blocks are returned unchanged.
+    """
+    text_blocks = TextBlocks.from_dicts(text_blocks)
+    if len(text_blocks) < min_blocks:
+        return text_blocks
+    split = [
+        str(text).splitlines() if str(anchor).startswith("page_") else []
+        for text, anchor in text_blocks.pairs()
+    ]
+    counts = Counter()
+    for lines in split:
+        if len(lines) <= 2 * EDGE_LINES:
+            continue  # no body to separate headers/footers from
+        edges = {
+            _edge_key(l) for l in lines[:EDGE_LINES] + lines[-EDGE_LINES:]
+            if l.strip() and len(l) <= MAX_EDGE_LINE_CHARS
+        }
+        counts.update(edges)
+    pages = sum(1 for lines in split if lines)
+    threshold = max(min_blocks, int(pages * ratio))
+    repeated = {key for key, n in counts.items() if n >= threshold}
+    if not repeated:
+        return text_blocks
+
+    cleaned = TextBlocks()
+    for (text, anchor), lines in zip(text_blocks.pairs(), split):
+        if len(lines) <= 2 * EDGE_LINES:
+            cleaned.append(text, anchor)
+            continue
+        head = EDGE_LINES
+        tail_start = len(lines) - EDGE_LINES
+        kept = [
+            line for i, line in enumerate(lines)
+            if not ((i < head or i >= tail_start) and len(line) <= MAX_EDGE_LINE_CHARS and _edge_key(line) in repeated)
+        ]
+        cleaned.append("\n".join(kept), anchor)
+    return cleaned
+
+
+def encode_text_blocks(text_blocks) -> str:
+    """
+    Line-oriented prompt encoding: one `[anchor] text` line per non-empty block, whitespace
+    collapsed and repeated headers/footers removed.
+    """
+    lines = []
+    for text, anchor in strip_repeated_edges(text_blocks).pairs():
+        text = normalize_whitespace(text)
+        if text:
+            lines.append(f"[{anchor}] {text}")
+    return "\n".join(lines)
+
+
+def _summarize_source(metadata: dict) -> str:
+    file_type = metadata.get("file_type", "unknown")
+    if "pages" in metadata:
+        return f"{file_type} ({len(metadata['pages'])} pages)"
+    if "paragraphs" in metadata:
+        paragraphs = metadata["paragraphs"]
+        return f"{file_type} ({paragraphs if isinstance(paragraphs, int) else len(paragraphs)} paragraphs)"
+    if "lines" in metadata:
+        return f"{file_type} ({metadata['lines']} lines)"
+    if "url" in metadata:
+        return f"{file_type} ({metadata['url']})"
+    return file_type
+
+
+def summarize_metadata(metadata: dict) -> str:
+    """One-line metadata summary instead of the per-page/paragraph listing."""
+    if "files" in metadata:
+        return f"{len(metadata['files'])} files: " + "; ".join(_summarize_source(m) for m in metadata["files"])
+    return _summarize_source(metadata)
+
+
+def encode_json(data) -> str:
+    """Compact JSON (no indentation or spaces after separators, UTF-8 kept)."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
@@ -0,0 +1,212 @@
+import asyncio
+import functools
+import importlib
+import os
+import time
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.cache import ResultCache
+from app.services.company_profiles import create_company_profile_store
+from app.services.shared_state import create_shared_backend
+from .chunking import count_tokens
+from .coercion import ValidationStats
+from .ingestion import IngestionExecutor
+from .model_gateway import create_model_gateway
+from .extractor_agent import ExtractorAgent
+from .validator_agent import ValidatorAgent
+from .researcher_agent import ResearcherAgent
+
+# Imported by model_client() for the real backend; warmup() loads them in a thread first
+MODEL_CLIENT_MODULES = ("httpx", "autogen_ext.models.openai")
+
+
+def _import_model_client_modules():
+    for name in MODEL_CLIENT_MODULES:
+        importlib.import_module(name)
+
+
+class AgentRegistry:
+    """
+    Application-lifetime holder for the model clients and agents used by the pipeline.
+
+    A single pooled httpx.AsyncClient is shared by every model client, so connections and
+    TLS sessions to the provider are reused across requests. Model clients are created on
+    first use and cached per model name. The agents are stateless and long-lived: each is built
+    once, on the first request that runs its stage, and then shared.
+
+    With `model_backend="fake"` every agent gets an offline FakeChatCompletionClient configured from
+    the fake_model_* settings instead, and no API key is needed.
+
+    Unless `model_gateway_enabled` is off, every model client is wrapped in a
+    GatewayChatCompletionClient sharing one ModelGateway (rate limits, retries, deadlines, circuit
+    breaker), so concurrent requests are throttled and fail fast together.
+
+    The model client libraries (openai, autogen_ext, httpx) are imported when the first client is
+    built, not when the app is imported; see warmup() to pay that cost at startup instead.
+    """
+    def __init__(self, api_key: str = None, model: str = None, http_client: "httpx.AsyncClient" = None, model_backend: str = None):
+        self._api_key = api_key
+        self.model = model or settings.openai_model
+        self.model_backend = model_backend or settings.model_backend
+        self._http_client = http_client
+        self._owns_http_client = http_client is None
+        self._model_clients = {}
+        self._agents = {}
+        self.gateway = create_model_gateway() if settings.model_gateway_enabled else None
+        self._ingestion = None
+        self._cache = None
+        self._partials_cache = None
+        self._company_profiles = None
+        self.validation_stats = ValidationStats()  # how this registry's validator resolved each object
+
+    @property
+    def api_key(self):
+        api_key = self._api_key or os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY must be set in environment or passed explicitly.")
+        return api_key
+
+    @property
+    def http_client(self):
+        if self._http_client is None:
+            import httpx
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.openai_max_connections,
+                    max_keepalive_connections=settings.openai_max_keepalive_connections,
+                    keepalive_expiry=settings.openai_keepalive_expiry_seconds,
+                ),
+                timeout=httpx.Timeout(settings.openai_timeout_seconds),
+            )
+        return self._http_client
+
+    def model_client(self, model: str = None):
+        """Returns the shared model client for `model` (defaults to the configured model)."""
+        model = model or self.model
+        client = self._model_clients.get(model)
+        if client is None:
+            if self.model_backend == "fake":
+                from .fake_model_client import FakeChatCompletionClient
+                client = FakeChatCompletionClient(
+                    latency_ms=settings.fake_model_latency_ms,
+                    latency_jitter_ms=settings.fake_model_latency_jitter_ms,
+                    latency_distribution=settings.fake_model_latency_distribution,
+                    tokens_per_second=settings.fake_model_tokens_per_second,
+                    failure_rate=settings.fake_model_failure_rate,
+                    seed=settings.fake_model_seed,
+                )
+            else:
+                from autogen_ext.models.openai import OpenAIChatCompletionClient
+                # The gateway owns retries; the client's own would multiply them
+                max_retries = {"max_retries": 0} if self.gateway is not None else {}
+                client = OpenAIChatCompletionClient(model=model, api_key=self.api_key, http_client=self.http_client, **max_retries)
+            if self.gateway is not None:
+                from .gateway_client import GatewayChatCompletionClient
+                client = GatewayChatCompletionClient(client, self.gateway)
+            self._model_clients[model] = client
+        return client
+
+    @property
+    def ingestion(self):
+        if self._ingestion is None:
+            self._ingestion = IngestionExecutor()
+        return self._ingestion
+
+    @property
+    def cache(self):
+        """Pipeline result cache, or None when disabled in settings."""
+        if self._cache is None and settings.cache_enabled:
+            self._cache = ResultCache(
+                max_entries=settings.cache_max_entries,
+                max_bytes=settings.cache_max_bytes,
+                ttl_seconds=settings.cache_ttl_seconds,
+                sqlite_path=settings.cache_sqlite_path,
+                backend=create_shared_backend(),
+                lease_seconds=settings.shared_lease_seconds,
+            )
+        return self._cache
+
+    @property
+    def partials_cache(self):
+        """Per-file / per-chunk results for incremental extraction, or None when disabled in settings."""
+        if self._partials_cache is None and settings.cache_enabled and settings.incremental_enabled:
+            self._partials_cache = ResultCache(
+                max_entries=settings.incremental_cache_max_entries,
+                max_bytes=settings.incremental_cache_max_bytes,
+                ttl_seconds=settings.cache_ttl_seconds,
+                sqlite_path=settings.cache_sqlite_path,
+                backend=create_shared_backend(),
+                namespace="partials",
+            )
+        return self._partials_cache
+
+    @property
+    def company_profiles(self):
+        """Store of researched company profiles, or None when disabled in settings."""
+        if self._company_profiles is None:
+            self._company_profiles = create_company_profile_store()
+        return self._company_profiles
+
+    # The LLM-backed agents invoke the model statelessly (see StatelessAgent), so one instance of
+    # each is built on first use and shared by every request for the registry's lifetime.
+    def _agent(self, key, factory):
+        agent = self._agents.get(key)
+        if agent is None:
+            agent = self._agents[key] = factory(model_client=self.model_client())
+        return agent
+
+    def extractor(self):
+        return self._agent("extractor", ExtractorAgent)
+
+    def validator(self):
+        return self._agent("validator", functools.partial(ValidatorAgent, stats=self.validation_stats))
+
+    def researcher(self):
+        return self._agent("researcher", ResearcherAgent)
+
+    async def warmup(self) -> dict:
+        """
+        Pays the deferred startup costs up front: parser libraries and ingestion workers, the
+        tokenizer, the model client libraries and the three agents. The app runs it at startup
+        according to `startup_warmup`. The lazily built pools, clients and agents are created on
+        the event loop, as a request would, so a request arriving mid-warmup reuses them instead of
+        building a second copy; only the imports and the tokenizer load run in a thread. Without
+        an API key the agents are left to the first request, which reports the missing key as usual.
+        Returns:
+            dict: { 'seconds', 'process_workers', 'agents' }
+        """
+        started = time.perf_counter()
+        process_workers = await self.ingestion.warmup()
+        await asyncio.to_thread(count_tokens, "warmup", self.model)
+        if self.model_backend != "fake":
+            await asyncio.to_thread(_import_model_client_modules)
+        agents = []
+        try:
+            for key, build in (("extractor", self.extractor), ("validator", self.validator), ("researcher", self.researcher)):
+                build()
+                agents.append(key)
+        except ValueError:
+            pass
+        seconds = time.perf_counter() - started
+        metrics.observe("nexa_startup_warmup_seconds", seconds)
+        return {"seconds": round(seconds, 3), "process_workers": process_workers, "agents": agents}
+
+    async def aclose(self):
+        """Releases pooled connections and ingestion workers. Safe to call more than once."""
+        if self._ingestion is not None:
+            await self._ingestion.aclose()
+            self._ingestion = None
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+        if self._partials_cache is not None:
+            self._partials_cache.close()
+            self._partials_cache = None
+        if self._company_profiles is not None:
+            self._company_profiles.close()
+            self._company_profiles = None
+        self._agents.clear()
+        self._model_clients.clear()
+        if self._http_client is not None and self._owns_http_client:
+            await self._http_client.aclose()
+        self._http_client = None
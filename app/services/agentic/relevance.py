@@ -0,0 +1,162 @@
+import math
+import re
+from collections import Counter
+from app.core.config import settings
+from .blocks import TextBlocks
+from .chunking import BLOCK_OVERHEAD_TOKENS, count_tokens
+
+# Query stems per ClientContext field (English and Spanish). A stem matches every token that
+# starts with it, so "integrat" covers integrate/integration/integrating; a trailing "$" makes it
+# match that exact token only ("inc$" is the legal form, not include/increase/income).
+FIELD_QUERIES = {
+    "client_name": ["company", "client", "customer", "corporat", "inc$", "ltd$", "llc$", "s.a$", "s.l$", "group", "empresa",
+                    "cliente", "compañ"],
+    "industry": ["industr", "sector", "market", "retail", "health", "financ", "bank", "insur", "logistic", "manufactur",
+                 "technolog", "telecom", "energ", "pharma", "mercado", "salud", "banca", "logístic"],
+    "location": ["headquarter", "located", "based", "city", "country", "region", "office", "site", "global", "europe",
+                 "america", "sede", "ubicad", "país", "ciudad", "oficina", "regional"],
+    "business_overview": ["business", "operat", "overview", "mission", "service", "product", "customer", "platform",
+                          "negocio", "operacion", "servicio", "producto", "misión"],
+    "objectives": ["objectiv", "goal", "aim", "improv", "reduc", "increas", "integrat", "migrat", "moderniz", "optimi",
+                   "automat", "scope", "requirement", "deliver", "objetivo", "meta$", "metas$", "mejor", "reducir", "integrar",
+                   "escalar", "alcance", "requisito"],
+    "company_info": ["employee", "revenue", "founded", "size", "position", "offering", "portfolio", "leader", "subsidiar",
+                     "empleado", "ingreso", "fundad", "tamaño", "líder"],
+    "additional_context_questions": ["unclear", "tbd", "tbc", "question", "clarif", "assum", "pending", "unknown",
+                                     "budget", "timeline", "pregunta", "aclar", "pendiente", "presupuesto", "plazo"],
+    "potential_future_opportunities": ["future", "roadmap", "expan", "phase", "opportunit", "growth", "scalab", "scaling$", "later$",
+                                       "futur", "expansión", "fase", "oportunidad", "crecimiento"],
+}
+
+_TOKEN = re.compile(r"[^\W_]+(?:\.[^\W_]+)*", re.UNICODE)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def _tokenize(text: str):
+    return _TOKEN.findall(str(text).casefold())
+
+
+class BM25Scorer:
+    """Okapi BM25 over a fixed set of blocks, with prefix-matched query stems."""
+    def __init__(self, texts):
+        self.docs = [Counter(_tokenize(t)) for t in texts]
+        self.lengths = [sum(d.values()) for d in self.docs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        self.vocabulary = set().union(*self.docs) if self.docs else set()
+        self._matches = {}
+
+    def _terms_for(self, stem: str):
+        terms = self._matches.get(stem)
+        if terms is None:
+            if stem.endswith("$"):
+                terms = [stem[:-1]] if stem[:-1] in self.vocabulary else []
+            else:
+                terms = [t for t in self.vocabulary if t.startswith(stem)]
+            self._matches[stem] = terms
+        return terms
+
+    def scores(self, stems):
+        """BM25 score of every block for the query made of `stems`."""
+        n = len(self.docs)
+        totals = [0.0] * n
+        for stem in stems:
+            terms = self._terms_for(stem)
+            if not terms:
+                continue
+            tfs = [sum(doc.get(t, 0) for t in terms) for doc in self.docs]
+            df = sum(1 for tf in tfs if tf)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for i, tf in enumerate(tfs):
+                if tf:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / (self.avg_length or 1))
+                    totals[i] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return totals
+
+
+def effective_token_budget() -> int:
+    """relevance_token_budget, raised to one extraction chunk so the filter never undercuts map-reduce."""
+    return max(settings.relevance_token_budget, settings.extract_chunk_tokens)
+
+
+def select_relevant_blocks(text_blocks, token_budget: int = None, top_k: int = None, min_score: float = None,
+                           keep_leading: int = None, model: str = None):
+    """
+    Keeps the blocks most relevant to the ClientContext fields, within a token budget.
+
+    Each block is scored with BM25 against every field query, normalized per field, so every
+    field contributes its best blocks. Blocks are picked round-robin across the fields' rankings
+    until `top_k` blocks or `token_budget` tokens are reached; blocks scoring at or below
+    `min_score` are never picked. The first `keep_leading` blocks (title page, cover letter)
+    are always kept. Inputs that already fit in the budget are returned unchanged. The default
+    budget is effective_token_budget(); `top_k` 0 means no block limit.
+    Returns:
+        tuple[TextBlocks, dict]: Kept blocks in document order, and stats
+            { 'blocks_in', 'blocks_kept', 'tokens_in', 'tokens_kept', 'dropped_fraction', 'budget_limited' }
+            ('budget_limited': relevant blocks were left out because of the budget or `top_k`).
+    """
+    token_budget = effective_token_budget() if token_budget is None else token_budget
+    top_k = settings.relevance_top_k if top_k is None else top_k
+    min_score = settings.relevance_min_score if min_score is None else min_score
+    keep_leading = settings.relevance_keep_leading_blocks if keep_leading is None else keep_leading
+    model = model or settings.openai_model
+
+    blocks = TextBlocks.from_dicts(text_blocks)
+    top_k = top_k or len(blocks)
+    tokens = [count_tokens(text, model) + BLOCK_OVERHEAD_TOKENS for text in blocks.texts]
+    tokens_in = sum(tokens)
+    if tokens_in <= token_budget and len(blocks) <= top_k:
+        return blocks, _stats(len(blocks), len(blocks), tokens_in, tokens_in)
+
+    scorer = BM25Scorer(blocks.texts)
+    rankings = []
+    for stems in FIELD_QUERIES.values():
+        field_scores = scorer.scores(stems)
+        top = max(field_scores, default=0.0)
+        if top <= 0:
+            continue
+        normalized = [s / top for s in field_scores]
+        rankings.append([i for i in sorted(range(len(blocks)), key=lambda i: -normalized[i]) if normalized[i] > min_score])
+
+    selected = set()
+    used = 0
+    budget_limited = False
+    for i in range(min(keep_leading, len(blocks))):
+        selected.add(i)
+        used += tokens[i]
+    cursors = [0] * len(rankings)
+    while rankings and len(selected) < top_k:
+        progressed = False
+        for r, ranking in enumerate(rankings):
+            while cursors[r] < len(ranking) and ranking[cursors[r]] in selected:
+                cursors[r] += 1
+            if cursors[r] >= len(ranking):
+                continue
+            i = ranking[cursors[r]]
+            cursors[r] += 1
+            progressed = True
+            if used + tokens[i] <= token_budget and len(selected) < top_k:
+                selected.add(i)
+                used += tokens[i]
+            else:
+                budget_limited = True
+        if not progressed:
+            break
+    if len(selected) >= top_k and any(i not in selected for ranking in rankings for i in ranking):
+        budget_limited = True
+
+    kept = TextBlocks()
+    for i in sorted(selected):
+        kept.append(blocks.texts[i], blocks.anchors[i])
+    return kept, _stats(len(blocks), len(kept), tokens_in, used, budget_limited)
+
+
+def _stats(blocks_in: int, blocks_kept: int, tokens_in: int, tokens_kept: int, budget_limited: bool = False) -> dict:
+    return {
+        "blocks_in": blocks_in,
+        "blocks_kept": blocks_kept,
+        "tokens_in": tokens_in,
+        "tokens_kept": tokens_kept,
+        "dropped_fraction": round(1 - tokens_kept / tokens_in, 4) if tokens_in else 0.0,
+        "budget_limited": budget_limited,
+    }
@@ -2,27 +2,29 @@
 import os
 import json
 import re
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from app.core.metrics import metrics
+from .prompt_encoding import encode_json
+from .stateless_agent import StatelessAgent
 
 class ResearcherAgent:
-    def __init__(self, name="researcher", api_key: str = None, system_message="Enriches missing/ambiguous fields using public info."):
-        if api_key is None:
-            api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY must be set in environment or passed explicitly.")
-        self.model_client = OpenAIChatCompletionClient(model="gpt-4o", api_key=api_key)
-        self.agent = AssistantAgent(
-            name=name,
-            model_client=self.model_client,
-            system_message=system_message,
-        )
-    async def enrich(self, data: dict, allowed: bool = True):
+    def __init__(self, name="researcher", api_key: str = None, system_message="Enriches missing/ambiguous fields using public info.", model_client=None):
+        if model_client is None:
+            if api_key is None:
+                api_key = os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY must be set in environment or passed explicitly.")
+            from autogen_ext.models.openai import OpenAIChatCompletionClient  # heavy: only without an injected client
+            model_client = OpenAIChatCompletionClient(model="gpt-4o", api_key=api_key)
+        self.model_client = model_client
+        self.agent = StatelessAgent(name, self.model_client, system_message)
+    async def enrich(self, data: dict, allowed: bool = True, fields: list = None):
         """
         Enriches missing/ambiguous fields in the JSON object using public information, only if allowed.
         Args:
             data (dict): The JSON object to enrich.
             allowed (bool): Whether enrichment is permitted.
+            fields (list[str]|None): Only research these fields; `data` then just needs the
+                company identity (client_name, industry, location), so the call can start before validation.
         Returns:
             dict: Enriched JSON object with source references for each enriched field.
         """
@@ -33,7 +35,8 @@ class ResearcherAgent:
             "You are a research agent. For the following business context JSON, enrich any missing or ambiguous fields using only publicly available information. "
             "For each field you enrich, provide a source reference (URL or citation). Do not fabricate information. "
             "If you cannot find reliable public information, leave the field empty and add a note explaining why.\n"
-            f"JSON: {data}\n"
+            f"JSON: {encode_json(data)}\n"
+            + (f"Fields to research: {', '.join(fields)}\n" if fields else "") +
             "Industry refers to the primary sector in which the client operates (e.g., Healthcare, Finance, Technology).\n"
             "Location refers to the primary geographic location of the client (e.g., city, country).\n"
             "Business Overview is a brief summary of the client's business operations and goals. Try to be complete and thorough.\n"
@@ -43,8 +46,10 @@ class ResearcherAgent:
             "Potential Future Opportunities are possible areas for growth or collaboration that could be explored in the future.\n"
             "Return only the enriched JSON object, with a 'sources' key for each enriched field."
         )
-        result = await self.agent.run(task=prompt)
-        content = result.messages[-1].content
+        with metrics.model_call("researcher", prompt) as call:
+            result = await self.agent.run(prompt)
+            call.record_usage(result)
+        content = result.content
         try:
             return json.loads(content)
         except Exception as e:
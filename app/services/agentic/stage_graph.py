@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+
+class StageGraph:
+    """
+    Small dependency-aware executor for pipeline stages.
+
+    Each stage is a coroutine function taking the dict of results produced so far. A stage starts
+    as soon as every stage it runs `after` has finished, so independent stages overlap; results
+    are yielded in completion order. If a stage raises, the stages still running are cancelled
+    and the error propagates. Stages must be added after their dependencies, which keeps the
+    graph acyclic by construction.
+    """
+    def __init__(self, results: dict = None):
+        self.results = dict(results or {})
+        self._stages = {}
+
+    def add(self, name: str, fn, after=()):
+        """
+        Args:
+            name (str): Stage name (also the key of its result).
+            fn (callable): `async fn(results) -> result`.
+            after (iterable[str]): Stages (or names already in `results`) that must finish first.
+        """
+        if name in self._stages or name in self.results:
+            raise ValueError(f"Stage {name!r} is already defined")
+        unknown = [dep for dep in after if dep not in self._stages and dep not in self.results]
+        if unknown:
+            raise ValueError(f"Stage {name!r} depends on undefined stages: {unknown}")
+        self._stages[name] = (fn, tuple(after))
+        return self
+
+    async def run(self):
+        """Async generator of (name, result, elapsed_ms) as each stage finishes."""
+        pending = dict(self._stages)
+        running = {}
+
+        async def timed(name, fn):
+            started = time.perf_counter()
+            result = await fn(self.results)
+            return name, result, round((time.perf_counter() - started) * 1000, 1)
+
+        try:
+            while pending or running:
+                for name, (fn, after) in list(pending.items()):
+                    if all(dep in self.results for dep in after):
+                        running[asyncio.create_task(timed(name, fn))] = name
+                        del pending[name]
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    del running[task]
+                    name, result, elapsed_ms = task.result()
+                    self.results[name] = result
+                    yield name, result, elapsed_ms
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
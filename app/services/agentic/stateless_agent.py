@@ -0,0 +1,39 @@
+class StatelessAgent:
+    """
+    Single-turn replacement for AssistantAgent.run in the pipeline agents.
+
+    Every call sends [system message, user prompt] straight to the model client and keeps nothing
+    afterwards, so one instance can be shared by concurrent requests for the lifetime of the
+    process: no history accumulates and no context leaks from one request into the next.
+    The SystemMessage is built once and reused by every call. autogen_core is imported when the
+    first agent is built rather than with the module, so importing the app stays cheap.
+    """
+    def __init__(self, name: str, model_client: "ChatCompletionClient", system_message: str):
+        from autogen_core.models import SystemMessage, UserMessage
+        self.name = name
+        self.model_client = model_client
+        self.system_message = SystemMessage(content=system_message)
+        self._user_message = UserMessage
+
+    def messages(self, prompt: str) -> list:
+        return [self.system_message, self._user_message(content=prompt, source="user")]
+
+    async def run(self, prompt: str, json_output=None, on_token=None) -> "CreateResult":
+        """
+        Args:
+            prompt (str): The user turn.
+            json_output (bool|type|None): Passed to the model client (JSON mode / structured output).
+            on_token (callable|None): If given, the reply is streamed and each text delta passed to it.
+        Returns:
+            CreateResult: The final reply, with `content` and `usage`.
+        """
+        messages = self.messages(prompt)
+        if on_token is None:
+            return await self.model_client.create(messages, json_output=json_output)
+        result = None
+        async for item in self.model_client.create_stream(messages, json_output=json_output):
+            if isinstance(item, str):
+                on_token(item)
+            else:
+                result = item
+        return result
@@ -0,0 +1,300 @@
+import asyncio
+import hashlib
+import ipaddress
+import json
+import os
+import socket
+import tempfile
+import time
+from urllib.parse import urlsplit
+from app.core.config import settings
+from app.core.metrics import metrics
+
+REDIRECT_STATUS_CODES = (301, 302, 303, 307, 308)
+
+
+class UrlFetchError(Exception):
+    pass
+
+
+async def resolve_host(host: str) -> list:
+    """IP addresses `host` resolves to (the system resolver, off the event loop)."""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%")[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class HttpCacheStore:
+    """
+    On-disk store for conditional GETs: per URL, the body plus the ETag / Last-Modified validators.
+    Files are named by the SHA-256 of the URL and written atomically (temp file + rename), so
+    concurrent requests and processes never read a half-written entry. Blocking; call it from a thread.
+
+    Every write prunes the store: entries not used for `max_age_seconds` are dropped, then the least
+    recently used ones until the store fits in `max_bytes` (0 disables either limit). A hit
+    refreshes the entry's modification time, which is what "used" means here.
+    """
+    def __init__(self, directory: str, max_bytes: int = 0, max_age_seconds: float = 0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str, suffix: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + suffix)
+
+    def get(self, url: str):
+        """Returns (meta, body) for a stored URL, or None."""
+        try:
+            with open(self._path(url, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self._path(url, ".body"), "rb") as f:
+                body = f.read()
+            if meta.get("url") != url:
+                return None
+            os.utime(self._path(url, ".json"))
+        except (OSError, ValueError):
+            return None
+        return meta, body
+
+    def set(self, url: str, meta: dict, body: bytes):
+        for suffix, data in ((".body", body), (".json", json.dumps({**meta, "url": url}).encode("utf-8"))):
+            fd, tmp = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(url, suffix))
+        self.prune()
+
+    def prune(self) -> int:
+        """Applies `max_age_seconds` and `max_bytes`; returns the number of entries removed."""
+        if not self.max_bytes and not self.max_age_seconds:
+            return 0
+        entries = {}  # name -> [bytes, last used (.json mtime, or .body mtime while it is being written)]
+        with os.scandir(self.directory) as items:
+            for item in items:
+                name, suffix = os.path.splitext(item.name)
+                if suffix not in (".json", ".body"):
+                    continue
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue
+                entry = entries.setdefault(name, [0, 0.0])
+                entry[0] += stat.st_size
+                if suffix == ".json" or not entry[1]:
+                    entry[1] = stat.st_mtime
+        now = time.time()
+        total = sum(size for size, _ in entries.values())
+        removed = 0
+        for name, (size, used_at) in sorted(entries.items(), key=lambda item: item[1][1]):
+            expired = self.max_age_seconds and now - used_at > self.max_age_seconds
+            if not expired and (not self.max_bytes or total <= self.max_bytes):
+                break  # oldest first: every later entry is newer and the store fits
+            for suffix in (".json", ".body"):
+                try:
+                    os.remove(os.path.join(self.directory, name + suffix))
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        if removed:
+            metrics.inc("nexa_url_cache_evictions_total", removed)
+        return removed
+
+
+class UrlFetcher:
+    """
+    Async HTTP fetcher for URL sources.
+
+    One pooled httpx.AsyncClient (keep-alive, bounded connections) serves every request, and at
+    most `max_concurrency` fetches run at once across all of them (the others wait their turn
+    before their timeout starts). Each fetch
+    has a timeout and a body size cap that is enforced while streaming, and responses carrying an
+    ETag or Last-Modified are kept in an HttpCacheStore. Later fetches of the same URL are
+    conditional, so an unchanged page costs a 304 instead of a full download.
+
+    The URLs come from callers, so every request and every redirect hop is checked first: the host
+    must resolve to public addresses only (no loopback, link-local, private or reserved ranges)
+    or, when `allowed_hosts` is set, be one of those hosts or their subdomains and nothing else.
+    Redirects are followed here, hop by hop, not by httpx. The check resolves the name before
+    httpx connects; use `allowed_hosts` where DNS answers cannot be trusted.
+    Args:
+        http_client (httpx.AsyncClient|None): Shared client; created from settings when None.
+        timeout (float): Seconds per fetch (connect + download).
+        max_bytes (int): Largest body accepted.
+        max_concurrency (int): URLs fetched at once by this fetcher, whatever request they come from.
+        cache_dir (str|None): Conditional-GET store directory; None disables it.
+        allowed_hosts (list[str]|None): If given, the only hosts (and their subdomains) that can be fetched.
+        allow_private_hosts (bool): Skip the public-address check (trusted deployments only).
+        max_redirects (int): Redirect hops followed per fetch.
+        resolver (async callable|None): host -> list of IP addresses; defaults to resolve_host.
+    """
+    def __init__(self, http_client: "httpx.AsyncClient" = None, timeout: float = None, max_bytes: int = None,
+                 max_concurrency: int = None, cache_dir: str = None, allowed_hosts: list = None,
+                 allow_private_hosts: bool = None, max_redirects: int = None, resolver=None):
+        self.timeout = settings.url_fetch_timeout_seconds if timeout is None else timeout
+        self.max_bytes = settings.url_fetch_max_bytes if max_bytes is None else max_bytes
+        self.max_concurrency = settings.url_fetch_max_concurrency if max_concurrency is None else max_concurrency
+        self.cache = HttpCacheStore(cache_dir, settings.url_cache_max_bytes, settings.url_cache_max_age_seconds) if cache_dir else None
+        self._slots = asyncio.Semaphore(max(self.max_concurrency, 1))
+        if allowed_hosts is None:
+            allowed_hosts = (settings.url_allowed_hosts or "").split(",")
+        self.allowed_hosts = [h.strip().lower().rstrip(".") for h in allowed_hosts if h.strip()]
+        self.allow_private_hosts = settings.url_allow_private_hosts if allow_private_hosts is None else allow_private_hosts
+        self.max_redirects = settings.url_fetch_max_redirects if max_redirects is None else max_redirects
+        self.resolver = resolver or resolve_host
+        self._http_client = http_client
+        self._owns_http_client = http_client is None
+
+    @property
+    def http_client(self):
+        if self._http_client is None:
+            import httpx
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=settings.url_fetch_max_connections, max_keepalive_connections=settings.url_fetch_max_connections),
+                timeout=httpx.Timeout(self.timeout),
+                follow_redirects=False,  # fetch() follows them itself, checking every hop
+                headers={"User-Agent": settings.url_user_agent},
+            )
+        return self._http_client
+
+    async def fetch(self, url: str) -> dict:
+        """
+        Returns:
+            dict: { 'url', 'status', 'content_type', 'encoding', 'body': bytes, 'cached': bool, 'elapsed_ms' }
+                ('url' is the final URL after redirects; 'cached' means a 304 served the stored body).
+        Raises:
+            UrlFetchError: Unsupported scheme, disallowed host, HTTP error status, too many redirects,
+                timeout or body over `max_bytes`.
+        """
+        if not url.lower().startswith(("http://", "https://")):
+            raise UrlFetchError(f"Only http(s) URLs can be ingested: {url}")
+        async with self._slots:
+            started = time.perf_counter()
+            result = await self._fetch(url)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        metrics.inc("nexa_url_fetches_total", result="not_modified" if result["cached"] else "downloaded")
+        metrics.inc("nexa_url_fetch_bytes_total", len(result["body"]), source="cache" if result["cached"] else "network")
+        metrics.observe("nexa_url_fetch_seconds", result["elapsed_ms"] / 1000)
+        return result
+
+    async def _fetch(self, url: str) -> dict:
+        import httpx  # imported with the first fetch, not with the app
+        stored = await asyncio.to_thread(self.cache.get, url) if self.cache is not None else None
+        conditional = {}
+        if stored is not None:
+            meta = stored[0]
+            if meta.get("etag"):
+                conditional["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                conditional["If-Modified-Since"] = meta["last_modified"]
+        try:
+            async with asyncio.timeout(self.timeout):
+                target = url
+                for _ in range(self.max_redirects + 1):
+                    await self.check_url(target)
+                    # The validators belong to `url`: a redirect target (maybe another host) gets a plain GET
+                    headers = conditional if target == url else {}
+                    async with self.http_client.stream("GET", target, headers=headers, follow_redirects=False) as response:
+                        if response.status_code in REDIRECT_STATUS_CODES and "location" in response.headers:
+                            target = str(response.url.join(response.headers["location"]))
+                            continue
+                        if response.status_code == 304 and headers:
+                            result = {**self._describe(stored[0]), "body": stored[1], "cached": True}
+                        else:
+                            response.raise_for_status()
+                            result = {**self._describe_response(response), "body": await self._read_capped(response, url), "cached": False}
+                        break
+                else:
+                    raise UrlFetchError(f"Fetching {url} exceeded {self.max_redirects} redirects")
+        except UrlFetchError:
+            metrics.inc("nexa_url_fetches_total", result="rejected")
+            raise
+        except TimeoutError:
+            metrics.inc("nexa_url_fetches_total", result="timeout")
+            raise UrlFetchError(f"Fetching {url} exceeded {self.timeout}s")
+        except httpx.HTTPStatusError as e:
+            metrics.inc("nexa_url_fetches_total", result="error")
+            raise UrlFetchError(f"Fetching {url} failed with HTTP {e.response.status_code}")
+        except httpx.HTTPError as e:
+            metrics.inc("nexa_url_fetches_total", result="error")
+            raise UrlFetchError(f"Fetching {url} failed: {type(e).__name__}: {e}")
+
+        if not result["cached"] and self.cache is not None and (result["etag"] or result["last_modified"]):
+            await asyncio.to_thread(self.cache.set, url, {k: v for k, v in result.items() if k != "body"}, result["body"])
+        return result
+
+    async def check_url(self, url: str):
+        """
+        Raises:
+            UrlFetchError: `url` is not http(s), or its host is not allowed (see the class docstring).
+        """
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower().rstrip(".")
+        if parts.scheme.lower() not in ("http", "https") or not host:
+            raise UrlFetchError(f"Only http(s) URLs can be ingested: {url}")
+        if self.allowed_hosts:
+            if not any(host == allowed or host.endswith("." + allowed) for allowed in self.allowed_hosts):
+                raise UrlFetchError(f"{host} is not an allowed host")
+            return
+        if self.allow_private_hosts:
+            return
+        try:
+            addresses = [str(ipaddress.ip_address(host.strip("[]")))]  # literal address, nothing to resolve
+        except ValueError:
+            addresses = None
+        try:
+            addresses = addresses or await self.resolver(host)
+        except OSError as e:
+            raise UrlFetchError(f"Cannot resolve {host}: {e}")
+        blocked = [a for a in addresses if not _is_public(a)]
+        if blocked or not addresses:
+            raise UrlFetchError(f"{host} resolves to a non-public address ({', '.join(blocked) or 'none'})")
+
+    def _describe_response(self, response: "httpx.Response") -> dict:
+        return {
+            "url": str(response.url),
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", ""),
+            "encoding": response.charset_encoding,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+        }
+
+    def _describe(self, meta: dict) -> dict:
+        keys = ("url", "status", "content_type", "encoding", "etag", "last_modified")
+        return {k: meta.get(k) for k in keys}
+
+    async def _read_capped(self, response: "httpx.Response", url: str) -> bytes:
+        declared = response.headers.get("content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            raise UrlFetchError(f"{url} is {declared} bytes; the limit is {self.max_bytes}")
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) > self.max_bytes:
+                raise UrlFetchError(f"{url} exceeds the {self.max_bytes} byte limit")
+        return bytes(body)
+
+    async def fetch_many(self, urls: list) -> list:
+        """Fetches `urls` concurrently (within the fetcher's `max_concurrency`), in input order."""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    async def aclose(self):
+        if self._http_client is not None and self._owns_http_client:
+            await self._http_client.aclose()
+        self._http_client = None
+
+
+def create_url_fetcher():
+    """UrlFetcher configured from settings (conditional-GET store in url_cache_dir or the temp dir)."""
+    cache_dir = None
+    if settings.url_cache_enabled:
+        cache_dir = settings.url_cache_dir or os.path.join(tempfile.gettempdir(), "nexa-url-cache")
+    return UrlFetcher(cache_dir=cache_dir)
@@ -1,30 +1,35 @@
 
-import re
 import os
-import json
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from app.core.metrics import metrics
+from .coercion import ValidationStats, coerce_to_schema
+from .extractor_agent import _parse_json_reply
+from .prompt_encoding import encode_json
+from .stateless_agent import StatelessAgent
 
 class ValidatorAgent:
-    def __init__(self, name="validator", api_key: str = None, system_message="Validates and repairs JSON output using schema."):
-        if api_key is None:
-            api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY must be set in environment or passed explicitly.")
-        self.model_client = OpenAIChatCompletionClient(model="gpt-4o", api_key=api_key)
-        self.agent = AssistantAgent(
-            name=name,
-            model_client=self.model_client,
-            system_message=system_message,
-        )
+    def __init__(self, name="validator", api_key: str = None, system_message="Validates and repairs JSON output using schema.", model_client=None,
+                 stats: ValidationStats = None):
+        if model_client is None:
+            if api_key is None:
+                api_key = os.environ.get("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY must be set in environment or passed explicitly.")
+            from autogen_ext.models.openai import OpenAIChatCompletionClient  # heavy: only without an injected client
+            model_client = OpenAIChatCompletionClient(model="gpt-4o", api_key=api_key)
+        self.model_client = model_client
+        self.stats = stats if stats is not None else ValidationStats()
+        self.agent = StatelessAgent(name, self.model_client, system_message)
     async def validate(self, data: dict, schema_model=None):
         """
-        Validates and repairs a JSON object using a Pydantic model. If repair is needed, uses GPT-4o to suggest fixes.
+        Validates and repairs a JSON object using a Pydantic model.
+        Local rule-based coercion (see coercion.coerce_to_schema) runs first; GPT-4o is only asked to
+        repair the object when that still does not produce a valid model. The repaired object goes
+        through the same schema check and coercion, and is an error if it still does not validate.
         Args:
             data (dict): The JSON object to validate.
             schema_model (BaseModel|None): The Pydantic model to validate against. If None, uses ClientContext.
         Returns:
-            dict: Validated and (if needed) repaired JSON object.
+            dict: Validated and (if needed) repaired JSON object, with an 'evidence' map when anchors were found.
         """
         if schema_model is None:
             try:
@@ -33,28 +38,57 @@ class ValidatorAgent:
             except ImportError:
                 return {"error": "Could not import ClientContext schema."}
 
-        # Try to validate using Pydantic
+        # Try to validate using Pydantic, then with local coercion, before paying for a model call
         try:
-            validated = schema_model(**data)
-            return validated.dict()
+            validated, outcome = _conform(data, schema_model)
+            self.stats.record(outcome)
+            return validated
         except Exception as e:
             prompt = (
                 "You are a JSON repair agent. The following JSON object does not conform to the schema. "
                 "Please repair it so it matches the schema exactly. If you cannot confidently repair a field, leave it empty or null and add a note.\n"
-                f"Schema: {schema_model.schema_json()}\n"
-                f"Invalid JSON: {data}\n"
+                f"Schema: {encode_json(schema_model.model_json_schema())}\n"
+                f"Invalid JSON: {encode_json(data)}\n"
                 f"Validation error: {str(e)}\n"
                 "Return only the repaired JSON object."
             )
-            result = await self.agent.run(task=prompt)
-            content = result.messages[-1].content
+            with metrics.model_call("validator", prompt) as call:
+                result = await self.agent.run(prompt)
+                call.record_usage(result)
+            repaired = _parse_json_reply(result.content)
+            if not isinstance(repaired, dict):
+                repaired = {"error": "Model repair did not return a JSON object.", "raw_response": result.content}
+            if "error" in repaired:
+                self.stats.record("repair_failed")
+                return repaired
             try:
-                return json.loads(content)
+                validated, _ = _conform(repaired, schema_model)
             except Exception as e2:
-                m = re.search(r'\{[\s\S]*\}', content)
-                if m:
-                    try:
-                        return json.loads(m.group(0))
-                    except Exception:
-                        pass
-                return {"error": f"Failed to parse JSON: {e2}", "raw_response": content}
+                self.stats.record("repair_failed")
+                return {"error": f"Model repair is still invalid: {e2}", "raw_response": result.content}
+            self.stats.record("model_repaired")
+            return validated
+
+
+def _conform(data, schema_model):
+    """
+    Validates `data` against `schema_model` as it is, then after coerce_to_schema.
+    Returns:
+        tuple[dict, str]: (validated object, with an 'evidence' map when anchors were found; 'valid' or 'coerced').
+    Raises:
+        Exception: The error of the plain validation when neither attempt validates.
+    """
+    try:
+        validated = schema_model(**data).model_dump()
+        if isinstance(data.get("evidence"), dict):
+            validated["evidence"] = data["evidence"]
+        return validated, "valid"
+    except Exception as e:
+        try:
+            values, evidence = coerce_to_schema(data, schema_model)
+            validated = schema_model(**values).model_dump()
+        except Exception:
+            raise e
+        if evidence:
+            validated["evidence"] = evidence
+        return validated, "coerced"
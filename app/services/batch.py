@@ -0,0 +1,193 @@
+import asyncio
+import os
+import time
+import zipfile
+from contextlib import asynccontextmanager
+from app.core.config import settings
+from app.core.metrics import metrics
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".doc", ".txt")
+
+
+class BatchInputError(Exception):
+    pass
+
+
+class BatchScheduler:
+    """
+    Runs batch items over the shared agent registry with process-wide limits.
+
+    At most `max_concurrency` items run at once across every batch request, and item starts are
+    spaced so no more than `max_starts_per_minute` begin per minute (0 disables the rate limit).
+    Each item runs in its own task: a failure is reported for that item and the others carry on.
+    """
+    def __init__(self, max_concurrency: int = 4, max_starts_per_minute: float = 0):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_starts_per_minute = max_starts_per_minute
+        self.running = 0
+        self._semaphore = None
+        self._loop = None
+        self._next_start = 0.0
+
+    def _get_semaphore(self):
+        # asyncio primitives belong to one event loop; a new loop (tests, reloads) gets a fresh one
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        """Waits for a free concurrency slot, then for the item's start time under the rate limit."""
+        async with self._get_semaphore():
+            if self.max_starts_per_minute > 0:
+                now = time.monotonic()
+                start = max(now, self._next_start)
+                self._next_start = start + 60.0 / self.max_starts_per_minute
+                if start > now:
+                    await asyncio.sleep(start - now)
+            self.running += 1
+            try:
+                yield
+            finally:
+                self.running -= 1
+
+    async def run(self, items, fn):
+        """
+        Runs `fn(item)` for every item under the scheduler limits.
+        Args:
+            items (list[dict]): Batch items ({ 'name', 'file_paths' }).
+            fn (callable): Async callable returning the item's JSON-serializable result.
+        Yields:
+            dict: { 'index', 'item', 'status': 'completed'|'failed', 'elapsed_ms', 'response'|'error' }
+                in completion order. Pending items are cancelled if the consumer stops early.
+        """
+        async def run_item(index, item):
+            started = time.perf_counter()
+            outcome = {"index": index, "item": item["name"]}
+            try:
+                async with self.slot():
+                    outcome["response"] = await fn(item)
+                outcome["status"] = "completed"
+            except Exception as e:
+                outcome["status"] = "failed"
+                outcome["error"] = str(e) or type(e).__name__
+            outcome["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            metrics.inc("nexa_batch_items_total", status=outcome["status"])
+            return outcome
+
+        tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def create_batch_scheduler():
+    """BatchScheduler configured from settings."""
+    return BatchScheduler(
+        max_concurrency=settings.batch_max_concurrency,
+        max_starts_per_minute=settings.batch_max_starts_per_minute,
+    )
+
+
+def bundle_name(relative_path: str):
+    """
+    Batch item a file belongs to: its top-level folder, or the file name (without extension) for
+    files at the root. Returns None for hidden files, archive metadata and unsupported types.
+    """
+    parts = [p for p in relative_path.replace("\\", "/").split("/") if p not in ("", ".")]
+    if not parts or any(p.startswith(".") or p == "__MACOSX" for p in parts):
+        return None
+    if os.path.splitext(parts[-1])[1].lower() not in SUPPORTED_EXTENSIONS:
+        return None
+    return parts[0] if len(parts) > 1 else os.path.splitext(parts[0])[0]
+
+
+def _to_items(bundles: dict):
+    items = [{"name": name, "file_paths": paths} for name, paths in bundles.items()]
+    if not items:
+        raise BatchInputError("No supported files (PDF, DOCX, TXT) found in the batch input.")
+    if len(items) > settings.batch_max_items:
+        raise BatchInputError(f"The batch has {len(items)} items; the limit is {settings.batch_max_items}.")
+    return items
+
+
+async def spool_uploads(spool, files):
+    """Multipart uploads; a filename like 'acme/brief.pdf' puts the file in item 'acme'."""
+    bundles = {}
+    for upload in files:
+        name = bundle_name(upload.filename or "")
+        if name is not None:
+            bundles.setdefault(name, []).append(await spool.add_upload(upload))
+    return bundles
+
+
+def spool_archive(spool, archive_path: str):
+    """
+    Extracts the supported members of a ZIP archive into the spool (blocking; run it in a thread).
+    Member names are only used for grouping, never as paths, so '../' entries cannot escape the spool.
+    """
+    bundles = {}
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in archive.infolist():
+                name = None if member.is_dir() else bundle_name(member.filename)
+                if name is not None:
+                    with archive.open(member) as stream:
+                        bundles.setdefault(name, []).append(spool.add_stream(stream, member.filename))
+    except zipfile.BadZipFile:
+        raise BatchInputError("The archive is not a valid ZIP file.")
+    return bundles
+
+
+def scan_directory(directory: str, root: str = None):
+    """
+    Server-side directory: each subfolder (files collected recursively) and each root-level file
+    is an item. The directory must be inside `root` (settings.batch_input_root).
+    """
+    root = settings.batch_input_root if root is None else root
+    if not root:
+        raise BatchInputError("Server-side directories are disabled (set BATCH_INPUT_ROOT).")
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, directory))
+    if os.path.commonpath([root, path]) != root or not os.path.isdir(path):
+        raise BatchInputError(f"Directory not found under the batch input root: {directory}")
+    bundles = {}
+    for current, dirs, filenames in os.walk(path):
+        dirs.sort()
+        for filename in sorted(filenames):
+            full = os.path.join(current, filename)
+            name = bundle_name(os.path.relpath(full, path))
+            if name is not None:
+                bundles.setdefault(name, []).append(full)
+    return bundles
+
+
+async def collect_batch_items(spool, files=None, archive=None, directory: str = None):
+    """
+    Builds the batch items from multipart files, a ZIP archive and/or a server-side directory.
+    Uploaded content is written to `spool`; directory files are read in place.
+    Returns:
+        list[dict]: { 'name', 'file_paths' } per item, in input order.
+    Raises:
+        BatchInputError: No usable input, too many items or an invalid archive/directory.
+        UploadTooLargeError: Uploads (or extracted archive members) over the spool limits.
+    """
+    bundles = {}
+    if files:
+        bundles.update(await spool_uploads(spool, files))
+    if archive is not None:
+        archive_path = await spool.add_upload(archive)
+        extracted = await asyncio.to_thread(spool_archive, spool, archive_path)
+        os.remove(archive_path)
+        for name, paths in extracted.items():
+            bundles.setdefault(name, []).extend(paths)
+    if directory:
+        for name, paths in (await asyncio.to_thread(scan_directory, directory)).items():
+            bundles.setdefault(name, []).extend(paths)
+    return _to_items(bundles)
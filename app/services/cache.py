@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from app.services.agentic.blocks import iter_blocks
+from app.services.shared_state import SharedBackendError, backend_unavailable
+
+
+def normalize_text_blocks(text_blocks):
+    """Collapses whitespace and drops empty blocks so cosmetic differences hash the same."""
+    normalized = []
+    for text, anchor in iter_blocks(text_blocks):
+        text = " ".join(str(text).split())
+        if text:
+            normalized.append([anchor, text])
+    return normalized
+
+
+def make_cache_key(text_blocks, schema: str, prompt_version: str, model: str, **extra) -> str:
+    """
+    Content-addressed key for a pipeline result.
+    Args:
+        text_blocks (TextBlocks|list): Ingested blocks ('text' + 'anchor').
+        schema (str): Schema string given to the Extractor.
+        prompt_version (str): Version of the prompts; bump it when prompts change.
+        model (str): Model name.
+        **extra: Other inputs that change the result (e.g. enrich_allowed).
+    Returns:
+        str: sha256 hex digest.
+    """
+    payload = {
+        "blocks": normalize_text_blocks(text_blocks),
+        "schema": " ".join(schema.split()),
+        "prompt_version": prompt_version,
+        "model": model,
+        "extra": extra,
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache for JSON-serializable pipeline results.
+
+    The memory tier is an LRU bounded by entry count and total serialized size. The optional
+    SQLite tier survives restarts; disk hits are promoted back into memory. With a shared
+    `backend` (see app.services.shared_state) entries are also stored there, so every worker
+    process sees results computed by the others, and in-flight keys can be leased so only one
+    worker computes a given result. All tiers expire entries after `ttl_seconds`.
+
+    On the event loop use aget/aset: disk and backend I/O then runs in a thread, never under the
+    memory tier's lock. An unreachable backend is treated as a miss; the local tiers keep working.
+
+    A `namespace` keeps a cache's entries apart from another cache sharing the same SQLite file or
+    backend (its own table and key prefix), so each can be sized and evicted on its own.
+    """
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 86400, sqlite_path: str = None,
+                 backend=None, lease_seconds: float = 300.0, namespace: str = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.shared_hits = 0
+        self.backend = backend
+        self.lease_seconds = lease_seconds
+        self._table = f"results_{namespace}" if namespace else "results"
+        self._prefix = f"cache:{namespace}:" if namespace else "cache:"
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key: str):
+        """Looks `key` up in every tier (blocking on disk / shared backend I/O; see aget)."""
+        value = self._get_memory(key)
+        if value is None:
+            value = self._get_slow(key)
+        return value
+
+    async def aget(self, key: str):
+        """get() for the event loop: memory hits return at once, the other tiers run in a thread."""
+        value = self._get_memory(key)
+        if value is None:
+            value = await asyncio.to_thread(self._get_slow, key)
+        return value
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, size, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return json.loads(value)
+            self._drop(key)
+            return None
+
+    def _get_slow(self, key):
+        now = time.time()
+        if self._db is not None:
+            with self._lock:
+                row = self._db.execute(f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at > now:
+                        self._store(key, value, expires_at)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return json.loads(value)
+                    self._db.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+                    self._db.commit()
+        if self.backend is not None:
+            # Outside the lock: a slow backend must not hold up memory hits in other threads
+            try:
+                value = self.backend.get(self._prefix + key)
+            except SharedBackendError as e:
+                backend_unavailable("cache", e)
+                value = None
+            if value is not None:
+                with self._lock:
+                    self._store(key, value, now + self.ttl_seconds)
+                    self.hits += 1
+                    self.shared_hits += 1
+                return json.loads(value)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value):
+        """Stores `value` in every tier (blocking on disk / shared backend I/O; see aset)."""
+        encoded, expires_at = self._set_memory(key, value)
+        self._set_slow(key, encoded, expires_at)
+
+    async def aset(self, key: str, value):
+        """set() for the event loop: the memory tier is updated at once, the others in a thread."""
+        encoded, expires_at = self._set_memory(key, value)
+        if self._db is not None or self.backend is not None:
+            await asyncio.to_thread(self._set_slow, key, encoded, expires_at)
+
+    def _set_memory(self, key, value):
+        encoded = json.dumps(value, ensure_ascii=False)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store(key, encoded, expires_at)
+        return encoded, expires_at
+
+    def _set_slow(self, key, encoded, expires_at):
+        if self._db is not None:
+            with self._lock:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, encoded, expires_at),
+                )
+                self._db.commit()
+        if self.backend is not None:
+            try:
+                self.backend.set(self._prefix + key, encoded, ttl=self.ttl_seconds)
+            except SharedBackendError as e:
+                backend_unavailable("cache", e)
+
+    async def acquire_lease(self, key: str):
+        """
+        Claims the computation of `key` across workers. Returns a lease token, or None while
+        another worker holds it. Always succeeds without a shared backend, or while it is unreachable.
+        """
+        if self.backend is None:
+            return "local"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await asyncio.to_thread(self.backend.set, f"lease:{key}", token, ttl=self.lease_seconds, only_if_absent=True)
+        except SharedBackendError as e:
+            backend_unavailable("cache", e)
+            return "local"
+        return token if acquired else None
+
+    async def release_lease(self, key: str, token: str):
+        if self.backend is None or token == "local":
+            return
+        try:
+            await asyncio.to_thread(self.backend.delete_if_equal, f"lease:{key}", token)
+        except SharedBackendError as e:
+            backend_unavailable("cache", e)  # the lease expires on its own
+
+    async def get_or_lease(self, key: str, poll_seconds: float = 0.1):
+        """
+        The stored result for `key`, or a lease to compute it. While another worker holds the
+        lease this waits for its result; if that worker ends without one, the lease is claimed.
+        Returns:
+            tuple: (result, lease, waited): the result and no lease on a hit, no result and a lease
+                token (release it with release_lease) on a miss; `waited` tells whether another
+                worker's computation was waited on.
+        """
+        waited = False
+        while True:
+            value = await self.aget(key)
+            if value is not None:
+                return value, None, waited
+            lease = await self.acquire_lease(key)
+            if lease is not None:
+                if lease != "local":
+                    # The previous holder may have stored its result between the lookup and the claim
+                    value = await self.aget(key)
+                    if value is not None:
+                        await self.release_lease(key, lease)
+                        return value, None, waited
+                return None, lease, waited
+            waited = True
+            value = await self.wait_for(key, poll_seconds)
+            if value is not None:
+                return value, None, waited
+
+    async def wait_for(self, key: str, poll_seconds: float = 0.1):
+        """
+        Waits while another worker holds the lease on `key`. Returns its result, or None if the
+        lease ended (failure, cancellation, expiry) without one being stored, or the backend failed.
+        """
+        while True:
+            value = await self.aget(key)
+            if value is not None or self.backend is None:
+                return value
+            try:
+                held = await asyncio.to_thread(self.backend.get, f"lease:{key}")
+            except SharedBackendError as e:
+                backend_unavailable("cache", e)
+                return None
+            if held is None:
+                return await self.aget(key)
+            await asyncio.sleep(poll_seconds)
+
+    def _store(self, key, encoded, expires_at):
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (expires_at, size, encoded)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """Empties this process's tiers; entries in a shared backend expire through their TTL."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self._table}")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "persistent": self._db is not None,
+                "shared": self.backend is not None,
+                "shared_hits": self.shared_hits,
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,268 @@
+import asyncio
+import difflib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.agentic.merge import split_value_evidence
+
+# Company-level fields that hold for every engagement with the same client; engagement-specific
+# fields (objectives, questions, opportunities) are never taken from the store.
+PROFILE_FIELDS = ("industry", "location", "company_info", "business_overview")
+
+LEGAL_SUFFIXES = {
+    "sa", "sau", "sl", "slu", "sas", "sarl", "srl", "spa", "sapi", "cv", "lda", "ltda",
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "llc", "llp", "lp",
+    "plc", "pty", "gmbh", "ag", "kg", "kgaa", "se", "bv", "nv", "oy", "oyj", "ab", "as", "asa", "aps",
+}
+
+
+def normalize_company_name(name: str) -> str:
+    """
+    Store key for a company name: accents and case folded, punctuation dropped, dotted
+    abbreviations joined ("S.A." -> "sa") and trailing legal suffixes stripped.
+    "ACME Logistics, S.A." and "Acme logistics SA" both give "acme logistics".
+    """
+    text = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode("ascii").casefold()
+    text = text.replace("&", " and ")
+    text = re.sub(r"\b(\w)\.(?=\w\b\.?)", r"\1", text)  # s.a. / s.l.u. -> sa. / slu.
+    words = re.sub(r"[^\w\s]", " ", text).split()
+    if words and words[0] == "the":
+        words = words[1:]
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+class CompanyProfileStore:
+    """
+    What public research found about each company, reused across requests.
+
+    Profiles are keyed by normalize_company_name; a name without an exact key match falls back to
+    the closest existing key above `match_threshold` (difflib ratio) among the keys that share its
+    first word, so small spelling variants share a profile without comparing against every key.
+    Every field keeps its value, its source and when it was researched, and is fresh for
+    `ttl_seconds` (or its `field_ttl_seconds` override). Expired fields are evicted when read and
+    by purge_expired; a profile without fields is dropped. The optional SQLite file keeps profiles
+    across restarts; the coordinator goes through afresh/aupdate so neither the matching nor the
+    SQLite commits run on the event loop.
+    Args:
+        ttl_seconds (float): Default freshness of a field.
+        field_ttl_seconds (dict|None): Per-field overrides, e.g. {"company_info": 604800}.
+        match_threshold (float): Minimum similarity (0-1) for a fuzzy match; 1 disables fuzzy matching.
+        max_entries (int): Profiles kept; the least recently updated are dropped first.
+        sqlite_path (str|None): Persist profiles in this SQLite file.
+        clock (callable): Wall-clock source, injectable in tests.
+    """
+    def __init__(self, ttl_seconds: float = 30 * 86400, field_ttl_seconds: dict = None, match_threshold: float = 0.9,
+                 max_entries: int = 10000, sqlite_path: str = None, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.field_ttl_seconds = dict(field_ttl_seconds or {})
+        self.match_threshold = match_threshold
+        self.max_entries = max_entries
+        self.clock = clock
+        self._profiles = {}  # key -> { 'key', 'name', 'updated_at', 'fields': { field: { 'value', 'source', 'updated_at' } } }
+        self._by_first_word = {}  # first word of a key -> set of keys, the fuzzy match candidates
+        self._lock = threading.Lock()
+        self.lookups = {"hit": 0, "partial": 0, "miss": 0}
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS profiles (key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)")
+            self._db.commit()
+            for key, value in self._db.execute("SELECT key, value FROM profiles ORDER BY updated_at"):
+                self._profiles[key] = json.loads(value)
+                self._index(key)
+
+    def _ttl(self, field: str) -> float:
+        return self.field_ttl_seconds.get(field, self.ttl_seconds)
+
+    def _match(self, name: str):
+        key = normalize_company_name(name)
+        if not key or key in self._profiles or self.match_threshold >= 1:
+            return key
+        candidates = self._by_first_word.get(key.split()[0], ())
+        close = difflib.get_close_matches(key, list(candidates), n=1, cutoff=self.match_threshold)
+        return close[0] if close else key
+
+    def _index(self, key: str):
+        self._by_first_word.setdefault(key.split()[0], set()).add(key)
+
+    def _unindex(self, key: str):
+        first = key.split()[0]
+        keys = self._by_first_word.get(first)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_first_word[first]
+
+    def _evict_expired(self, key: str, now: float):
+        profile = self._profiles.get(key)
+        if profile is None:
+            return None
+        expired = [f for f, entry in profile["fields"].items() if now - entry["updated_at"] >= self._ttl(f)]
+        for field in expired:
+            del profile["fields"][field]
+        if not profile["fields"]:
+            self._delete(key)
+            return None
+        if expired:
+            self._persist(profile)
+        return profile
+
+    def fresh(self, name: str, fields) -> dict:
+        """
+        Fresh stored values for `fields` of the company called `name`.
+        Returns:
+            dict: { 'key', 'values': {field: value}, 'sources': {field: source} } (empty dicts on a miss).
+        """
+        fields = [f for f in fields if f in PROFILE_FIELDS]
+        with self._lock:
+            key = self._match(name)
+            profile = self._evict_expired(key, self.clock())
+            stored = profile["fields"] if profile is not None else {}
+            found = [f for f in fields if f in stored]
+            result = "miss" if not found else ("hit" if len(found) == len(fields) else "partial")
+            self.lookups[result] += 1
+        metrics.inc("nexa_company_profile_lookups_total", result=result)
+        return {
+            "key": key,
+            "values": {f: stored[f]["value"] for f in found},
+            "sources": {f: stored[f]["source"] for f in found if stored[f]["source"]},
+        }
+
+    async def afresh(self, name: str, fields) -> dict:
+        """fresh() in a worker thread."""
+        return await asyncio.to_thread(self.fresh, name, fields)
+
+    def update(self, name: str, values: dict, sources: dict = None):
+        """
+        Stores the non-empty PROFILE_FIELDS of `values` (with their `sources`) as researched now.
+        `{ "value": ..., "evidence": ... }` wrappers are unwrapped first: only the value is kept.
+        """
+        sources = sources if isinstance(sources, dict) else {}
+        now = self.clock()
+        values = {f: split_value_evidence(v)[0] for f, v in values.items() if f in PROFILE_FIELDS}
+        fields = {
+            f: {"value": v, "source": sources.get(f), "updated_at": now}
+            for f, v in values.items()
+            if v not in (None, "", [], {})
+        }
+        if not fields:
+            return
+        with self._lock:
+            key = self._match(name)
+            if not key:
+                return
+            profile = self._profiles.pop(key, None) or {"key": key, "fields": {}}
+            profile["name"] = str(name).strip()
+            profile["updated_at"] = now
+            profile["fields"].update(fields)
+            self._profiles[key] = profile  # most recently updated last
+            self._index(key)
+            self._persist(profile)
+            while len(self._profiles) > self.max_entries:
+                self._delete(next(iter(self._profiles)))
+
+    async def aupdate(self, name: str, values: dict, sources: dict = None):
+        """update() in a worker thread."""
+        await asyncio.to_thread(self.update, name, values, sources)
+
+    def get(self, key: str):
+        """The stored profile for a key (or company name), after evicting expired fields."""
+        with self._lock:
+            key = key if key in self._profiles else self._match(key)
+            profile = self._evict_expired(key, self.clock())
+            return json.loads(json.dumps(profile)) if profile is not None else None
+
+    def invalidate(self, key: str, fields=None) -> bool:
+        """Drops a profile (or only some of its fields). Returns False when there was nothing to drop."""
+        with self._lock:
+            key = key if key in self._profiles else self._match(key)
+            profile = self._profiles.get(key)
+            if profile is None:
+                return False
+            if not fields:
+                self._delete(key)
+                return True
+            removed = [f for f in fields if profile["fields"].pop(f, None) is not None]
+            if not profile["fields"]:
+                self._delete(key)
+            elif removed:
+                self._persist(profile)
+            return bool(removed)
+
+    def purge_expired(self) -> int:
+        """Evicts every expired field; returns how many profiles were dropped."""
+        with self._lock:
+            now = self.clock()
+            before = len(self._profiles)
+            for key in list(self._profiles):
+                self._evict_expired(key, now)
+            return before - len(self._profiles)
+
+    def entries(self) -> list:
+        """Summary of every profile: key, name, last update and each field's age in seconds."""
+        self.purge_expired()
+        with self._lock:
+            now = self.clock()
+            return [
+                {
+                    "key": p["key"],
+                    "name": p.get("name"),
+                    "updated_at": p.get("updated_at"),
+                    "fields": {f: round(now - e["updated_at"], 1) for f, e in p["fields"].items()},
+                }
+                for p in self._profiles.values()
+            ]
+
+    def clear(self) -> int:
+        with self._lock:
+            removed = len(self._profiles)
+            self._profiles.clear()
+            self._by_first_word.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM profiles")
+                self._db.commit()
+            return removed
+
+    def stats(self):
+        with self._lock:
+            return {"profiles": len(self._profiles), "lookups": dict(self.lookups), "persistent": self._db is not None}
+
+    def _persist(self, profile):
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO profiles (key, value, updated_at) VALUES (?, ?, ?)",
+                (profile["key"], json.dumps(profile, ensure_ascii=False), profile.get("updated_at", 0)),
+            )
+            self._db.commit()
+
+    def _delete(self, key):
+        if self._profiles.pop(key, None) is not None:
+            self._unindex(key)
+        if self._db is not None:
+            self._db.execute("DELETE FROM profiles WHERE key = ?", (key,))
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def create_company_profile_store():
+    """CompanyProfileStore configured from settings, or None when disabled."""
+    if not settings.company_profiles_enabled:
+        return None
+    return CompanyProfileStore(
+        ttl_seconds=settings.company_profile_ttl_seconds,
+        field_ttl_seconds=settings.company_profile_field_ttl_seconds,
+        match_threshold=settings.company_profile_match_threshold,
+        max_entries=settings.company_profile_max_entries,
+        sqlite_path=settings.company_profile_sqlite_path,
+    )
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.shared_state import SharedJobStore, create_shared_backend
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobQueueFullError(Exception):
+    pass
+
+
+class InMemoryJobStore:
+    """Job records kept in a dict; lost on restart."""
+    blocking = False
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: dict):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def delete_expired(self, now: float):
+        with self._lock:
+            expired = [k for k, job in self._jobs.items() if job.get("expires_at") and job["expires_at"] <= now]
+            for k in expired:
+                del self._jobs[k]
+        return len(expired)
+
+    def close(self):
+        pass
+
+
+class SQLiteJobStore:
+    """Job records in a SQLite table, so status and results survive restarts."""
+    COLUMNS = ("id", "status", "created_at", "updated_at", "expires_at", "result", "error")
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL, expires_at REAL, result TEXT, error TEXT)"
+        )
+        self._db.commit()
+
+    def create(self, job: dict):
+        row = {**{c: None for c in self.COLUMNS}, **job}
+        row["result"] = json.dumps(row["result"]) if row["result"] is not None else None
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO jobs ({', '.join(self.COLUMNS)}) VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                tuple(row[c] for c in self.COLUMNS),
+            )
+            self._db.commit()
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(self.COLUMNS, row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def update(self, job_id: str, **fields):
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"])
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
+
+    def delete_expired(self, now: float):
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            self._db.commit()
+        return cursor.rowcount
+
+    def close(self):
+        self._db.close()
+
+
+class JobManager:
+    """
+    Bounded in-process job queue.
+
+    `submit` enqueues a coroutine function and returns the job id right away; a
+    fixed number of worker tasks run the jobs. When `max_queue` jobs are waiting `submit` raises
+    JobQueueFullError instead of accepting unbounded work. Jobs cancelled while queued free their
+    slot at once, even though their id stays in the queue until a worker skips it. Finished jobs are kept for
+    `result_ttl` seconds. Calls into a store that does I/O (SQLite, shared backend) run in a
+    thread, so a slow disk or backend never stalls the event loop.
+    """
+    def __init__(self, store=None, workers: int = 4, max_queue: int = 100, result_ttl: float = 3600):
+        self.store = store if store is not None else InMemoryJobStore()
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self._queue = None
+        self._worker_tasks = []
+        self._pending = {}  # job id -> (job function, on_done callback, submitted at)
+        self._running = {}  # job id -> asyncio.Task
+        self._stopping = False
+        self.cancel_poll_seconds = 0.5
+
+    def start(self):
+        if self._worker_tasks:
+            return
+        self._queue = asyncio.Queue()  # bounded through _pending in submit()
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for job_id, (_, on_done, _) in list(self._pending.items()):
+            await self._finish(job_id, CANCELLED, on_done)
+        self.store.close()
+
+    async def _store(self, method: str, *args, **fields):
+        call = getattr(self.store, method)
+        if not getattr(self.store, "blocking", True):
+            return call(*args, **fields)
+        return await asyncio.to_thread(call, *args, **fields)
+
+    async def submit(self, fn, on_done=None) -> str:
+        """
+        Queues `fn`, an async callable taking the job id and returning a JSON-serializable result.
+        `on_done`, if given, runs once the job finishes, fails or is cancelled (e.g. temp file cleanup).
+        Raises:
+            JobQueueFullError: If `max_queue` jobs are already waiting.
+        """
+        self.start()
+        await self._store("delete_expired", time.time())
+        if len(self._pending) >= self.max_queue:
+            metrics.inc("nexa_jobs_rejected_total")
+            raise JobQueueFullError(f"Job queue is full ({self.max_queue} pending)")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._pending[job_id] = (fn, on_done, time.perf_counter())
+        # The record must exist before a worker can pick the job up and update it
+        await self._store("create", {"id": job_id, "status": QUEUED, "created_at": now, "updated_at": now})
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def get(self, job_id: str):
+        await self._store("delete_expired", time.time())
+        return await self._store("get", job_id)
+
+    async def cancel(self, job_id: str):
+        """
+        Cancels a queued or running job. Returns the job record, or None if unknown.
+        A job owned by another worker (shared store) is flagged; its owner cancels it shortly after.
+        """
+        job = await self._store("get", job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+        if job_id in self._running:
+            self._running[job_id].cancel()
+        elif job_id in self._pending:
+            _, on_done, _ = self._pending.pop(job_id)
+            await self._finish(job_id, CANCELLED, on_done)
+        elif hasattr(self.store, "request_cancel"):
+            await self._store("request_cancel", job_id, ttl=self.result_ttl)
+        return await self._store("get", job_id)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                if job_id not in self._pending:
+                    continue  # cancelled while queued
+                fn, on_done, submitted = self._pending.pop(job_id)
+                if hasattr(self.store, "cancel_requested") and await self._store("cancel_requested", job_id):
+                    await self._finish(job_id, CANCELLED, on_done)
+                    continue
+                metrics.observe("nexa_job_queue_wait_seconds", time.perf_counter() - submitted)
+                await self._store("update", job_id, status=RUNNING, updated_at=time.time())
+                task = asyncio.create_task(fn(job_id))
+                self._running[job_id] = task
+                try:
+                    if hasattr(self.store, "cancel_requested"):
+                        await self._watch_cancel(job_id, task)
+                    result = await task
+                except asyncio.CancelledError:
+                    await self._finish(job_id, CANCELLED, on_done)
+                    if self._stopping:
+                        raise
+                except Exception as e:
+                    await self._finish(job_id, FAILED, on_done, error=str(e))
+                else:
+                    await self._finish(job_id, COMPLETED, on_done, result=result)
+                finally:
+                    self._running.pop(job_id, None)
+            finally:
+                self._queue.task_done()
+
+    async def _watch_cancel(self, job_id, task):
+        # Cancellation requested through another worker arrives as a flag in the shared store
+        while not task.done():
+            try:
+                await asyncio.wait({task}, timeout=self.cancel_poll_seconds)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            if not task.done() and await self._store("cancel_requested", job_id):
+                task.cancel()
+
+    async def _finish(self, job_id, status, on_done, result=None, error=None):
+        now = time.time()
+        await self._store("update", job_id, status=status, updated_at=now, expires_at=now + self.result_ttl, result=result, error=error)
+        if on_done is not None:
+            on_done()
+
+
+def create_job_manager():
+    """
+    JobManager configured from settings (worker count, queue depth, TTL and storage backend).
+    With a shared backend the records live there, whatever `jobs_backend` says.
+    """
+    backend = create_shared_backend()
+    if backend is not None:
+        store = SharedJobStore(backend)
+    elif settings.jobs_backend == "sqlite":
+        store = SQLiteJobStore(settings.jobs_sqlite_path)
+    elif settings.jobs_backend == "memory":
+        store = InMemoryJobStore()
+    else:
+        raise ValueError(f"Unsupported jobs backend: {settings.jobs_backend}")
+    return JobManager(
+        store=store,
+        workers=settings.jobs_workers,
+        max_queue=settings.jobs_max_queue,
+        result_ttl=settings.jobs_result_ttl_seconds,
+    )
@@ -0,0 +1,410 @@
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from urllib.parse import unquote, urlparse
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Deletes KEYS[1] only while it still holds ARGV[1] (a lease released after it expired and was
+# taken by another worker must not be deleted)
+COMPARE_AND_DELETE_SCRIPT = "if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) else return 0 end"
+
+
+class SharedBackendError(Exception):
+    pass
+
+
+def backend_unavailable(component: str, error: Exception):
+    """Counts a shared-backend failure that `component` absorbed by falling back to local state."""
+    metrics.inc("nexa_shared_backend_errors_total", component=component)
+
+
+class InProcessBackend:
+    """
+    Key-value store with per-key TTL kept in this process. Same interface as RedisBackend, so
+    single-process deployments (and tests) run the exact code paths of a multi-worker one.
+    """
+    def __init__(self, prefix: str = "", clock=time.monotonic):
+        self.prefix = prefix
+        self._data = {}  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+        self._clock = clock
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self._clock():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._live(self.prefix + key)
+            return entry[0] if entry is not None else None
+
+    def set(self, key: str, value: str, ttl: float = None, only_if_absent: bool = False) -> bool:
+        key = self.prefix + key
+        with self._lock:
+            if only_if_absent and self._live(key) is not None:
+                return False
+            self._data[key] = (value, self._clock() + ttl if ttl else None)
+            return True
+
+    def mget(self, keys: list) -> list:
+        return [self.get(key) for key in keys]
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._data.pop(self.prefix + key, None) is not None
+
+    def delete_if_equal(self, key: str, value: str) -> bool:
+        """Deletes `key` only if it holds `value`, atomically."""
+        key = self.prefix + key
+        with self._lock:
+            entry = self._live(key)
+            if entry is None or entry[0] != value:
+                return False
+            del self._data[key]
+            return True
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        """Adds `amount` atomically; `ttl` is applied when the counter is created."""
+        key = self.prefix + key
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                entry = (0, self._clock() + ttl if ttl else None)
+            value = int(entry[0]) + int(amount)
+            self._data[key] = (value, entry[1])
+            return value
+
+    def close(self):
+        pass
+
+
+class RedisBackend:
+    """
+    Same interface backed by any server speaking the Redis protocol (RESP2), so every worker
+    process and pod sees the same keys. Uses blocking sockets from a small pool: callers on the
+    event loop run it through asyncio.to_thread, and fall back to local state when it raises
+    SharedBackendError. Only GET, MGET, SET (PX/NX), DEL, INCRBY, PEXPIRE and EVAL (one
+    compare-and-delete script) are needed, which Redis, Valkey, KeyDB and DragonflyDB all support.
+    Args:
+        url (str): redis://[user:password@]host[:port][/db]
+        prefix (str): Namespace prepended to every key.
+        pool_size (int): Idle connections kept for reuse.
+        timeout (float): Socket connect/read timeout in seconds.
+    """
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "", pool_size: int = 8, timeout: float = 2.0):
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported shared backend URL: {url}")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.strip("/") or 0)
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.prefix = prefix
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        conn = (sock, sock.makefile("rb"))
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.password:
+                self._roundtrip(conn, ("AUTH", self.username, self.password) if self.username else ("AUTH", self.password))
+            if self.db:
+                self._roundtrip(conn, ("SELECT", self.db))
+        except BaseException:
+            self._close(conn)  # execute() never saw this connection, so it cannot close it
+            raise
+        return conn
+
+    def execute(self, *args):
+        """Sends one command and returns the decoded reply (str, int, None or list)."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = None
+        try:
+            if conn is None:
+                conn = self._connect()
+            reply = self._roundtrip(conn, args)
+        except OSError as e:
+            if conn is not None:
+                self._close(conn)
+            raise SharedBackendError(f"Shared backend {self.host}:{self.port} unavailable: {e}")
+        except SharedBackendError:
+            if conn is not None:
+                self._release(conn)  # an error reply leaves the connection usable
+            raise
+        self._release(conn)
+        return reply
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            self._close(conn)
+
+    def _close(self, conn):
+        conn[1].close()
+        conn[0].close()
+
+    def _roundtrip(self, conn, args):
+        sock, reader = conn
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        sock.sendall(b"".join(parts))
+        return self._read_reply(reader)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise OSError("connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode("utf-8")
+        if kind == b"-":
+            raise SharedBackendError(payload.decode("utf-8"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            count = int(payload)
+            return None if count < 0 else [self._read_reply(reader) for _ in range(count)]
+        raise SharedBackendError(f"Unexpected reply: {line!r}")
+
+    def get(self, key: str):
+        return self.execute("GET", self.prefix + key)
+
+    def set(self, key: str, value: str, ttl: float = None, only_if_absent: bool = False) -> bool:
+        args = ["SET", self.prefix + key, value]
+        if ttl:
+            args += ["PX", max(int(ttl * 1000), 1)]
+        if only_if_absent:
+            args.append("NX")
+        return self.execute(*args) == "OK"
+
+    def mget(self, keys: list) -> list:
+        return self.execute("MGET", *(self.prefix + key for key in keys)) if keys else []
+
+    def delete(self, key: str) -> bool:
+        return self.execute("DEL", self.prefix + key) > 0
+
+    def delete_if_equal(self, key: str, value: str) -> bool:
+        return self.execute("EVAL", COMPARE_AND_DELETE_SCRIPT, 1, self.prefix + key, value) == 1
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        value = self.execute("INCRBY", self.prefix + key, int(amount))
+        if ttl and value == int(amount):  # first increment created the key
+            self.execute("PEXPIRE", self.prefix + key, max(int(ttl * 1000), 1))
+        return value
+
+    def close(self):
+        while True:
+            try:
+                self._close(self._pool.get_nowait())
+            except queue.Empty:
+                return
+
+
+_backends = {}
+
+
+def create_shared_backend():
+    """
+    The process-wide shared backend from settings: None ("none": every component keeps its own
+    local state), InProcessBackend ("memory") or RedisBackend ("redis"). One instance per process,
+    created lazily so pre-forked workers never share a socket.
+    """
+    if settings.shared_backend == "none":
+        return None
+    backend = _backends.get(os.getpid())
+    if backend is None:
+        if settings.shared_backend == "memory":
+            backend = InProcessBackend(prefix=settings.shared_key_prefix)
+        elif settings.shared_backend == "redis":
+            backend = RedisBackend(settings.shared_redis_url, prefix=settings.shared_key_prefix,
+                                   pool_size=settings.shared_redis_pool_size, timeout=settings.shared_redis_timeout_seconds)
+        else:
+            raise ValueError(f"Unsupported shared backend: {settings.shared_backend}")
+        _backends.clear()
+        _backends[os.getpid()] = backend
+    return backend
+
+
+class SharedJobStore:
+    """
+    Job records as JSON under `jobs:<id>` in a shared backend, so any worker can report on or
+    cancel a job that another worker accepted. Finished records expire through the backend TTL.
+    Cancelling a job owned by another worker sets `jobs:<id>:cancel`; the owner polls for it.
+
+    Every write also goes to a local in-memory copy: while the backend is unreachable this
+    worker keeps serving its own jobs from there (other workers' jobs are unknown until it is back).
+    Calls block on backend I/O; JobManager runs them in a thread.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.local = _LocalJobs()
+
+    def _write(self, job: dict):
+        self.local.put(job)
+        ttl = job["expires_at"] - time.time() if job.get("expires_at") else None
+        try:
+            if ttl is not None and ttl <= 0:
+                self.backend.delete(f"jobs:{job['id']}")
+                return
+            self.backend.set(f"jobs:{job['id']}", json.dumps(job), ttl=ttl)
+        except SharedBackendError as e:
+            backend_unavailable("jobs", e)
+
+    def create(self, job: dict):
+        self._write(dict(job))
+
+    def get(self, job_id: str):
+        try:
+            raw = self.backend.get(f"jobs:{job_id}")
+        except SharedBackendError as e:
+            backend_unavailable("jobs", e)
+            raw = None
+        return json.loads(raw) if raw is not None else self.local.get(job_id)
+
+    def update(self, job_id: str, **fields):
+        job = self.get(job_id)
+        if job is not None:
+            job.update(fields)
+            self._write(job)
+
+    def request_cancel(self, job_id: str, ttl: float = 3600):
+        try:
+            self.backend.set(f"jobs:{job_id}:cancel", "1", ttl=ttl)
+        except SharedBackendError as e:
+            backend_unavailable("jobs", e)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        try:
+            return self.backend.get(f"jobs:{job_id}:cancel") is not None
+        except SharedBackendError as e:
+            backend_unavailable("jobs", e)
+            return False
+
+    def delete_expired(self, now: float):
+        self.local.delete_expired(now)
+        return 0  # the backend expires records on its own
+
+    def close(self):
+        pass
+
+
+class _LocalJobs:
+    """This worker's copy of the job records it wrote (SharedJobStore's fallback)."""
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def put(self, job: dict):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def delete_expired(self, now: float):
+        with self._lock:
+            for job_id in [k for k, job in self._jobs.items() if job.get("expires_at") and job["expires_at"] <= now]:
+                del self._jobs[job_id]
+
+
+class SharedRateLimiter:
+    """
+    Requests/tokens-per-minute limit shared by every worker, with TokenBucket's interface.
+
+    Usage is counted in one-minute windows (`<name>:<window>` counters). `book` takes the
+    amount in the first window that still has room and returns how long to wait for it to start,
+    so workers queue behind each other instead of all bursting at the start of a minute. One MGET
+    reads the upcoming windows, so a reservation usually costs two round trips. The booking it
+    returns names the window that was charged (None when every window was full and nothing was
+    taken), and `refund` gives units back to that window only. While the backend is unreachable,
+    `fallback` (a per-worker TokenBucket) limits this worker on its own.
+    Calls block on backend I/O; ModelGateway runs them in a thread.
+    """
+    def __init__(self, backend, name: str, rate_per_minute: float, clock=time.time, max_windows_ahead: int = 10, fallback=None):
+        self.backend = backend
+        self.name = name
+        self.limit = int(rate_per_minute)
+        self._clock = clock
+        self.max_windows_ahead = max_windows_ahead
+        self.fallback = fallback
+
+    def reserve(self, amount: float) -> float:
+        return self.book(amount)[0]
+
+    def book(self, amount: float):
+        """
+        Returns:
+            tuple: (seconds to wait, booking for refund(); None when nothing was taken).
+        """
+        try:
+            units = max(min(int(amount), self.limit), 1)
+            wait, key = self._reserve(units)
+            return wait, ((key, units) if key is not None else None)
+        except SharedBackendError as e:
+            backend_unavailable("ratelimit", e)
+            if self.fallback is None:
+                return 0.0, None
+            wait, booking = self.fallback.book(amount)
+            return wait, (None, booking)
+
+    def refund(self, booking, amount: float = None):
+        """Gives back the units of a booking (or `amount` of them; negative charges more) to the window it charged."""
+        if booking is None:
+            return
+        key, units = booking
+        if key is None:
+            self.fallback.refund(units, amount)
+            return
+        units = units if amount is None else int(amount)
+        if not units:
+            return
+        try:
+            self.backend.incr(key, -units, ttl=120)
+        except SharedBackendError as e:
+            backend_unavailable("ratelimit", e)
+
+    def _reserve(self, amount: int):
+        now = self._clock()
+        window = int(now // 60)
+        keys = [f"{self.name}:{window + ahead}" for ahead in range(self.max_windows_ahead)]
+        for ahead, (key, used) in enumerate(zip(keys, self.backend.mget(keys))):
+            if int(used or 0) + amount > self.limit:
+                continue
+            if self.backend.incr(key, amount, ttl=120 + ahead * 60) <= self.limit:
+                return max((window + ahead) * 60 - now, 0.0), key
+            self.backend.incr(key, -amount)  # another worker took the rest of this window meanwhile
+        return self.max_windows_ahead * 60 - (now - window * 60), None
+
+    def adjust(self, amount: float):
+        """Charges (or, negative, returns) units in the current window once actual usage is known."""
+        if not int(amount):
+            return
+        try:
+            self.backend.incr(f"{self.name}:{int(self._clock() // 60)}", int(amount), ttl=120)
+        except SharedBackendError as e:
+            backend_unavailable("ratelimit", e)
+            if self.fallback is not None:
+                self.fallback.adjust(amount)
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import json
+from app.core.metrics import metrics
+
+
+class _LeaderCancelled(Exception):
+    """Set on a flight whose leader was cancelled; its followers start over."""
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first caller for a key (the leader) runs the
+    function, later callers with the same key await the leader's outcome instead of running
+    their own copy.
+
+    - Success: every caller gets the leader's result.
+    - Failure: every caller gets the leader's exception; nothing is remembered, so the next
+      call runs again.
+    - Leader cancelled (client disconnected, job cancelled): followers are not cancelled with it;
+      they start over and one of them becomes the new leader with its own inputs.
+    A follower that is itself cancelled just stops waiting; the leader carries on.
+    The leader runs the call inline with its own inputs, so each request's spooled uploads stay
+    valid exactly as long as that request needs them.
+    """
+    def __init__(self):
+        self._flights = {}  # key -> asyncio.Future with the leader's outcome
+        self.counts = {"leaders": 0, "coalesced": 0, "failed": 0, "leader_cancelled": 0}
+
+    async def run(self, key: str, fn):
+        """
+        Args:
+            key (str): Identity of the call (see flight_key).
+            fn (callable): Coroutine function with no arguments, run only by the leader.
+        Returns:
+            The leader's result.
+        """
+        while (flight := self._flights.get(key)) is not None:
+            try:
+                result = await asyncio.shield(flight)
+            except _LeaderCancelled:
+                continue
+            except Exception:
+                self._count("coalesced")
+                raise
+            self._count("coalesced")
+            return result
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        self._count("leaders")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._count("leader_cancelled")
+            flight.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            self._count("failed")
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if flight.done() and not flight.cancelled():
+                flight.exception()  # retrieved: no "never retrieved" warning when nobody was waiting
+
+    def _count(self, outcome: str):
+        self.counts[outcome] += 1
+        metrics.inc("nexa_single_flight_total", outcome=outcome)
+
+    def stats(self):
+        return {**self.counts, "in_flight": len(self._flights)}
+
+
+def flight_key(content_key: str, urls=None, enrich_allowed: bool = False, bypass_cache: bool = False) -> str:
+    """
+    Key of an analysis: hash of the submitted contents, the URLs, `enrich_allowed` and
+    `bypass_cache` (a request asking for a fresh run must not be handed a cached one's result).
+    """
+    payload = json.dumps(
+        {"content": content_key, "urls": list(urls or []), "enrich_allowed": bool(enrich_allowed), "bypass_cache": bool(bypass_cache)},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from app.core.config import settings
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class UploadSpool:
+    """
+    Per-request spool directory for uploaded files.
+
+    Uploads are copied in fixed-size chunks, in a thread, so peak memory per request is one chunk no
+    matter how large the files are, and the per-file and per-request size limits are checked while
+    copying. Starlette has already parsed the multipart body into its own temporary files by then,
+    so these limits decide what is processed, not what is received: the raw request size is capped
+    before parsing by RequestSizeLimitMiddleware.
+    The directory (and everything in it) is removed by `close()`, which the async context manager
+    calls on exit, including when the pipeline raises. A SHA-256 of every file is computed while
+    copying, so identical submissions can be recognised without reading the files again.
+    """
+    def __init__(self, spool_dir: str = None, max_file_bytes: int = None, max_request_bytes: int = None, chunk_bytes: int = None):
+        self.spool_dir = spool_dir if spool_dir is not None else settings.upload_spool_dir
+        self.max_file_bytes = settings.upload_max_file_bytes if max_file_bytes is None else max_file_bytes
+        self.max_request_bytes = settings.upload_max_request_bytes if max_request_bytes is None else max_request_bytes
+        self.chunk_bytes = settings.upload_chunk_bytes if chunk_bytes is None else chunk_bytes
+        self.paths = []
+        self.digests = {}  # path -> sha256 hex of its content
+        self.total_bytes = 0
+        self._dir = None
+
+    def _next_path(self, suffix: str):
+        if self._dir is None:
+            if self.spool_dir:
+                os.makedirs(self.spool_dir, exist_ok=True)
+            self._dir = tempfile.mkdtemp(prefix="nexa-upload-", dir=self.spool_dir)
+        # Only the (lowercased) extension of the client filename is kept; it selects the parser
+        path = os.path.join(self._dir, f"{len(self.paths)}{suffix.lower()}")
+        self.paths.append(path)
+        return path
+
+    async def add_upload(self, upload) -> str:
+        """
+        Copies an UploadFile to the spool in a thread (see add_stream).
+        Returns:
+            str: Path of the spooled file.
+        Raises:
+            UploadTooLargeError: As soon as the file or the request goes over its limit.
+        """
+        await upload.seek(0)
+        return await asyncio.to_thread(self.add_stream, upload.file, upload.filename or "")
+
+    def add_stream(self, stream, filename: str) -> str:
+        """
+        Blocking counterpart of add_upload for file objects (e.g. archive members). The limits apply
+        to the bytes actually read, so a compressed member cannot get around them.
+        Returns:
+            str: Path of the spooled file.
+        Raises:
+            UploadTooLargeError: As soon as the file or the request goes over its limit.
+        """
+        path = self._next_path(os.path.splitext(filename)[1])
+        written = 0
+        digest = hashlib.sha256()
+        with open(path, "wb") as out:
+            while chunk := stream.read(self.chunk_bytes):
+                written += len(chunk)
+                self._check_limits(filename, written, len(chunk))
+                out.write(chunk)
+                digest.update(chunk)
+        self.digests[path] = digest.hexdigest()
+        return path
+
+    def _check_limits(self, filename, written: int, chunk_size: int):
+        self.total_bytes += chunk_size
+        if written > self.max_file_bytes:
+            raise UploadTooLargeError(f"{filename} exceeds the {self.max_file_bytes} byte limit per file")
+        if self.total_bytes > self.max_request_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {self.max_request_bytes} byte limit per request")
+
+    def add_text(self, text: str, suffix: str = ".txt") -> str:
+        encoded = text.encode("utf-8")
+        self.total_bytes += len(encoded)
+        if self.total_bytes > self.max_request_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {self.max_request_bytes} byte limit per request")
+        path = self._next_path(suffix)
+        with open(path, "wb") as out:
+            out.write(encoded)
+        self.digests[path] = hashlib.sha256(encoded).hexdigest()
+        return path
+
+    def content_key(self, paths=None) -> str:
+        """
+        Hash of the spooled contents (and their extensions, which select the parser), in order.
+        Args:
+            paths (list[str]|None): Spooled files to include; all of them by default.
+        """
+        paths = self.paths if paths is None else paths
+        parts = [f"{os.path.splitext(p)[1]}:{self.digests[p]}" for p in paths]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def close(self):
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class RequestSizeLimitMiddleware:
+    """
+    ASGI middleware that caps the raw request body before the app parses it, so an oversized
+    multipart upload is refused instead of being spooled to disk first.
+
+    A declared Content-Length over the limit is answered with 413 without reading the body; a body
+    without one (chunked) is counted as it arrives and aborted with 413 once it goes over. The limit
+    is `max_bytes` (the upload request limit plus the multipart framing allowance by default), or
+    the entry in `path_limits` for that exact path.
+    """
+    def __init__(self, app, max_bytes: int = None, path_limits: dict = None):
+        self.app = app
+        self.max_bytes = settings.upload_max_request_bytes + settings.upload_multipart_overhead_bytes if max_bytes is None else max_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = self.path_limits.get(scope["path"], self.max_bytes)
+        detail = f"Request body exceeds the {limit} byte limit"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await JSONResponse(status_code=413, content={"detail": detail})(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
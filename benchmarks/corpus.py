@@ -0,0 +1,115 @@
+"""
+Synthetic PDF / DOCX / TXT documents for offline benchmarks.
+
+The PDF writer emits a minimal uncompressed PDF (Helvetica text, one content stream per page) so
+no PDF authoring library is needed; pypdf and pdfplumber both read it.
+"""
+import os
+from docx import Document
+
+PARAGRAPH = (
+    "The supplier shall describe its approach to integrating the warehouse management system with the "
+    "existing SAP S/4HANA instance, including data migration, testing and hypercare for the regional hubs."
+)
+
+# Document sizes used by the load benchmark: name -> pages (PDF) / paragraphs (DOCX, TXT)
+SIZES = {"small": 2, "medium": 20, "large": 100}
+
+
+def _page_lines(page: int, pages: int, lines_per_page: int = 30):
+    lines = ["ACME Logistics S.A. - Request for Proposal - CONFIDENTIAL", f"Section {page}: Scope and objectives"]
+    words = PARAGRAPH.split()
+    for i in range(lines_per_page):
+        start = (i * 7) % len(words)
+        lines.append(" ".join((words + words)[start:start + 12]))
+    lines.append(f"Page {page} of {pages}")
+    return lines
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _table_ops(rows: int = 8, cols: int = 5):
+    # A ruled table: one stroked rectangle plus a text cell per grid position
+    ops = []
+    for r in range(rows):
+        for c in range(cols):
+            x, y = 50 + c * 100, 300 - r * 20
+            ops.append(f"{x} {y} 100 20 re S")
+            ops.append(f"BT /F1 9 Tf {x + 4} {y + 6} Td (R{r + 1}C{c + 1} {(r + 1) * (c + 7)}) Tj ET")
+    return ops
+
+
+def write_pdf(path: str, pages: int, table_every: int = 0):
+    """Writes a `pages`-page PDF; with `table_every` N, every Nth page also carries a ruled table."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(1, pages + 1):
+        body = ["BT", "/F1 10 Tf", "12 TL", "50 760 Td"]
+        body += [f"({_pdf_escape(line)}) Tj T*" for line in _page_lines(page, pages)]
+        body.append("ET")
+        if table_every and page % table_every == 0:
+            body += _table_ops()
+        stream = "\n".join(body).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_docx(path: str, paragraphs: int):
+    document = Document()
+    document.add_heading("ACME Logistics S.A. - Request for Proposal", level=1)
+    for i in range(1, paragraphs + 1):
+        if i % 10 == 1:
+            document.add_heading(f"Section {i // 10 + 1}", level=2)
+        document.add_paragraph(f"{i}. {PARAGRAPH}")
+    document.save(path)
+
+
+def write_txt(path: str, paragraphs: int):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("ACME Logistics S.A. - Request for Proposal\n\n")
+        for i in range(1, paragraphs + 1):
+            f.write(f"{i}. {PARAGRAPH}\n\n")
+
+
+WRITERS = {"pdf": write_pdf, "docx": write_docx, "txt": write_txt}
+
+
+def build_corpus(directory: str, file_types=("pdf", "docx", "txt"), sizes=None):
+    """
+    Writes one document per (file type, size) into `directory`.
+    Returns:
+        dict: { '<type>-<size>': path }
+    """
+    sizes = sizes or SIZES
+    os.makedirs(directory, exist_ok=True)
+    corpus = {}
+    for file_type in file_types:
+        for size_name, units in sizes.items():
+            path = os.path.join(directory, f"{size_name}.{file_type}")
+            WRITERS[file_type](path, units)
+            corpus[f"{file_type}-{size_name}"] = path
+    return corpus
@@ -0,0 +1,185 @@
+"""
+Offline load benchmark for POST /context/analyze.
+
+Drives the real app in-process (httpx ASGI transport) with every agent on the
+FakeChatCompletionClient, so ingestion, chunking, prompt building, validation, caching and the
+HTTP layer are all exercised without calling OpenAI. For each synthetic document it reports
+latency percentiles, requests per second, errors and per-stage p50/p95 (from the Server-Timing
+header), followed by the peak RSS of the process and of the ingestion worker processes.
+
+Usage:
+    python -m benchmarks.load [--requests 40] [--concurrency 8] [--types pdf,docx,txt]
+                              [--sizes small,medium,large] [--latency-ms 800] [--jitter-ms 300]
+                              [--tokens-per-second 80] [--failure-rate 0] [--extract-mode single|fanout]
+                              [--enrich] [--cache]
+                              [--json results.json]
+
+Run it before and after a change with the same arguments and compare the tables (or the JSON).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def parse_server_timing(header: str) -> dict:
+    timings = {}
+    for part in (header or "").split(","):
+        name, _, rest = part.strip().partition(";dur=")
+        if name and rest:
+            timings[name] = float(rest)
+    return timings
+
+
+def _peak_rss_mb(who) -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_case(client, path: str, requests: int, concurrency: int, enrich: bool, use_cache: bool) -> dict:
+    """Sends `requests` analyze calls for `path`, at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, stages, errors = [], {}, 0
+    with open(path, "rb") as f:
+        content = f.read()
+    filename = os.path.basename(path)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/context/analyze",
+                    files={"files": (filename, content)},
+                    data={"enrich_allowed": str(enrich).lower(), "bypass_cache": str(not use_cache).lower()},
+                )
+                ok = response.status_code == 200 and response.json().get("status") == "completed"
+            except Exception:
+                response, ok = None, False
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                errors += 1
+                return
+            for stage, ms in parse_server_timing(response.headers.get("server-timing")).items():
+                stages.setdefault(stage, []).append(ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "stages": {
+            stage: {"p50_ms": round(percentile(v, 50), 1), "p95_ms": round(percentile(v, 95), 1)}
+            for stage, v in stages.items()
+        },
+    }
+
+
+async def run_benchmark(corpus: dict, requests: int, concurrency: int, enrich: bool = False, use_cache: bool = False) -> dict:
+    """
+    Runs every corpus entry against a fresh in-process app.
+    Args:
+        corpus (dict): { case name: document path }, e.g. from benchmarks.corpus.build_corpus.
+    Returns:
+        dict: { 'cases': { name: stats }, 'peak_rss_mb': float, 'peak_rss_children_mb': float }
+    """
+    import httpx
+    from app.main import app
+    from app.services.agentic.registry import AgentRegistry
+
+    registry = AgentRegistry(model_backend="fake")
+    app.state.agent_registry = registry
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for name, path in corpus.items():
+                results[name] = await run_case(client, path, requests, concurrency, enrich, use_cache)
+    finally:
+        await registry.aclose()
+        app.state.agent_registry = None
+    return {
+        "cases": results,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_rss_children_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def print_report(report: dict):
+    print(f"{'case':<16} {'reqs':>5} {'err':>4} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}  stages p50/p95 (ms)")
+    for name, stats in report["cases"].items():
+        stages = "  ".join(f"{s}={v['p50_ms']:.0f}/{v['p95_ms']:.0f}" for s, v in stats["stages"].items())
+        print(
+            f"{name:<16} {stats['requests']:>5} {stats['errors']:>4} {stats['rps']:>8.2f} "
+            f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}  {stages}"
+        )
+    print(f"peak RSS: {report['peak_rss_mb']} MB (ingestion workers: {report['peak_rss_children_mb']} MB)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=40, help="requests per document")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--types", default="pdf,docx,txt")
+    parser.add_argument("--sizes", default="small,medium,large")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter-ms", type=float, default=300.0)
+    parser.add_argument("--distribution", default="lognormal")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--extract-mode", default="single", choices=["single", "fanout"])
+    parser.add_argument("--enrich", action="store_true", help="also run the Researcher stage")
+    parser.add_argument("--cache", action="store_true", help="leave the result cache on (off by default)")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    # Settings are read at import time, so configure the app before importing it
+    os.environ.update({
+        "MODEL_BACKEND": "fake",
+        "METRICS_TIMING_HEADERS": "true",
+        "FAKE_MODEL_LATENCY_MS": str(args.latency_ms),
+        "FAKE_MODEL_LATENCY_JITTER_MS": str(args.jitter_ms),
+        "FAKE_MODEL_LATENCY_DISTRIBUTION": args.distribution,
+        "FAKE_MODEL_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "FAKE_MODEL_FAILURE_RATE": str(args.failure_rate),
+        "FAKE_MODEL_SEED": str(args.seed),
+        "EXTRACT_MODE": args.extract_mode,
+    })
+
+    from benchmarks.corpus import SIZES, build_corpus
+
+    sizes = {name: SIZES[name] for name in args.sizes.split(",")}
+    with tempfile.TemporaryDirectory(prefix="nexa-bench-") as directory:
+        corpus = build_corpus(directory, args.types.split(","), sizes)
+        report = asyncio.run(run_benchmark(corpus, args.requests, args.concurrency, args.enrich, args.cache))
+    report["config"] = vars(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+PDF extraction backends compared on generated PDFs of 10 to 500 pages (every 5th page carries
+a ruled table, so the "auto" backend has pages to hand over to pdfplumber).
+
+Usage:
+    python -m benchmarks.pdf_backends [--pages 10,50,100,250,500] [--backends pypdf,pdfplumber,auto]
+                                      [--workers 4] [--pages-per-task 30]
+
+Besides each backend on one core, it times the "auto" backend through IngestionExecutor with
+page-range parallelism across `--workers` processes.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from benchmarks.corpus import write_pdf
+
+
+def time_backend(backend: str, path: str):
+    from app.services.agentic.pdf_backends import get_pdf_backend
+
+    started = time.perf_counter()
+    pages = get_pdf_backend(backend).extract_pages(path)
+    return time.perf_counter() - started, sum(1 for _, _, used in pages if used == "pdfplumber")
+
+
+def time_parallel(path: str, workers: int, pages_per_task: int):
+    from app.services.agentic.ingestion import IngestionExecutor
+
+    executor = IngestionExecutor(
+        process_workers=workers, timeout=3600, pdf_parallel_min_pages=pages_per_task, pdf_pages_per_task=pages_per_task,
+    )
+    try:
+        # Warm the pool so process start-up is not counted
+        asyncio.run(executor.ingest(file_path=path))
+        started = time.perf_counter()
+        asyncio.run(executor.ingest(file_path=path))
+        return time.perf_counter() - started
+    finally:
+        executor.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", default="10,50,100,250,500")
+    parser.add_argument("--backends", default="pypdf,pdfplumber,auto")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--pages-per-task", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    backends = args.backends.split(",")
+    columns = backends + [f"auto x{args.workers}"]
+    print(f"{'pages':>6} " + " ".join(f"{c:>14}" for c in columns) + "   (seconds; pdfplumber pages under auto)")
+    with tempfile.TemporaryDirectory(prefix="nexa-pdf-bench-") as directory:
+        for pages in (int(p) for p in args.pages.split(",")):
+            path = os.path.join(directory, f"{pages}.pdf")
+            write_pdf(path, pages, table_every=5)
+            cells = []
+            relaid = 0
+            for backend in backends:
+                seconds, layout_pages = time_backend(backend, path)
+                if backend == "auto":
+                    relaid = layout_pages
+                cells.append(f"{seconds:>14.2f}")
+            cells.append(f"{time_parallel(path, args.workers, args.pages_per_task):>14.2f}")
+            print(f"{pages:>6} " + " ".join(cells) + f"   ({relaid})")
+
+
+if __name__ == "__main__":
+    main()
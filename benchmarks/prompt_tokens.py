@@ -0,0 +1,86 @@
+"""
+Input-token comparison between the original prompt serialization (Python repr of one dict per
+line/paragraph plus metadata) and section-level blocks in the compact line-oriented encoding.
+
+Usage:
+    python -m benchmarks.prompt_tokens [path ...]
+
+Without paths it runs on samples/ plus a synthetic 40-page RFP with running headers/footers
+and a 300-paragraph DOCX-style brief.
+"""
+import glob
+import sys
+from app.core.config import settings
+from app.services.agentic.blocks import BlockGrouper, TextBlocks
+from app.services.agentic.chunking import count_tokens
+from app.services.agentic.ingestor_agent import IngestorAgent
+from app.services.agentic.prompt_encoding import encode_text_blocks, summarize_metadata
+
+
+def synthetic_rfp(pages: int = 40):
+    paragraph = (
+        "The supplier shall describe its approach to integrating the warehouse management system with the "
+        "existing SAP S/4HANA instance, including data migration, testing and hypercare.   "
+    )
+    text_blocks = []
+    metadata = {"file_type": "pdf", "pages": []}
+    for i in range(1, pages + 1):
+        text = "\n".join([
+            "ACME Logistics S.A. - Request for Proposal - CONFIDENTIAL",
+            f"Section {i}",
+            paragraph * 4,
+            f"Page {i} of {pages}",
+        ])
+        text_blocks.append({"text": text, "anchor": f"page_{i}"})
+        metadata["pages"].append({"page": i, "anchor": f"page_{i}"})
+    return text_blocks, metadata
+
+
+def synthetic_docx_brief(paragraphs: int = 300):
+    text_blocks = []
+    metadata = {"file_type": "docx", "paragraphs": []}
+    for i in range(1, paragraphs + 1):
+        text_blocks.append({"text": f"- Requirement {i}: support regional inventory visibility.", "anchor": f"para_{i}"})
+        metadata["paragraphs"].append({"index": i, "anchor": f"para_{i}"})
+    return text_blocks, metadata
+
+
+def grouped_docx_brief(text_blocks):
+    grouper = BlockGrouper("para", settings.ingest_block_max_chars)
+    for i, block in enumerate(text_blocks, 1):
+        grouper.add(i, block["text"], heading=i % 50 == 1)
+    return grouper.finish()
+
+
+def ingest(path, grouped: bool):
+    previous = settings.ingest_group_blocks
+    settings.ingest_group_blocks = grouped
+    try:
+        return IngestorAgent().ingest(file_path=path)
+    finally:
+        settings.ingest_group_blocks = previous
+
+
+def compare(name, text_blocks, metadata, encoded_blocks=None):
+    encoded_blocks = text_blocks if encoded_blocks is None else encoded_blocks
+    before = count_tokens(f"Metadata: {metadata}\nText blocks: {TextBlocks.from_dicts(text_blocks).to_dicts()}\n")
+    after = count_tokens(f"Metadata: {summarize_metadata(metadata)}\nText blocks:\n{encode_text_blocks(encoded_blocks)}\n")
+    saved = 100 * (before - after) / before if before else 0
+    print(f"{name:<40} {len(text_blocks):>7} {len(encoded_blocks):>7} {before:>10} {after:>10} {saved:>8.1f}%")
+
+
+def main(paths):
+    print(f"{'document':<40} {'blocks':>7} {'after':>7} {'before':>10} {'after':>10} {'saved':>9}")
+    for path in paths or sorted(glob.glob("samples/*.txt")):
+        ungrouped = ingest(path, grouped=False)
+        if ungrouped["text_blocks"]:
+            grouped = ingest(path, grouped=True)
+            compare(path, ungrouped["text_blocks"], ungrouped["metadata"], grouped["text_blocks"])
+    if not paths:
+        compare("synthetic 40-page RFP", *synthetic_rfp())
+        blocks, metadata = synthetic_docx_brief()
+        compare("synthetic 300-paragraph DOCX brief", blocks, metadata, grouped_docx_brief(blocks))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
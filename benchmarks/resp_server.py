@@ -0,0 +1,143 @@
+"""
+Local stand-in for a Redis server: speaks enough of the Redis protocol (RESP2) for
+SHARED_BACKEND=redis, storing keys in an InProcessBackend. Used by the tests and to try a
+multi-worker deployment without installing Redis.
+
+Commands: PING, AUTH, SELECT, GET, MGET, SET [EX s | PX ms] [NX], DEL, INCR, INCRBY, PEXPIRE, FLUSHALL,
+and EVAL of the compare-and-delete script used to release leases (no general Lua).
+
+Usage:
+    python -m benchmarks.resp_server [--host 127.0.0.1] [--port 6379] [--password secret]
+"""
+import argparse
+import socketserver
+import threading
+from app.services.shared_state import COMPARE_AND_DELETE_SCRIPT, InProcessBackend
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=("127.0.0.1", 0), password: str = None):
+        super().__init__(address, RespHandler)
+        self.password = password
+        self.store = InProcessBackend()
+        self.commands = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://:{self.password}@{host}:{port}/1" if self.password else f"redis://{host}:{port}/0"
+
+    def start(self):
+        """Serves from a daemon thread; returns self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        authenticated = self.server.password is None
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            command = args[0].upper()
+            self.server.commands += 1
+            if command == "AUTH":
+                authenticated = args[-1] == self.server.password
+                self._write(b"+OK\r\n" if authenticated else b"-WRONGPASS invalid password\r\n")
+            elif not authenticated:
+                self._write(b"-NOAUTH Authentication required.\r\n")
+            else:
+                try:
+                    self._write(self._execute(command, args[1:]))
+                except (IndexError, ValueError):
+                    self._write(b"-ERR syntax error\r\n")
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.decode("utf-8").split()  # inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2].decode("utf-8"))
+        return args
+
+    def _write(self, data: bytes):
+        self.wfile.write(data)
+
+    def _execute(self, command, args) -> bytes:
+        store = self.server.store
+        if command == "PING":
+            return b"+PONG\r\n"
+        if command in ("SELECT", "FLUSHALL"):
+            if command == "FLUSHALL":
+                with store._lock:
+                    store._data.clear()
+            return b"+OK\r\n"
+        if command == "GET":
+            return _bulk(store.get(args[0]))
+        if command == "MGET":
+            return b"*%d\r\n%s" % (len(args), b"".join(_bulk(store.get(key)) for key in args))
+        if command == "EVAL":
+            if args[0] != COMPARE_AND_DELETE_SCRIPT:
+                return b"-ERR only the compare-and-delete script is supported\r\n"
+            return b":%d\r\n" % store.delete_if_equal(args[2], args[3])
+        if command == "SET":
+            key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+            ttl = None
+            if "EX" in options:
+                ttl = float(args[2 + options.index("EX") + 1])
+            if "PX" in options:
+                ttl = float(args[2 + options.index("PX") + 1]) / 1000
+            stored = store.set(key, value, ttl=ttl, only_if_absent="NX" in options)
+            return b"+OK\r\n" if stored else b"$-1\r\n"
+        if command == "DEL":
+            return b":%d\r\n" % sum(store.delete(key) for key in args)
+        if command in ("INCR", "INCRBY"):
+            return b":%d\r\n" % store.incr(args[0], int(args[1]) if command == "INCRBY" else 1)
+        if command == "PEXPIRE":
+            with store._lock:
+                entry = store._live(args[0])
+                if entry is None:
+                    return b":0\r\n"
+                store._data[args[0]] = (entry[0], store._clock() + int(args[1]) / 1000)
+            return b":1\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command.encode("utf-8")
+
+
+def _bulk(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    data = str(value).encode("utf-8")
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--password")
+    args = parser.parse_args()
+    server = RespServer((args.host, args.port), password=args.password)
+    print(f"listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
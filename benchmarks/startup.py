@@ -0,0 +1,86 @@
+"""
+Cold-start import time of the app, measured with `python -X importtime` in fresh interpreters.
+
+Usage:
+    python -m benchmarks.startup [--module app.main] [--runs 5] [--budget-ms 900] [--top 15]
+
+Prints the best cumulative import time of `--module` over `--runs` runs and the top-level
+packages that took longest to import, and exits non-zero when the time is over `--budget-ms` or
+when a library that should load on first use (see DEFERRED_MODULES) was imported with the app.
+tests/test_startup.py checks the deferred libraries only; the time budget is enforced here.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use or by the startup warmup (AgentRegistry.warmup), never by importing the app
+DEFERRED_MODULES = ("autogen_core", "autogen_ext", "openai", "httpx", "tiktoken", "pypdf", "pdfplumber", "docx", "bs4", "lxml")
+# ~0.45s on a single core today; importing the app eagerly took ~1.3s
+IMPORT_BUDGET_MS = 900
+
+_PROBE = "import sys, json; import {module}; print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}} & set({deferred!r}))))"
+
+
+def import_profile(module: str = "app.main") -> dict:
+    """
+    Imports `module` in a fresh interpreter under -X importtime.
+    Returns:
+        dict: { 'total_ms', 'packages': {top-level package: ms spent in its own modules}, 'deferred_loaded': [DEFERRED_MODULES entries that were imported] }
+    """
+    env = {**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    code = _PROBE.format(module=module, deferred=DEFERRED_MODULES)
+    done = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    total_us, packages = None, {}
+    for line in done.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        name = name.strip()
+        if name == module:
+            total_us = int(cumulative)
+        top = name.split(".")[0]
+        packages[top] = packages.get(top, 0) + int(own) / 1000
+    return {
+        "total_ms": (total_us or 0) / 1000,
+        "packages": packages,
+        "deferred_loaded": json.loads(done.stdout.strip().splitlines()[-1]),
+    }
+
+
+def best_profile(module: str = "app.main", runs: int = 3) -> dict:
+    """Profile of the fastest of `runs` imports (the others carry scheduling noise)."""
+    return min((import_profile(module) for _ in range(max(runs, 1))), key=lambda p: p["total_ms"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    profile = best_profile(args.module, args.runs)
+    print(f"import {args.module}: {profile['total_ms']:.0f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    for name, ms in sorted(profile["packages"].items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+    failures = []
+    if profile["total_ms"] > args.budget_ms:
+        failures.append(f"import time {profile['total_ms']:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    if profile["deferred_loaded"]:
+        failures.append("imported eagerly: " + ", ".join(profile["deferred_loaded"]))
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
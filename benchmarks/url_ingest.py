@@ -0,0 +1,105 @@
+"""
+URL ingestion before/after: the old path (blocking fetch per URL, raw HTML split on blank lines)
+against UrlFetcher (concurrent pooled fetches, conditional GETs) plus HTML-to-text blocks.
+
+Everything runs offline: a synthetic corporate web page is served by an httpx MockTransport
+that adds a fixed round-trip latency and a per-byte transfer time.
+
+Usage:
+    python -m benchmarks.url_ingest [--urls 6] [--latency-ms 150] [--kb-per-ms 0.5]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+import httpx
+from app.services.agentic.blocks import TextBlocks
+from app.services.agentic.chunking import count_tokens
+from app.services.agentic.ingestor_agent import IngestorAgent
+from app.services.agentic.prompt_encoding import encode_text_blocks
+from app.services.agentic.url_fetcher import UrlFetcher
+
+NAV = "".join(f'<li><a href="/section/{i}" class="nav-link nav-item-{i}">Menu entry {i}</a></li>' for i in range(60))
+SCRIPT = "<script>" + "window.dataLayer.push({event: 'page_view', id: 12345});\n" * 300 + "</script>"
+STYLE = "<style>" + ".card{margin:0 auto;padding:12px;border:1px solid #eee}\n" * 200 + "</style>"
+CONTENT = "".join(
+    f"<section><h2>Business line {i}</h2><p>ACME Logistics runs {10 + i} regional warehouses and a fleet of "
+    f"electric vans serving retail customers in Spain and Portugal.</p>\n\n<p>Objective {i}: integrate the WMS with "
+    f"SAP S/4HANA and improve inventory visibility.</p></section>\n\n"
+    for i in range(12)
+)
+PAGE = (
+    f"<html><head><title>ACME Logistics</title>{STYLE}{SCRIPT}</head>\n\n<body><header><nav><ul>{NAV}</ul></nav></header>\n\n"
+    f"<main><h1>About ACME Logistics</h1>\n\n{CONTENT}</main>\n\n<footer>{NAV}<p>Cookie settings. Privacy.</p></footer>"
+    f"{SCRIPT}</body></html>"
+).encode("utf-8")
+
+
+def make_transport(latency_ms: float, kb_per_ms: float):
+    async def handler(request):
+        if request.headers.get("if-none-match") == '"v1"':
+            await asyncio.sleep(latency_ms / 1000)
+            return httpx.Response(304, headers={"etag": '"v1"'})
+        await asyncio.sleep(latency_ms / 1000 + len(PAGE) / 1024 / kb_per_ms / 1000)
+        return httpx.Response(200, content=PAGE, headers={"content-type": "text/html; charset=utf-8", "etag": '"v1"'})
+    return httpx.MockTransport(handler)
+
+
+def old_blocks(html: str) -> TextBlocks:
+    # What IngestorAgent._ingest_url used to do with the response text
+    text_blocks = TextBlocks()
+    for i, para in enumerate(html.split("\n\n"), 1):
+        if para.strip():
+            text_blocks.append(para.strip(), f"block_{i}")
+    return text_blocks
+
+
+async def run_old(urls, transport):
+    # One fresh connection and a sequential request per URL, like requests.get in a loop
+    started = time.perf_counter()
+    results = []
+    for url in urls:
+        async with httpx.AsyncClient(transport=transport) as client:
+            results.append(old_blocks((await client.get(url)).text))
+    return time.perf_counter() - started, results
+
+
+async def run_new(urls, transport, cache_dir):
+    fetcher = UrlFetcher(
+        http_client=httpx.AsyncClient(transport=transport), cache_dir=cache_dir, max_concurrency=len(urls),
+        allowed_hosts=["acme.example"],  # served by the mock transport, never resolved
+    )
+    timings = []
+    for _ in range(2):  # cold, then warm (conditional GETs answered with 304)
+        started = time.perf_counter()
+        fetched = await fetcher.fetch_many(urls)
+        results = [IngestorAgent().ingest_web(f)["text_blocks"] for f in fetched]
+        timings.append(time.perf_counter() - started)
+    await fetcher.aclose()
+    return timings, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--urls", type=int, default=6)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--kb-per-ms", type=float, default=0.5, help="transfer speed (0.5 KB/ms = 4 Mbit/s)")
+    args = parser.parse_args()
+
+    urls = [f"https://acme.example/page/{i}" for i in range(args.urls)]
+    transport = make_transport(args.latency_ms, args.kb_per_ms)
+    old_seconds, old_results = asyncio.run(run_old(urls, transport))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        (cold, warm), new_results = asyncio.run(run_new(urls, transport, cache_dir))
+
+    old_tokens = count_tokens(encode_text_blocks(old_results[0]))
+    new_tokens = count_tokens(encode_text_blocks(new_results[0]))
+    print(f"page size: {len(PAGE) / 1024:.1f} KB, {args.urls} URLs, {args.latency_ms:.0f} ms RTT")
+    print(f"{'':<28} {'fetch+parse s':>14} {'tokens/page':>12} {'blocks/page':>12}")
+    print(f"{'before (sequential, raw)':<28} {old_seconds:>14.2f} {old_tokens:>12} {len(old_results[0]):>12}")
+    print(f"{'after, cold':<28} {cold:>14.2f} {new_tokens:>12} {len(new_results[0]):>12}")
+    print(f"{'after, warm (304)':<28} {warm:>14.2f} {new_tokens:>12} {len(new_results[0]):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import asyncio
+import io
+import json
+import time
+import zipfile
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.main import app
+from app.models.context import ClientContext
+from app.services.agentic.coordinator_agent import CoordinatorAgent
+from app.services.batch import BatchScheduler, bundle_name
+
+client = TestClient(app)
+
+
+def _patch_pipeline(monkeypatch, delay=0.05):
+    state = {"running": 0, "peak": 0, "seen": []}
+
+    async def run_pipeline(self, file_path=None, file_paths=None, url=None, enrich_allowed=False, use_cache=True):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        try:
+            await asyncio.sleep(delay)
+            texts = [open(p, encoding="utf-8").read() for p in file_paths]
+            state["seen"].append(texts)
+            if any("boom" in t for t in texts):
+                raise RuntimeError("model unavailable")
+            final = {**ClientContext().model_dump(), "client_name": texts[0].split()[0], "objectives": texts}
+            return {"final_json": final, "log": []}
+        finally:
+            state["running"] -= 1
+
+    monkeypatch.setattr(CoordinatorAgent, "run_pipeline", run_pipeline)
+    monkeypatch.setattr(app.state, "batch_scheduler", BatchScheduler(max_concurrency=2), raising=False)
+    return state
+
+
+def _lines(response):
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_bundle_name_groups_by_top_level_folder():
+    assert bundle_name("acme/rfp.pdf") == "acme"
+    assert bundle_name("acme/notes/kickoff.docx") == "acme"
+    assert bundle_name("globex.txt") == "globex"
+    assert bundle_name("__MACOSX/acme/._rfp.pdf") is None
+    assert bundle_name("acme/logo.png") is None
+
+
+def test_batch_multipart_streams_items_and_isolates_failures(monkeypatch):
+    state = _patch_pipeline(monkeypatch)
+    files = [
+        ("files", ("acme/brief.txt", b"ACME brief", "text/plain")),
+        ("files", ("acme/notes.txt", b"ACME notes", "text/plain")),
+        ("files", ("globex/brief.txt", b"boom", "text/plain")),
+        ("files", ("initech.txt", b"Initech brief", "text/plain")),
+        ("files", ("initech-logo.png", b"\x89PNG", "image/png")),
+    ]
+    lines = _lines(client.post("/context/analyze/batch", files=files))
+
+    items = {line["item"]: line for line in lines if line["event"] == "item"}
+    assert set(items) == {"acme", "globex", "initech"}
+    assert items["acme"]["status"] == "completed"
+    assert items["acme"]["response"]["summary"]["objectives"] == ["ACME brief", "ACME notes"]
+    assert items["globex"] == {**items["globex"], "status": "failed", "error": "model unavailable"}
+    assert items["initech"]["response"]["summary"]["client_name"] == "Initech"
+    assert lines[-1] == {"event": "summary", "items": 3, "completed": 2, "failed": 1}
+    assert state["peak"] <= 2
+
+
+def test_batch_archive_and_directory(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch, delay=0)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("acme/brief.txt", "ACME brief")
+        zf.writestr("../../escape/brief.txt", "Escape brief")
+        zf.writestr("__MACOSX/acme/._brief.txt", "junk")
+    lines = _lines(client.post("/context/analyze/batch", files={"archive": ("batch.zip", archive.getvalue(), "application/zip")}))
+    assert [line["item"] for line in lines[:-1]] == ["acme"]  # '../' members and archive metadata are skipped
+
+    (tmp_path / "nightly" / "umbrella").mkdir(parents=True)
+    (tmp_path / "nightly" / "umbrella" / "rfp.txt").write_text("Umbrella rfp", encoding="utf-8")
+    monkeypatch.setattr(settings, "batch_input_root", str(tmp_path))
+    lines = _lines(client.post("/context/analyze/batch", data={"directory": "nightly"}))
+    assert [line["item"] for line in lines[:-1]] == ["umbrella"]
+
+    r = client.post("/context/analyze/batch", data={"directory": "../"})
+    assert r.status_code == 400
+    r = client.post("/context/analyze/batch", files={"archive": ("batch.zip", b"not a zip", "application/zip")})
+    assert r.status_code == 400
+
+
+def test_scheduler_spaces_item_starts():
+    scheduler = BatchScheduler(max_concurrency=4, max_starts_per_minute=600)  # one start every 100ms
+    starts = []
+
+    async def fn(item):
+        starts.append(time.monotonic())
+
+    async def scenario():
+        return [outcome async for outcome in scheduler.run([{"name": str(i)} for i in range(3)], fn)]
+
+    outcomes = asyncio.run(scenario())
+    assert [o["status"] for o in outcomes] == ["completed"] * 3
+    assert starts[2] - starts[0] >= 0.19
@@ -0,0 +1,56 @@
+import pickle
+from docx import Document
+from app.services.agentic.blocks import BlockGrouper, TextBlocks, looks_like_heading
+from app.services.agentic.ingestor_agent import IngestorAgent
+from app.services.agentic.prompt_encoding import encode_text_blocks
+
+
+def test_txt_lines_grouped_by_headings_blank_runs_and_bullets(tmp_path):
+    p = tmp_path / "brief.txt"
+    p.write_text(
+        "OVERVIEW\nACME wants SAP.\nIt has 40 sites.\n\n"
+        "Goals:\n- cut costs\n- scale regionally\n\n\n"
+        "Closing remarks follow here.\n",
+        encoding="utf-8",
+    )
+    result = IngestorAgent().ingest(file_path=str(p))
+
+    assert result["text_blocks"].anchors == ["line_1-3", "line_5-7", "line_10"]
+    assert result["text_blocks"][1]["text"] == "Goals:\n- cut costs\n- scale regionally"
+    assert result["metadata"] == {"file_type": "txt", "lines": 7, "blocks": 3, "sections": 2}
+    assert encode_text_blocks(result["text_blocks"]).splitlines()[0] == "[line_1-3] OVERVIEW ACME wants SAP. It has 40 sites."
+
+
+def test_docx_heading_styles_start_sections(tmp_path):
+    document = Document()
+    document.add_heading("Background", level=1)
+    document.add_paragraph("ACME is a logistics operator.")
+    document.add_paragraph("It runs 40 warehouses.")
+    document.add_heading("Objectives", level=2)
+    document.add_paragraph("Integrate the WMS with SAP", style="List Bullet")
+    path = str(tmp_path / "brief.docx")
+    document.save(path)
+
+    result = IngestorAgent().ingest(file_path=path)
+    assert result["text_blocks"].anchors == ["para_1-3", "para_4-5"]
+    assert result["metadata"]["paragraphs"] == 5
+    assert result["metadata"]["sections"] == 2
+
+
+def test_grouper_splits_at_size_limit_but_keeps_bullet_runs():
+    grouper = BlockGrouper("line", max_chars=30)
+    grouper.add(1, "Requirements for the project")
+    grouper.add(2, "- first requirement")
+    grouper.add(3, "- second requirement")
+    grouper.add(4, "A new paragraph of prose here")
+    blocks = grouper.finish()
+    assert blocks.anchors == ["line_1-3", "line_4"]
+
+
+def test_text_blocks_behave_like_dict_lists_and_pickle():
+    blocks = TextBlocks.from_dicts([{"text": "a", "anchor": "page_1"}, {"text": "b", "anchor": "page_2"}])
+    assert blocks[0]["text"] == "a" and blocks[1].anchor == "page_2"
+    assert blocks == [{"text": "a", "anchor": "page_1"}, {"text": "b", "anchor": "page_2"}]
+    assert pickle.loads(pickle.dumps(blocks)) == blocks
+    assert not hasattr(blocks, "__dict__")
+    assert looks_like_heading("2.1 Scope") and not looks_like_heading("The supplier shall comply.")
@@ -0,0 +1,89 @@
+import time
+from app.services.cache import ResultCache, make_cache_key
+
+
+def test_cache_key_ignores_whitespace_but_not_model():
+    blocks = [{"text": "ACME  wants\nSAP", "anchor": "line_1"}, {"text": "  ", "anchor": "line_2"}]
+    same = [{"text": "ACME wants SAP", "anchor": "line_1"}]
+    key = make_cache_key(blocks, "{\n  }", "1", "gpt-4o", enrich_allowed=False)
+    assert key == make_cache_key(same, "{ }", "1", "gpt-4o", enrich_allowed=False)
+    assert key != make_cache_key(same, "{ }", "1", "gpt-4o-mini", enrich_allowed=False)
+    assert key != make_cache_key(same, "{ }", "2", "gpt-4o", enrich_allowed=False)
+    assert key != make_cache_key(same, "{ }", "1", "gpt-4o", enrich_allowed=True)
+
+
+def test_pipeline_cache_key_covers_file_metadata():
+    from app.services.agentic.coordinator_agent import _cache_key
+
+    blocks = [{"text": "ACME wants SAP", "anchor": "page_1"}]
+    pdf = {"text_blocks": blocks, "metadata": {"file_type": "pdf", "pages": [{}]}}
+    docx = {"text_blocks": blocks, "metadata": {"file_type": "docx", "paragraphs": 1}}
+    assert _cache_key(pdf, "gpt-4o", False) == _cache_key(dict(pdf), "gpt-4o", False)
+    assert _cache_key(pdf, "gpt-4o", False) != _cache_key(docx, "gpt-4o", False)
+
+
+def test_result_with_a_failed_chunk_is_reported_and_not_cached(tmp_path, monkeypatch):
+    import asyncio
+    import json
+    from autogen_ext.models.replay import ReplayChatCompletionClient
+    from app.core.config import settings
+    from app.services.agentic.coordinator_agent import CoordinatorAgent
+    from app.services.agentic.extractor_agent import ExtractorAgent
+    from app.services.agentic.ingestion import IngestionExecutor
+    from app.services.agentic.registry import AgentRegistry
+
+    monkeypatch.setattr(settings, "extract_chunk_tokens", 120)
+    monkeypatch.setattr(settings, "relevance_filter_enabled", False)
+    monkeypatch.setattr(settings, "incremental_enabled", False)
+    brief = tmp_path / "brief.txt"
+    brief.write_text("\n".join(f"Section {i}: " + "ACME Logistics runs regional warehouses " * 8 for i in range(2)))
+    registry = AgentRegistry(model_backend="fake")
+    registry._ingestion = IngestionExecutor(process_workers=0)
+    replies = [json.dumps({"client_name": "ACME Logistics"}), "the model rambled instead of answering"]
+    registry._agents["extractor"] = ExtractorAgent(model_client=ReplayChatCompletionClient(replies))
+    try:
+        result = asyncio.run(CoordinatorAgent(registry=registry).run_pipeline(file_path=str(brief)))
+        final = result["final_json"]
+        assert final["client_name"] == "ACME Logistics"
+        assert len(final["partial_failure"]) == 1 and final["partial_failure"][0].startswith("chunk 2 of 2: Failed to parse JSON")
+        assert any(note.startswith("Extraction failed for chunk 2 of 2") for note in final["notes"])
+        assert registry.cache.stats()["entries"] == 0  # the incomplete result is not cached
+    finally:
+        asyncio.run(registry.aclose())
+
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}  # a becomes most recent
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("c") == {"v": 3}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 2)
+
+
+def test_size_and_ttl_eviction():
+    cache = ResultCache(max_entries=10, max_bytes=40)
+    cache.set("a", {"text": "x" * 20})
+    cache.set("b", {"text": "y" * 20})
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] <= 40
+
+    cache = ResultCache(ttl_seconds=0.01)
+    cache.set("a", {"v": 1})
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResultCache(sqlite_path=path)
+    cache.set("k", {"client_name": "ACME"})
+    cache.close()
+
+    reopened = ResultCache(sqlite_path=path)
+    assert reopened.get("k") == {"client_name": "ACME"}
+    assert reopened.stats()["disk_hits"] == 1
+    reopened.close()
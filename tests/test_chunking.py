@@ -0,0 +1,54 @@
+import asyncio
+import json
+from autogen_ext.models.replay import ReplayChatCompletionClient
+from app.core.config import settings
+from app.services.agentic.chunking import chunk_text_blocks, count_tokens
+from app.services.agentic.extractor_agent import ExtractorAgent
+from app.services.agentic.merge import merge_partial_contexts
+
+
+def _blocks(n, words=50):
+    return [{"text": " ".join(["word"] * words), "anchor": f"page_{i}"} for i in range(1, n + 1)]
+
+
+def test_chunks_respect_budget_and_keep_order():
+    blocks = _blocks(20)
+    chunks = chunk_text_blocks(blocks, max_tokens=200)
+    assert len(chunks) > 1
+    assert [b["anchor"] for chunk in chunks for b in chunk] == [b["anchor"] for b in blocks]
+    for chunk in chunks:
+        assert sum(count_tokens(b["text"]) + 8 for b in chunk) <= 200
+
+
+def test_oversized_block_is_split_with_its_anchor():
+    chunks = chunk_text_blocks([{"text": "lorem ipsum " * 500, "anchor": "page_7"}], max_tokens=100)
+    assert len(chunks) > 1
+    assert {b["anchor"] for chunk in chunks for b in chunk} == {"page_7"}
+
+
+def test_merge_dedupes_lists_and_keeps_evidence():
+    merged = merge_partial_contexts([
+        {"client_name": {"value": "ACME", "evidence": "page_1"}, "objectives": ["Reduce costs", "Integrate SAP"],
+         "evidence": {"objectives": ["page_1"]}},
+        {"client_name": "ACME", "objectives": ["reduce costs.", {"value": "Expand to LATAM", "evidence": "page_9"}],
+         "business_overview": "Logistics operator", "engagement_age": None},
+        {"error": "Failed to parse JSON", "raw_response": "..."},
+    ])
+    assert merged["client_name"] == "ACME"
+    assert merged["objectives"] == ["Reduce costs", "Integrate SAP", "Expand to LATAM"]
+    assert merged["business_overview"] == "Logistics operator"
+    assert merged["engagement_age"] == 0
+    assert merged["evidence"]["client_name"] == ["page_1"]
+    assert merged["evidence"]["objectives"] == ["page_1", "page_9"]
+    assert merged["partial_failure"] == ["chunk 3 of 3: Failed to parse JSON"]
+    assert "Extraction failed for chunk 3 of 3: Failed to parse JSON" in merged["notes"]
+
+
+def test_extract_map_reduce_over_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "extract_chunk_tokens", 200)
+    responses = [json.dumps({"client_name": "ACME", "objectives": [f"Objective {i % 2}"]}) for i in range(10)]
+    extractor = ExtractorAgent(model_client=ReplayChatCompletionClient(responses))
+
+    result = asyncio.run(extractor.extract(_blocks(8), {"file_type": "txt"}))
+    assert result["client_name"] == "ACME"
+    assert sorted(result["objectives"]) == ["Objective 0", "Objective 1"]
@@ -0,0 +1,104 @@
+import asyncio
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.agentic.coordinator_agent import CoordinatorAgent
+from app.services.agentic.fake_model_client import FakeChatCompletionClient
+from app.services.agentic.registry import AgentRegistry
+from app.services.agentic.researcher_agent import ResearcherAgent
+from app.services.company_profiles import CompanyProfileStore, normalize_company_name
+
+SOURCES = {"industry": "https://example.com/acme", "company_info": "https://example.com/acme/about"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_names_are_normalized_and_fuzzy_matched():
+    assert normalize_company_name("ACME Logistics, S.A.") == "acme logistics"
+    assert normalize_company_name("Acme logistics SA") == "acme logistics"
+    assert normalize_company_name("Telefónica S.L.U.") == "telefonica"
+    assert normalize_company_name("The Widget Company Inc.") == "widget"
+
+    store = CompanyProfileStore(clock=Clock())
+    store.update("ACME Logistics S.A.", {"industry": "Logistics", "objectives": ["not company-level"]}, SOURCES)
+    found = store.fresh("Acme Logisitcs", ["industry", "company_info"])  # typo still matches
+    assert found["key"] == "acme logistics"
+    assert found["values"] == {"industry": "Logistics"}
+    assert found["sources"] == {"industry": "https://example.com/acme"}
+    assert store.fresh("Globex Corporation", ["industry"])["values"] == {}
+    assert store.stats()["lookups"] == {"hit": 0, "partial": 1, "miss": 1}
+
+
+def test_fuzzy_match_only_compares_keys_with_the_same_first_word():
+    store = CompanyProfileStore(clock=Clock())
+    store.update("Globex Corporation", {"industry": "Energy"})
+    store.update("ACME Logistics", {"industry": {"value": "Logistics", "evidence": "https://example.com/acme"}})
+    assert store.get("acme logistics")["fields"]["industry"]["value"] == "Logistics"  # evidence wrapper unwrapped
+    assert store._by_first_word == {"globex": {"globex"}, "acme": {"acme logistics"}}
+    assert store.fresh("Acme Logistic", ["industry"])["key"] == "acme logistics"
+    assert store.fresh("Acne Logistics", ["industry"])["values"] == {}  # different first word, no candidates
+    store.invalidate("acme logistics")
+    assert "acme" not in store._by_first_word
+
+
+def test_fields_expire_per_ttl_and_persist(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "profiles.sqlite")
+    store = CompanyProfileStore(ttl_seconds=100, field_ttl_seconds={"company_info": 10}, sqlite_path=path, clock=clock)
+    store.update("ACME", {"industry": "Logistics", "company_info": "40 warehouses"}, SOURCES)
+    clock.now += 20
+    assert store.fresh("acme", ["industry", "company_info"])["values"] == {"industry": "Logistics"}
+    store.close()
+
+    reopened = CompanyProfileStore(ttl_seconds=100, sqlite_path=path, clock=clock)
+    assert reopened.get("ACME")["fields"]["industry"]["source"] == "https://example.com/acme"
+    clock.now += 100
+    assert reopened.purge_expired() == 1
+    assert reopened.get("acme") is None
+
+
+def test_researcher_is_skipped_when_the_profile_is_fresh():
+    registry = AgentRegistry(model_backend="fake")
+    client = FakeChatCompletionClient(responses={"researcher": {"company_info": "3PL with 40 warehouses.", "industry": "Logistics", "sources": SOURCES}})
+    registry._agents["researcher"] = ResearcherAgent(model_client=client)
+    coordinator = CoordinatorAgent(registry=registry)
+    request = {"identity": {"client_name": "ACME Logistics S.A."}, "missing": ["company_info", "industry"]}
+
+    first = asyncio.run(coordinator._research(request, []))
+    assert client.calls == {"researcher": 1}
+
+    log = []
+    again = asyncio.run(coordinator._research({**request, "identity": {"client_name": "Acme Logistics"}}, log))
+    assert client.calls == {"researcher": 1}
+    assert again["company_info"] == first["company_info"] and again["sources"] == SOURCES
+    assert log == [{"company_profile": {"key": "acme logistics", "fresh": ["company_info", "industry"], "research": []}}]
+
+    # Engagement-specific fields are never stored, so only they go to the Researcher
+    log = []
+    asyncio.run(coordinator._research({**request, "missing": ["company_info", "objectives"]}, log))
+    assert client.calls == {"researcher": 2}
+    assert log[0]["company_profile"]["research"] == ["objectives"]
+
+
+def test_admin_endpoints_inspect_and_invalidate():
+    registry = AgentRegistry(model_backend="fake")
+    app.state.agent_registry = registry
+    try:
+        registry.company_profiles.update("ACME Logistics S.A.", {"industry": "Logistics", "location": "Madrid"}, SOURCES)
+        client = TestClient(app)
+
+        listing = client.get("/context/profiles").json()
+        assert listing["profiles"] == 1 and listing["entries"][0]["key"] == "acme logistics"
+        assert client.get("/context/profiles/ACME Logistics").json()["fields"]["industry"]["value"] == "Logistics"
+
+        assert client.delete("/context/profiles/acme logistics", params={"fields": ["industry"]}).status_code == 200
+        assert list(client.get("/context/profiles/acme logistics").json()["fields"]) == ["location"]
+        assert client.delete("/context/profiles").json() == {"removed": 1}
+        assert client.get("/context/profiles/acme logistics").status_code == 404
+    finally:
+        del app.state.agent_registry
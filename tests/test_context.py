@@ -2,6 +2,8 @@ from fastapi.testclient import TestClient
 from app.main import app
 import json
 import os
+import time
+import pytest
 
 # Ensure OPENAI_API_KEY present for agent initialization during tests
 os.environ.setdefault("OPENAI_API_KEY", "test-key")
@@ -34,15 +36,19 @@ async def _mock_run_pipeline(self, file_path=None, url=None, enrich_allowed=Fals
         return "ACME Corp"
     return _fake_pipeline_result(get_client_name())
 
-async def _mock_run_pipeline(self, file_path=None, file_paths=None, url=None, enrich_allowed=False):
+async def _mock_run_pipeline(self, file_path=None, file_paths=None, url=None, enrich_allowed=False, use_cache=True):
     # Use file_path, file_paths, or url to derive client name optionally, else default
     return _fake_pipeline_result("ACME Corp")
 
-CoordinatorAgent.run_pipeline = _mock_run_pipeline
-CoordinatorAgent.run_pipeline = _mock_run_pipeline
-
 client = TestClient(app)
 
+
+@pytest.fixture(autouse=True)
+def fake_pipeline(monkeypatch):
+    # Only for this module's tests; other modules run the real coordinator
+    monkeypatch.setattr(CoordinatorAgent, "run_pipeline", _mock_run_pipeline)
+    monkeypatch.setattr(CoordinatorAgent, "stream_pipeline", _mock_stream_pipeline)
+
 def test_context_single_endpoint_text_blocks():
     blocks = ["ACME busca optimizar su cadena de suministro."]
     r = client.post(
@@ -133,3 +139,52 @@ def test_context_multiple_file_upload_txt():
     assert data["summary"]["client_name"] == "ACME Corp"
     assert "Synthetic overview for tests" in data["summary"]["business_overview"]
     assert isinstance(data["summary"]["objectives"], list)
+
+
+async def _mock_stream_pipeline(self, file_path=None, file_paths=None, url=None, enrich_allowed=False, use_cache=True, stream_tokens=False):
+    result = _fake_pipeline_result("ACME Corp")
+    yield {"event": "started"}
+    yield {"event": "stage", "stage": "ingest", "elapsed_ms": 1.0, "data": {"file_type": "txt"}}
+    yield {"event": "token", "stage": "extract", "text": '{"client_name"'}
+    yield {"event": "result", "final_json": result["final_json"], "log": result["log"], "timings": {"ingest": 1.0}}
+
+
+def test_context_stream_endpoint_emits_sse_events():
+    files = {"files": ("brief.txt", "ACME quiere integrar ERP SAP", "text/plain")}
+    with client.stream("POST", "/context/analyze/stream", data={"client_name": "ACME"}, files=files) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        body = "".join(r.iter_text())
+
+    events = [chunk.split("\n") for chunk in body.strip().split("\n\n")]
+    assert [e[0] for e in events] == ["event: started", "event: stage", "event: token", "event: result"]
+    result = json.loads(events[-1][1][len("data: "):])
+    assert result["response"]["status"] == "completed"
+    assert result["response"]["summary"]["client_name"] == "ACME Corp"
+
+
+def test_context_job_api_returns_real_analysis_id():
+    with TestClient(app) as c:
+        r = c.post("/context/jobs", data={"client_name": "ACME", "raw_text_blocks": "ACME busca optimizar su cadena"})
+        assert r.status_code == 202
+        job_id = r.json()["analysis_id"]
+        assert job_id != "autogen-pipeline"
+
+        for _ in range(100):
+            job = c.get(f"/context/jobs/{job_id}").json()
+            if job["status"] == "completed":
+                break
+            time.sleep(0.01)
+        assert job["status"] == "completed"
+        assert job["result"]["analysis_id"] == job_id
+        assert job["result"]["summary"]["client_name"] == "ACME Corp"
+
+        assert c.get("/context/jobs/unknown").status_code == 404
+
+
+def test_context_upload_over_size_limit_returns_413(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "upload_max_file_bytes", 10)
+    files = {"files": ("brief.txt", "ACME quiere integrar ERP SAP y reducir costos", "text/plain")}
+    r = client.post("/context/analyze", data={"client_name": "ACME"}, files=files)
+    assert r.status_code == 413
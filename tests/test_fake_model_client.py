@@ -0,0 +1,74 @@
+import asyncio
+import time
+import pytest
+from autogen_core.models import CreateResult, UserMessage
+from app.services.agentic.extractor_agent import ExtractorAgent
+from app.services.agentic.fake_model_client import FakeChatCompletionClient, FakeModelError
+from app.services.agentic.registry import AgentRegistry
+from app.services.agentic.validator_agent import ValidatorAgent
+from benchmarks.load import parse_server_timing, percentile
+
+
+def test_extractor_and_validator_run_on_fake_client():
+    client = FakeChatCompletionClient(seed=1)
+    blocks = [{"text": "ACME Logistics wants to integrate its WMS with SAP.", "anchor": "page_1"}]
+
+    extracted = asyncio.run(ExtractorAgent(model_client=client).extract(blocks, {"file_type": "pdf"}))
+    validated = asyncio.run(ValidatorAgent(model_client=client).validate(extracted))
+
+    assert validated["client_name"] == "ACME Logistics S.A."
+    assert validated["evidence"]["client_name"] == ["page_1"]
+    assert client.calls == {"extractor": 1}  # canned reply is valid, so no repair call
+    assert client.total_usage().prompt_tokens > 0
+
+
+def test_latency_token_rate_and_overrides():
+    client = FakeChatCompletionClient(latency_ms=50, tokens_per_second=1000, responses={"default": "x" * 200})
+    started = time.perf_counter()
+    result = asyncio.run(client.create([UserMessage(content="hello", source="user")]))
+    elapsed = time.perf_counter() - started
+
+    assert result.content == "x" * 200
+    assert elapsed >= 0.05 + result.usage.completion_tokens / 1000
+
+
+def test_failure_injection_is_reproducible():
+    def outcomes(seed):
+        client = FakeChatCompletionClient(failure_rate=0.5, seed=seed)
+        results = []
+        for _ in range(20):
+            try:
+                asyncio.run(client.create([UserMessage(content="hi", source="user")]))
+                results.append(True)
+            except FakeModelError as e:
+                assert e.status_code == 503
+                results.append(False)
+        return results
+
+    assert outcomes(7) == outcomes(7)
+    assert 0 < outcomes(7).count(False) < 20
+
+
+def test_stream_yields_deltas_then_result():
+    client = FakeChatCompletionClient(responses={"default": {"a": 1}})
+
+    async def collect():
+        return [item async for item in client.create_stream([UserMessage(content="hi", source="user")])]
+
+    items = asyncio.run(collect())
+    assert isinstance(items[-1], CreateResult)
+    assert "".join(items[:-1]) == items[-1].content == '{"a": 1}'
+
+
+def test_registry_fake_backend_needs_no_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    registry = AgentRegistry(model_backend="fake")
+    assert isinstance(registry.extractor().model_client.inner, FakeChatCompletionClient)
+    with pytest.raises(ValueError):
+        FakeChatCompletionClient(latency_distribution="pareto")
+
+
+def test_benchmark_helpers():
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert parse_server_timing("ingest;dur=12.5, extract;dur=300.0") == {"ingest": 12.5, "extract": 300.0}
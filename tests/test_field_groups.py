@@ -0,0 +1,48 @@
+import asyncio
+import time
+from app.core.config import settings
+from app.services.agentic.extractor_agent import ExtractorAgent
+from app.services.agentic.fake_model_client import FakeChatCompletionClient
+from app.services.agentic.field_groups import FIELD_GROUPS, group_output_model
+from app.services.agentic.validator_agent import ValidatorAgent
+
+
+class RecordingClient(FakeChatCompletionClient):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.json_outputs = []
+
+    async def create(self, messages, **kwargs):
+        self.json_outputs.append(kwargs.get("json_output"))
+        return await super().create(messages, **kwargs)
+
+
+def test_group_models_are_strict_and_cover_client_context():
+    covered = [f for fields in FIELD_GROUPS.values() for f in fields]
+    assert sorted(covered) == sorted(["client_name", "industry", "location", "engagement_age", "business_overview",
+                                      "objectives", "company_info", "additional_context_questions",
+                                      "potential_future_opportunities"])
+    schema = group_output_model("lists").model_json_schema()
+    assert set(schema["required"]) == {"objectives", "additional_context_questions", "potential_future_opportunities", "evidence", "notes"}
+    assert schema["additionalProperties"] is False
+
+
+def test_fanout_runs_groups_concurrently_and_merges(monkeypatch):
+    monkeypatch.setattr(settings, "extract_mode", "fanout")
+    client = RecordingClient(latency_ms=200)
+    blocks = [{"text": "ACME Logistics wants to integrate its WMS with SAP.", "anchor": "page_1"}]
+
+    started = time.perf_counter()
+    extracted = asyncio.run(ExtractorAgent(model_client=client).extract(blocks, {"file_type": "pdf"}))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.45  # three 200ms calls in parallel, not in sequence
+    assert client.calls == {"extractor": 3}
+    assert client.json_outputs == [group_output_model(g) for g in FIELD_GROUPS]
+    assert extracted["client_name"] == "ACME Logistics S.A."
+    assert extracted["objectives"][0] == "Integrate the WMS with SAP S/4HANA"
+    assert extracted["evidence"] == {"client_name": ["page_1"], "objectives": ["page_2"]}
+
+    validated = asyncio.run(ValidatorAgent(model_client=client).validate(extracted))
+    assert validated["industry"] == "Logistics"
+    assert client.calls == {"extractor": 3}  # no repair round trip
@@ -0,0 +1,116 @@
+import asyncio
+from app.core.config import settings
+from app.services.agentic.extractor_agent import ExtractorAgent
+from app.services.agentic.fake_model_client import FakeChatCompletionClient
+from app.services.agentic.incremental import IncrementalExtractor
+from app.services.cache import ResultCache
+
+
+def _part(*texts, file_type="txt"):
+    blocks = [{"text": t, "anchor": f"line_{i + 1}"} for i, t in enumerate(texts)]
+    return {"text_blocks": blocks, "metadata": {"file_type": file_type}}
+
+
+def _run(incremental, parts):
+    return asyncio.run(incremental.extract(parts))
+
+
+def test_second_run_reextracts_only_the_changed_file(monkeypatch):
+    monkeypatch.setattr(settings, "extract_mode", "single")
+    client = FakeChatCompletionClient(latency_ms=0, latency_jitter_ms=0)
+    incremental = IncrementalExtractor(ExtractorAgent(model_client=client), ResultCache(), "fake-model")
+    brief = _part("ACME Logistics wants to integrate its WMS with SAP.")
+    notes = _part("Kick-off meeting notes: warehouses in Madrid.", file_type="docx")
+
+    first, report = _run(incremental, [brief, notes])
+    assert client.calls == {"extractor": 2}
+    assert [e["status"] for e in report] == ["extracted", "extracted"]
+    assert first["client_name"] == "ACME Logistics S.A."
+
+    changed = _part("Updated kick-off notes: warehouses in Madrid and Lisbon.", file_type="docx")
+    second, report = _run(incremental, [brief, changed])
+    assert client.calls == {"extractor": 3}
+    assert [e["status"] for e in report] == ["reused", "extracted"]
+    assert report[0]["chunks_reused"] == report[0]["chunks_total"] == 1
+    assert second == first  # canned replies: same merged context
+
+    _, report = _run(incremental, [brief, changed])
+    assert client.calls == {"extractor": 3}
+    assert [e["status"] for e in report] == ["reused", "reused"]
+
+
+def test_edited_file_reuses_its_unchanged_chunks(monkeypatch):
+    monkeypatch.setattr(settings, "extract_mode", "single")
+    monkeypatch.setattr(settings, "extract_chunk_tokens", 120)  # one section per chunk
+    client = FakeChatCompletionClient(latency_ms=0, latency_jitter_ms=0)
+    incremental = IncrementalExtractor(ExtractorAgent(model_client=client), ResultCache(), "fake-model")
+    sections = [f"Section {i}: " + "the client operates regional warehouses " * 8 for i in range(3)]
+
+    _, report = _run(incremental, [_part(*sections)])
+    assert report[0]["chunks_total"] == 3
+    assert client.calls == {"extractor": 3}
+
+    sections[2] = "Section 2 was rewritten: the client now also runs cross-dock hubs " * 4
+    _, report = _run(incremental, [_part(*sections)])
+    assert report[0]["status"] == "partial"
+    assert report[0]["chunks_reused"] == 2
+    assert client.calls == {"extractor": 4}
+
+
+def test_metadata_change_is_a_new_fingerprint(monkeypatch):
+    monkeypatch.setattr(settings, "extract_mode", "single")
+    client = FakeChatCompletionClient(latency_ms=0, latency_jitter_ms=0)
+    incremental = IncrementalExtractor(ExtractorAgent(model_client=client), ResultCache(), "fake-model")
+    text = "ACME Logistics wants to integrate its WMS with SAP."
+
+    _run(incremental, [_part(text, file_type="txt")])
+    _, report = _run(incremental, [_part(text, file_type="docx")])  # same blocks, different prompt metadata
+    assert report[0]["status"] == "extracted"
+    assert client.calls == {"extractor": 2}
+
+
+def test_failed_file_is_reported_and_not_stored(monkeypatch):
+    import json
+    from autogen_ext.models.replay import ReplayChatCompletionClient
+
+    monkeypatch.setattr(settings, "extract_mode", "single")
+    replies = [json.dumps({"client_name": "ACME"}), "not JSON", json.dumps({"location": "Madrid"})]
+    cache = ResultCache()
+    incremental = IncrementalExtractor(ExtractorAgent(model_client=ReplayChatCompletionClient(replies)), cache, "replay")
+    brief = _part("ACME Logistics wants to integrate its WMS with SAP.")
+    notes = _part("Kick-off meeting notes: warehouses in Madrid.", file_type="docx")
+
+    merged, report = _run(incremental, [brief, notes])
+    assert [(e["status"], e["chunks_failed"]) for e in report] == [("extracted", 0), ("failed", 1)]
+    assert merged["client_name"] == "ACME"
+    assert len(merged["partial_failure"]) == 1 and merged["partial_failure"][0].startswith("file 2 of 2: Failed to parse JSON")
+    assert any(note.startswith("Extraction failed for file 2 of 2") for note in merged["notes"])
+    assert cache.stats()["entries"] == 2  # the good file and its chunk; nothing from the failed one
+
+    merged, report = _run(incremental, [brief, notes])
+    assert [e["status"] for e in report] == ["reused", "extracted"]
+    assert merged["location"] == "Madrid" and "partial_failure" not in merged
+
+
+def test_partials_have_their_own_namespace_and_capacity(tmp_path, monkeypatch):
+    from app.services.agentic.registry import AgentRegistry
+
+    monkeypatch.setattr(settings, "incremental_enabled", True)
+    monkeypatch.setattr(settings, "cache_sqlite_path", str(tmp_path / "cache.db"))
+    monkeypatch.setattr(settings, "incremental_cache_max_entries", 3)
+    registry = AgentRegistry(model_backend="fake")
+    try:
+        results, partials = registry.cache, registry.partials_cache
+        assert partials is not results and partials.max_entries == 3
+        results.set("k", {"result": "full"})
+        for i in range(5):
+            partials.set(f"p{i}", {"partial": i})
+        partials.set("k", {"partial": "same key"})
+        assert results.stats()["entries"] == 1 and partials.stats()["entries"] == 3
+        assert results.get("k") == {"result": "full"}
+        assert partials.get("k") == {"partial": "same key"}
+    finally:
+        asyncio.run(registry.aclose())
+
+    monkeypatch.setattr(settings, "incremental_enabled", False)
+    assert AgentRegistry(model_backend="fake").partials_cache is None
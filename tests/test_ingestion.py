@@ -0,0 +1,83 @@
+import asyncio
+import time
+import pytest
+from app.services.agentic import ingestion
+from app.services.agentic.ingestion import IngestionExecutor, IngestionTimeoutError
+
+
+def test_ingest_many_preserves_input_order(tmp_path):
+    paths = []
+    for i, text in enumerate(["first brief\nsecond line\n\n\nlast line", "other brief"]):
+        p = tmp_path / f"brief{i}.txt"
+        p.write_text(text, encoding="utf-8")
+        paths.append(str(p))
+
+    executor = IngestionExecutor(process_workers=0, thread_workers=2, timeout=5)
+    try:
+        result = asyncio.run(executor.ingest_many(paths))
+    finally:
+        executor.shutdown()
+
+    assert [b["text"] for b in result["text_blocks"]] == ["first brief\nsecond line", "last line", "other brief"]
+    assert result["text_blocks"].anchors == ["line_1-2", "line_5", "line_1"]
+    assert [m["lines"] for m in result["metadata"]["files"]] == [3, 1]
+
+
+def test_ingest_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion, "_ingest_source", lambda file_path=None, url=None: time.sleep(0.5))
+    p = tmp_path / "slow.txt"
+    p.write_text("x", encoding="utf-8")
+
+    executor = IngestionExecutor(process_workers=0, thread_workers=1, timeout=0.05)
+    try:
+        pool = executor._threads()
+        with pytest.raises(IngestionTimeoutError):
+            asyncio.run(executor.ingest(file_path=str(p)))
+        # The stuck worker keeps its slot, so the next source gets a fresh pool
+        assert executor._thread_pool is None and executor._threads() is not pool
+    finally:
+        executor.shutdown()
+
+
+def test_ingest_timeout_is_a_504(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    from app.services.agentic.coordinator_agent import CoordinatorAgent
+
+    async def timed_out(self, *args, **kwargs):
+        raise IngestionTimeoutError("Ingestion of slow.pdf exceeded 60.0s")
+
+    monkeypatch.setattr(CoordinatorAgent, "run_pipeline", timed_out)
+    r = TestClient(app).post("/context/analyze", data={"client_name": "ACME", "raw_text_blocks": "ACME brief"})
+    assert r.status_code == 504
+    assert "exceeded" in r.json()["detail"]
+
+
+def test_auto_pdf_backend_uses_pdfplumber_only_for_table_pages(tmp_path):
+    from benchmarks.corpus import write_pdf
+    from app.services.agentic.ingestor_agent import IngestorAgent
+
+    path = str(tmp_path / "rfp.pdf")
+    write_pdf(path, 4, table_every=2)
+    result = IngestorAgent().ingest_pdf_pages(path, backend="auto")
+
+    assert [p["backend"] for p in result["metadata"]["pages"]] == ["pypdf", "pdfplumber", "pypdf", "pdfplumber"]
+    assert "R8C5 88" in result["text_blocks"][1]["text"]
+    assert [b["anchor"] for b in IngestorAgent().ingest_pdf_pages(path, 2, 3)["text_blocks"]] == ["page_2", "page_3"]
+
+
+def test_large_pdf_is_parsed_in_page_ranges_in_order(tmp_path):
+    from benchmarks.corpus import write_pdf
+
+    path = str(tmp_path / "long.pdf")
+    write_pdf(path, 7)
+    executor = IngestionExecutor(process_workers=2, timeout=60, pdf_parallel_min_pages=4, pdf_pages_per_task=3)
+    try:
+        result = asyncio.run(executor.ingest(file_path=path))
+    finally:
+        executor.shutdown()
+
+    assert [b["anchor"] for b in result["text_blocks"]] == [f"page_{i}" for i in range(1, 8)]
+    assert [p["page"] for p in result["metadata"]["pages"]] == list(range(1, 8))
+    assert "Page 7 of 7" in result["text_blocks"][-1]["text"]
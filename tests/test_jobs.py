@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from app.services.jobs import (
+    CANCELLED, COMPLETED, FAILED, InMemoryJobStore, JobManager, JobQueueFullError, SQLiteJobStore,
+)
+
+
+async def _wait_for(manager, job_id, statuses):
+    for _ in range(200):
+        job = await manager.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} stuck in {job['status']}")
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_jobs_complete_fail_and_clean_up(backend, tmp_path):
+    store = InMemoryJobStore() if backend == "memory" else SQLiteJobStore(str(tmp_path / "jobs.sqlite"))
+    cleaned = []
+
+    async def ok(job_id):
+        return {"analysis_id": job_id}
+
+    async def boom(job_id):
+        raise RuntimeError("model unavailable")
+
+    async def scenario():
+        manager = JobManager(store=store, workers=2, max_queue=10)
+        ok_id = await manager.submit(ok, on_done=lambda: cleaned.append("ok"))
+        bad_id = await manager.submit(boom, on_done=lambda: cleaned.append("bad"))
+        ok_job = await _wait_for(manager, ok_id, (COMPLETED,))
+        bad_job = await _wait_for(manager, bad_id, (FAILED,))
+        await manager.stop()
+        return ok_id, ok_job, bad_job
+
+    ok_id, ok_job, bad_job = asyncio.run(scenario())
+    assert ok_job["result"] == {"analysis_id": ok_id}
+    assert bad_job["error"] == "model unavailable"
+    assert sorted(cleaned) == ["bad", "ok"]
+
+
+def test_queue_backpressure_and_cancellation():
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def blocked(job_id):
+            await gate.wait()
+            return {}
+
+        manager = JobManager(workers=1, max_queue=1)
+        running = await manager.submit(blocked)
+        await asyncio.sleep(0.01)  # worker picks up the first job
+        queued = await manager.submit(blocked)
+        with pytest.raises(JobQueueFullError):
+            await manager.submit(blocked)
+
+        assert (await manager.cancel(queued))["status"] == CANCELLED
+        # The cancelled job's id is still in the queue, but its slot is free again
+        requeued = await manager.submit(blocked)
+        with pytest.raises(JobQueueFullError):
+            await manager.submit(blocked)
+        await manager.cancel(requeued)
+        await manager.cancel(running)
+        job = await _wait_for(manager, running, (CANCELLED,))
+        await manager.stop()
+        return job
+
+    assert asyncio.run(scenario())["status"] == CANCELLED
+
+
+def test_finished_jobs_expire():
+    async def scenario():
+        async def ok(job_id):
+            return {}
+
+        manager = JobManager(workers=1, result_ttl=0.05)
+        job_id = await manager.submit(ok)
+        await _wait_for(manager, job_id, (COMPLETED,))
+        await asyncio.sleep(0.06)
+        job = await manager.get(job_id)
+        await manager.stop()
+        return job
+
+    assert asyncio.run(scenario()) is None
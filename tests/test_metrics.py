@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from autogen_core.models import RequestUsage
+from app.core.metrics import Metrics, request_timings
+from app.main import app
+
+
+def test_counters_histograms_and_token_usage_render():
+    m = Metrics()
+    m.inc("nexa_cache_lookups_total", result="hit")
+    m.observe("nexa_stage_seconds", 0.2, stage="extract")
+    result = SimpleNamespace(messages=[
+        SimpleNamespace(models_usage=None),
+        SimpleNamespace(models_usage=RequestUsage(prompt_tokens=120, completion_tokens=30)),
+    ])
+    with m.model_call("extractor", "prompt text") as call:
+        call.record_usage(result)
+
+    text = m.render([("nexa_cache_entries", {}, 3)], [("nexa_cache_hits_total", {}, 5)])
+    assert 'nexa_cache_lookups_total{result="hit"} 1' in text
+    assert 'nexa_stage_seconds_bucket{stage="extract",le="0.25"} 1' in text
+    assert 'nexa_stage_seconds_count{stage="extract"} 1' in text
+    assert 'nexa_model_tokens_total{agent="extractor",kind="prompt"} 120' in text
+    assert 'nexa_model_tokens_total{agent="extractor",kind="completion"} 30' in text
+    assert 'nexa_model_calls_total{agent="extractor",outcome="ok"} 1' in text
+    assert "# TYPE nexa_cache_entries gauge\nnexa_cache_entries 3" in text
+    assert "# TYPE nexa_cache_hits_total counter\nnexa_cache_hits_total 5" in text
+
+
+def test_disabled_metrics_record_nothing():
+    m = Metrics(enabled=False)
+    m.inc("a")
+    m.observe("b", 1.0)
+    with m.model_call("extractor") as call:
+        call.record_usage(None)
+    with m.timer("c"):
+        pass
+    assert m.render() == "\n"
+
+
+def test_record_stage_fills_request_timings():
+    m = Metrics()
+    timings = {}
+    token = request_timings.set(timings)
+    try:
+        m.record_stage("ingest", 12.5)
+        m.record_stage("ingest", 2.5)
+    finally:
+        request_timings.reset(token)
+    assert timings == {"ingest": 15.0}
+
+
+def test_metrics_endpoint():
+    r = TestClient(app).get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert "nexa_validation_repair_rate" in r.text
+    assert "# TYPE nexa_validations_total counter" in r.text
+
+
+def test_server_timing_header_skips_streamed_responses():
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+    from app.core.metrics import metrics
+    from app.main import server_timing_header
+
+    timed = FastAPI()
+    timed.middleware("http")(server_timing_header)
+
+    @timed.get("/json")
+    async def whole():
+        metrics.record_stage("extract", 12.0)
+        return {"ok": True}
+
+    @timed.get("/stream")
+    async def streamed():
+        async def body():
+            metrics.record_stage("extract", 12.0)  # runs after the headers were sent
+            yield "data\n"
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    client = TestClient(timed)
+    assert client.get("/json").headers["Server-Timing"] == "extract;dur=12.0"
+    assert "Server-Timing" not in client.get("/stream").headers
@@ -0,0 +1,255 @@
+import asyncio
+import time
+import pytest
+from autogen_core.models import CreateResult, UserMessage
+from app.core.metrics import metrics
+from app.services.agentic.fake_model_client import FakeChatCompletionClient, FakeModelError
+from app.services.agentic.gateway_client import GatewayChatCompletionClient
+from app.services.agentic.model_gateway import CircuitOpenError, ModelDeadlineError, ModelGateway, TokenBucket
+from app.services.shared_state import InProcessBackend, SharedRateLimiter
+
+MESSAGES = [UserMessage(content="You are an information extractor. Brief: ACME.", source="user")]
+
+
+class FakeClock:
+    """Manual clock; `sleep` advances it instead of waiting, and records every wait."""
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 3))
+        self.now += seconds
+
+
+class ScriptedClient(FakeChatCompletionClient):
+    """Raises the scripted errors (None = answer normally) in order, then answers normally."""
+    def __init__(self, script=(), **kwargs):
+        super().__init__(**kwargs)
+        self.script = list(script)
+        self.attempts = 0
+
+    async def create(self, messages, **kwargs):
+        self.attempts += 1
+        error = self.script.pop(0) if self.script else None
+        if error is not None:
+            raise error
+        return await super().create(messages, **kwargs)
+
+
+def _gateway(clock, **kwargs):
+    return ModelGateway(clock=clock, sleep=clock.sleep, seed=7, backoff_base=0.01, **kwargs)
+
+
+def test_retries_with_jitter_and_respects_retry_after():
+    clock = FakeClock()
+    inner = ScriptedClient([FakeModelError("slow down", status_code=429, retry_after=2.0), FakeModelError(status_code=503)])
+    client = GatewayChatCompletionClient(inner, _gateway(clock, max_retries=3))
+
+    result = asyncio.run(client.create(MESSAGES))
+
+    assert isinstance(result, CreateResult)
+    assert inner.attempts == 3
+    assert clock.sleeps[0] == 2.0        # Retry-After wins over the tiny backoff
+    assert 0 <= clock.sleeps[1] <= 0.02  # full jitter within base * 2**attempt
+    assert 'nexa_model_retries_total{reason="429"}' in metrics.render()
+
+
+def test_client_errors_are_not_retried():
+    clock = FakeClock()
+    inner = ScriptedClient([FakeModelError("bad request", status_code=400)])
+    with pytest.raises(FakeModelError, match="bad request"):
+        asyncio.run(GatewayChatCompletionClient(inner, _gateway(clock)).create(MESSAGES))
+    assert inner.attempts == 1 and clock.sleeps == []
+
+
+def test_circuit_opens_fails_fast_and_recovers_after_probe():
+    clock = FakeClock()
+    gateway = _gateway(clock, max_retries=0, failure_threshold=2, reset_seconds=30)
+    inner = ScriptedClient([FakeModelError(status_code=503)] * 2)
+    client = GatewayChatCompletionClient(inner, gateway)
+
+    for _ in range(2):
+        with pytest.raises(FakeModelError):
+            asyncio.run(client.create(MESSAGES))
+    with pytest.raises(CircuitOpenError) as excinfo:
+        asyncio.run(client.create(MESSAGES))
+    assert inner.attempts == 2  # rejected without reaching the upstream
+    assert excinfo.value.retry_after == 30
+
+    clock.now += 31  # half-open: one probe goes through and closes the circuit
+    asyncio.run(client.create(MESSAGES))
+    assert gateway.breaker.state == "closed" and inner.attempts == 3
+
+
+def test_token_bucket_charges_estimates_and_refills():
+    clock = FakeClock()
+    bucket = TokenBucket(600, clock=clock)  # 10 tokens per second
+    assert bucket.reserve(600) == 0.0
+    assert bucket.reserve(100) == pytest.approx(10.0)
+    clock.now += 10
+    bucket.adjust(-50)  # actual usage was 50 tokens below the estimate
+    assert bucket.reserve(50) == 0.0
+
+
+def test_rate_limits_and_429_pause_all_callers():
+    clock = FakeClock()
+    gateway = _gateway(clock, rpm_limit=2)
+    inner = ScriptedClient([FakeModelError(status_code=429, retry_after=5.0)])
+    client = GatewayChatCompletionClient(inner, gateway)
+
+    async def scenario():
+        await client.create(MESSAGES)  # 429, waits 5s, then succeeds (second request of the minute)
+        await client.create(MESSAGES)  # third request within the minute waits for the bucket
+
+    asyncio.run(scenario())
+    assert clock.sleeps[0] == 5.0
+    assert clock.sleeps[1] == pytest.approx(25.0)  # 1 request per 30s, 5s already elapsed
+
+
+def test_tpm_is_reserved_once_per_call_and_handed_back_on_failure():
+    clock = FakeClock()
+    gateway = _gateway(clock, max_retries=3, deadline=30)
+    # Frozen buckets: the levels change only through reservations, refunds and settling
+    gateway.requests = TokenBucket(60, clock=lambda: 0.0)
+    gateway.tokens = TokenBucket(60000, clock=lambda: 0.0)
+
+    inner = ScriptedClient([FakeModelError(status_code=503)] * 2)
+    result = asyncio.run(GatewayChatCompletionClient(inner, gateway).create(MESSAGES))
+    assert inner.attempts == 3
+    used = result.usage.prompt_tokens + result.usage.completion_tokens
+    assert gateway.tokens.level == 60000 - used  # one reservation for three attempts, settled
+    assert gateway.requests.level == 57          # but every attempt is a request
+
+    inner = ScriptedClient([FakeModelError("bad request", status_code=400)])
+    with pytest.raises(FakeModelError):
+        asyncio.run(GatewayChatCompletionClient(inner, gateway).create(MESSAGES))
+    assert gateway.tokens.level == 60000 - used  # the failed call's estimate came back
+
+    # No request left this minute: waiting would pass the deadline, so nothing stays reserved
+    gateway.requests = TokenBucket(1, clock=lambda: 0.0)
+    gateway.requests.level = 0
+    with pytest.raises(ModelDeadlineError):
+        asyncio.run(GatewayChatCompletionClient(ScriptedClient(), gateway).create(MESSAGES))
+    assert gateway.tokens.level == 60000 - used and gateway.requests.level == 0
+
+
+def test_deadline_rejections_do_not_free_shared_capacity():
+    clock = FakeClock()
+    backend = InProcessBackend()
+    gateway = _gateway(clock, deadline=10)
+    gateway.requests = SharedRateLimiter(backend, "rpm", 2, clock=clock)
+    inner = ScriptedClient()
+    client = GatewayChatCompletionClient(inner, gateway)
+
+    async def scenario():
+        rejected = 0
+        for _ in range(6):
+            try:
+                await client.create(MESSAGES)
+            except ModelDeadlineError:
+                rejected += 1  # the next window starts in 20s, past the 10s deadline
+        return rejected
+
+    assert asyncio.run(scenario()) == 4
+    assert inner.attempts == 2  # the limit of 2 per minute held
+    window = int(clock.now // 60)
+    assert backend.mget([f"rpm:{window}", f"rpm:{window + 1}"]) == [2, 0]  # refunds went back to the booked window
+
+    limiter = SharedRateLimiter(backend, "full", 1, clock=clock, max_windows_ahead=1)
+    assert limiter.book(1) == (0.0, ("full:16", 1))
+    wait, booking = limiter.book(1)
+    assert wait > 0 and booking is None  # nothing taken, so nothing to refund
+
+
+def test_hedge_books_its_own_request_and_refunds_it_when_cancelled():
+    class SlowFirstClient(FakeChatCompletionClient):
+        started = 0
+
+        async def create(self, messages, **kwargs):
+            self.started += 1
+            await asyncio.sleep(1.0 if self.started == 1 else 0.2)
+            return await super().create(messages, **kwargs)
+
+    gateway = ModelGateway(hedge_after=0.05, seed=1)
+    gateway.requests = TokenBucket(60, clock=lambda: 0.0)
+    gateway.tokens = TokenBucket(60000, clock=lambda: 0.0)
+    inner = SlowFirstClient()
+    result = asyncio.run(GatewayChatCompletionClient(inner, gateway).create(MESSAGES))
+    assert inner.started == 2
+    used = result.usage.prompt_tokens + result.usage.completion_tokens
+    assert gateway.requests.level == 58  # the hedge was a second request
+    # The call's estimate was settled against the real usage; the hedge's estimate was spent
+    assert gateway.tokens.level == 60000 - used - gateway.estimate_tokens(MESSAGES)
+
+    # A hedge that is still running when the first request answers hands its units back
+    inner = SlowFirstClient()
+    inner.started = 1
+    gateway.hedge_after = 0.15
+    asyncio.run(GatewayChatCompletionClient(inner, gateway).create(MESSAGES))
+    assert inner.started == 3 and gateway.requests.level == 57
+
+    # No request free right now: no hedge
+    gateway.requests.level = 1
+    inner = SlowFirstClient()
+    inner.started = 1
+    asyncio.run(GatewayChatCompletionClient(inner, gateway).create(MESSAGES))
+    assert inner.started == 2 and gateway.requests.level == 0
+
+
+def test_slow_attempts_hit_the_deadline():
+    inner = FakeChatCompletionClient(latency_ms=1000)
+    gateway = ModelGateway(attempt_timeout=0.05, deadline=0.2, max_retries=10, backoff_base=0.0, seed=1)
+    started = time.perf_counter()
+    with pytest.raises(ModelDeadlineError):
+        asyncio.run(GatewayChatCompletionClient(inner, gateway).create(MESSAGES))
+    assert time.perf_counter() - started < 0.5
+
+
+def test_hedged_request_cuts_tail_latency():
+    class SlowFirstClient(FakeChatCompletionClient):
+        def __init__(self):
+            super().__init__()
+            self.started = 0
+
+        async def create(self, messages, **kwargs):
+            self.started += 1
+            if self.started == 1:
+                await asyncio.sleep(1.0)  # stuck upstream connection
+            return await super().create(messages, **kwargs)
+
+    inner = SlowFirstClient()
+    gateway = ModelGateway(hedge_after=0.05, seed=1)
+    started = time.perf_counter()
+    result = asyncio.run(GatewayChatCompletionClient(inner, gateway).create(MESSAGES))
+    assert time.perf_counter() - started < 0.5
+    assert inner.started == 2 and "ACME Logistics" in result.content
+
+
+def test_stream_retries_before_the_first_chunk():
+    class FlakyStreamClient(FakeChatCompletionClient):
+        attempts = 0
+        kwargs = None
+
+        async def create_stream(self, messages, **kwargs):
+            self.attempts += 1
+            self.kwargs = kwargs
+            if self.attempts == 1:
+                raise FakeModelError(status_code=502)
+            async for chunk in super().create_stream(messages, **kwargs):
+                yield chunk
+
+    clock = FakeClock()
+    inner = FlakyStreamClient()
+
+    async def collect():
+        client = GatewayChatCompletionClient(inner, _gateway(clock))
+        return [c async for c in client.create_stream(MESSAGES, max_consecutive_empty_chunk_tolerance=3)]
+
+    chunks = asyncio.run(collect())
+    assert inner.attempts == 2
+    assert "".join(chunks[:-1]) == chunks[-1].content
+    assert inner.kwargs["max_consecutive_empty_chunk_tolerance"] == 3
@@ -0,0 +1,30 @@
+from app.services.agentic.prompt_encoding import encode_json, encode_text_blocks, summarize_metadata
+
+
+def test_encode_text_blocks_strips_running_headers_and_footers():
+    blocks = [
+        {"text": f"ACME RFP - Confidential\nSection {i} body   text\nPage {i} of 4", "anchor": f"page_{i}"}
+        for i in range(1, 5)
+    ]
+    encoded = encode_text_blocks(blocks)
+    assert encoded.splitlines() == [f"[page_{i}] Section {i} body text" for i in range(1, 5)]
+
+
+def test_single_line_blocks_are_never_treated_as_headers():
+    blocks = [{"text": f"Requirement {i}: regional visibility", "anchor": f"para_{i}"} for i in range(1, 6)]
+    assert len(encode_text_blocks(blocks).splitlines()) == 5
+
+
+def test_encode_text_blocks_skips_empty_blocks():
+    blocks = [{"text": "  ", "anchor": "line_1"}, {"text": "ACME\twants SAP", "anchor": "line_2"}]
+    assert encode_text_blocks(blocks) == "[line_2] ACME wants SAP"
+
+
+def test_summarize_metadata():
+    pages = {"file_type": "pdf", "pages": [{"page": i, "anchor": f"page_{i}"} for i in range(1, 13)]}
+    assert summarize_metadata(pages) == "pdf (12 pages)"
+    assert summarize_metadata({"files": [pages, {"file_type": "txt", "lines": 3}]}) == "2 files: pdf (12 pages); txt (3 lines)"
+
+
+def test_encode_json_is_compact():
+    assert encode_json({"objectives": ["Reducir costos"], "engagement_age": 0}) == '{"objectives":["Reducir costos"],"engagement_age":0}'
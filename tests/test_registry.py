@@ -0,0 +1,19 @@
+import asyncio
+from app.services.agentic.registry import AgentRegistry
+
+
+def test_registry_shares_model_client_and_http_pool():
+    registry = AgentRegistry(api_key="test-key")
+    assert registry._model_clients == {}  # nothing built until a stage needs it
+
+    extractor = registry.extractor()
+    validator = registry.validator()
+    assert extractor.model_client is validator.model_client
+    assert extractor.model_client.gateway is registry.gateway
+    assert extractor.model_client.inner._client._client is registry.http_client
+    assert registry.ingestion is registry.ingestion
+
+    asyncio.run(registry.aclose())
+    assert registry._http_client is None
+    assert registry._model_clients == {}
+    assert registry._ingestion is None
@@ -0,0 +1,58 @@
+from app.core.config import settings
+from app.services.agentic.relevance import BM25Scorer, effective_token_budget, select_relevant_blocks
+
+BOILERPLATE = (
+    "All proposals become property of the issuer. The issuer reserves the right to reject any submission. "
+    "Submissions must be delivered in sealed envelopes before the deadline stated in the cover letter."
+)
+
+
+def _rfp():
+    blocks = [{"text": "Request for Proposal issued by ACME Logistics S.A.", "anchor": "page_1"}]
+    blocks += [{"text": BOILERPLATE, "anchor": f"page_{i}"} for i in range(2, 30)]
+    blocks.append({"text": "Our objectives: integrate the WMS with SAP and reduce inventory costs.", "anchor": "page_30"})
+    blocks.append({"text": "ACME is headquartered in Madrid, Spain, with 40 regional warehouses.", "anchor": "page_31"})
+    blocks.append({"text": "A future phase may expand the platform to demand forecasting.", "anchor": "page_32"})
+    return blocks
+
+
+def test_keeps_field_relevant_blocks_within_budget_in_document_order():
+    kept, stats = select_relevant_blocks(_rfp(), token_budget=200, top_k=10, min_score=0.0, keep_leading=1)
+
+    assert kept.anchors[0] == "page_1"
+    assert {"page_30", "page_31", "page_32"} <= set(kept.anchors)
+    assert kept.anchors == sorted(kept.anchors, key=lambda a: int(a.split("_")[1]))
+    assert stats["tokens_kept"] <= 200
+    assert stats["blocks_in"] == 32 and stats["blocks_kept"] == len(kept)
+    assert stats["dropped_fraction"] > 0.8
+    assert stats["budget_limited"]
+
+
+def test_small_inputs_pass_through_unchanged():
+    blocks = _rfp()[:3]
+    kept, stats = select_relevant_blocks(blocks, token_budget=10000, top_k=50)
+    assert kept == blocks
+    assert stats["dropped_fraction"] == 0.0 and not stats["budget_limited"]
+
+
+def test_default_budget_never_undercuts_one_extraction_chunk(monkeypatch):
+    monkeypatch.setattr(settings, "relevance_token_budget", 1000)
+    monkeypatch.setattr(settings, "extract_chunk_tokens", 12000)
+    assert effective_token_budget() == 12000
+    blocks = [{"text": f"Section {i}: ACME objectives and scope details. " * 20, "anchor": f"page_{i}"} for i in range(40)]
+    kept, stats = select_relevant_blocks(blocks)
+    assert stats["tokens_in"] < 12000 and kept == blocks
+
+
+def test_exact_stems_do_not_match_longer_words():
+    scorer = BM25Scorer(["ACME Inc. signed the contract", "this includes an increase in income"])
+    assert scorer.scores(["inc$"])[1] == 0.0 and scorer.scores(["inc$"])[0] > 0
+
+
+def test_bm25_prefers_matching_and_shorter_blocks():
+    scores = BM25Scorer([
+        "integration integration of systems",
+        "integration of systems plus a lot of unrelated words about nothing in particular here",
+        "nothing relevant",
+    ]).scores(["integrat"])
+    assert scores[0] > scores[1] > scores[2] == 0.0
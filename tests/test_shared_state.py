@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+from benchmarks.resp_server import RespServer
+from app.core.config import Settings
+from app.serve import gunicorn_options
+from app.services.agentic.model_gateway import TokenBucket
+from app.services.cache import ResultCache
+from app.services.jobs import CANCELLED, JobManager
+from app.services.shared_state import InProcessBackend, RedisBackend, SharedBackendError, SharedJobStore, SharedRateLimiter
+
+
+@pytest.fixture
+def server():
+    server = RespServer(password="secret").start()
+    yield server
+    server.stop()
+
+
+def test_redis_backend_against_local_stand_in(server, monkeypatch):
+    backend = RedisBackend(server.url, prefix="nexa:")
+    assert backend.set("k", "v1")
+    assert not backend.set("k", "v2", only_if_absent=True)
+    assert backend.get("k") == "v1" and backend.get("missing") is None
+    assert backend.incr("n", 5, ttl=60) == 5 and backend.incr("n", -2) == 3
+    assert backend.delete("k") and not backend.delete("k")
+    backend.set("short", "x", ttl=0.05)
+    asyncio.run(asyncio.sleep(0.1))
+    assert backend.get("short") is None
+    assert server.store.get("nexa:n") == 3  # prefixed on the server
+
+    closed = []
+    close = RedisBackend._close
+    monkeypatch.setattr(RedisBackend, "_close", lambda self, conn: (closed.append(conn), close(self, conn)))
+    with pytest.raises(SharedBackendError, match="WRONGPASS"):
+        RedisBackend(server.url.replace("secret", "wrong")).get("k")
+    assert len(closed) == 1 and closed[0][0].fileno() == -1  # the rejected socket was closed, not leaked
+    backend.close()
+
+
+def test_workers_share_results_and_compute_each_input_once(server):
+    # Two "workers": separate caches and connections, one Redis-protocol server
+    a = ResultCache(backend=RedisBackend(server.url))
+    b = ResultCache(backend=RedisBackend(server.url))
+    computed = []
+
+    async def analyze(cache, name):
+        cached, lease, _ = await cache.get_or_lease("key", poll_seconds=0.01)
+        if cached is not None:
+            return cached
+        try:
+            computed.append(name)
+            await asyncio.sleep(0.1)  # the model calls
+            await cache.aset("key", {"client_name": "ACME"})
+            return {"client_name": "ACME"}
+        finally:
+            await cache.release_lease("key", lease)
+
+    async def scenario():
+        return await asyncio.gather(analyze(a, "a"), analyze(b, "b"))
+
+    assert asyncio.run(scenario()) == [{"client_name": "ACME"}] * 2
+    assert computed == ["a"]
+    assert b.stats()["shared_hits"] >= 1
+    assert ResultCache(backend=RedisBackend(server.url)).get("key") == {"client_name": "ACME"}
+
+
+def test_lease_release_only_deletes_its_own_lease(server):
+    backend = RedisBackend(server.url)
+    assert backend.set("lease:k", "theirs")
+    assert not backend.delete_if_equal("lease:k", "mine")  # ours expired and another worker took it
+    assert backend.get("lease:k") == "theirs"
+    assert backend.delete_if_equal("lease:k", "theirs") and backend.get("lease:k") is None
+
+
+def test_unreachable_backend_falls_back_to_local_state():
+    down = RedisBackend("redis://127.0.0.1:1/0", timeout=0.2)  # nothing listens on port 1
+    cache = ResultCache(backend=down)
+
+    async def scenario():
+        await cache.aset("key", {"client_name": "ACME"})
+        lease = await cache.acquire_lease("other")
+        await cache.release_lease("other", lease)
+        return await cache.aget("key"), await cache.aget("missing"), lease
+
+    assert asyncio.run(scenario()) == ({"client_name": "ACME"}, None, "local")
+
+    fallback = TokenBucket(60)
+    limiter = SharedRateLimiter(down, "rpm", 60, fallback=fallback)
+    assert limiter.reserve(1) == 0.0 and fallback.level == 59
+
+    async def jobs():
+        manager = JobManager(store=SharedJobStore(down))
+
+        async def job(job_id):
+            return {"ok": True}
+
+        job_id = await manager.submit(job)
+        for _ in range(100):
+            if (await manager.get(job_id))["status"] == "completed":
+                break
+            await asyncio.sleep(0.01)
+        await manager.stop()
+        return await manager.get(job_id)
+
+    assert asyncio.run(jobs())["result"] == {"ok": True}
+
+
+def test_job_cancelled_through_another_worker():
+    backend = InProcessBackend()
+    owner, other = JobManager(store=SharedJobStore(backend)), JobManager(store=SharedJobStore(backend))
+    owner.cancel_poll_seconds = 0.01
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def job(job_id):
+            started.set()
+            await asyncio.sleep(10)
+
+        job_id = await owner.submit(job)
+        await started.wait()
+        assert (await other.get(job_id))["status"] == "running"
+        await other.cancel(job_id)
+        for _ in range(100):
+            if (await other.get(job_id))["status"] == CANCELLED:
+                break
+            await asyncio.sleep(0.01)
+        await owner.stop()
+        return await other.get(job_id)
+
+    assert asyncio.run(scenario())["status"] == CANCELLED
+
+
+def test_shared_rate_limit_books_later_windows():
+    backend = InProcessBackend()
+    now = [600.0]
+    workers = [SharedRateLimiter(backend, "rpm", 2, clock=lambda: now[0]) for _ in range(2)]
+    assert workers[0].reserve(1) == 0.0
+    assert workers[1].reserve(1) == 0.0
+    assert workers[0].reserve(1) == 60.0  # third request of the minute waits for the next one
+    now[0] += 60
+    assert workers[1].reserve(1) == 0.0  # one slot left in this window
+    assert workers[0].reserve(1) == 60.0
+
+
+def test_gunicorn_options_come_from_settings():
+    options = gunicorn_options(Settings(serve_workers=4, serve_port=9000, serve_max_requests=1000))
+    assert options["bind"] == "0.0.0.0:9000" and options["workers"] == 4
+    assert options["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert options["max_requests"] == 1000 and options["preload_app"] is False
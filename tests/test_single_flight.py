@@ -0,0 +1,123 @@
+import asyncio
+import httpx
+import pytest
+from app.main import app
+from app.models.context import ClientContext
+from app.services.agentic.coordinator_agent import CoordinatorAgent
+from app.services.single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_run():
+    flights = SingleFlight()
+    calls = []
+
+    async def pipeline():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"final_json": {"client_name": "ACME"}}
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run("rfp", pipeline) for _ in range(5)), flights.run("other", pipeline))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert all(r == {"final_json": {"client_name": "ACME"}} for r in results)
+    assert flights.stats() == {"leaders": 2, "coalesced": 4, "failed": 0, "leader_cancelled": 0, "in_flight": 0}
+
+
+def test_failure_reaches_every_waiter_and_is_not_remembered():
+    flights = SingleFlight()
+    attempts = []
+
+    async def pipeline():
+        attempts.append(1)
+        await asyncio.sleep(0.02)
+        if len(attempts) == 1:
+            raise RuntimeError("model unavailable")
+        return "ok"
+
+    async def scenario():
+        first = await asyncio.gather(*(flights.run("rfp", pipeline) for _ in range(3)), return_exceptions=True)
+        return first, await flights.run("rfp", pipeline)
+
+    first, retry = asyncio.run(scenario())
+    assert [str(e) for e in first] == ["model unavailable"] * 3
+    assert retry == "ok" and len(attempts) == 2
+    assert flights.counts["failed"] == 1
+
+
+def test_cancelled_leader_hands_over_to_a_follower():
+    flights = SingleFlight()
+    started = []
+
+    def pipeline(name):
+        async def run():
+            started.append(name)
+            await asyncio.sleep(0.05)
+            return name
+        return run
+
+    async def scenario():
+        leader = asyncio.create_task(flights.run("rfp", pipeline("leader")))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(flights.run("rfp", pipeline("follower")))
+        await asyncio.sleep(0.01)
+        leader.cancel()  # e.g. the first client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "follower"
+    assert started == ["leader", "follower"]
+    assert flights.counts["leader_cancelled"] == 1
+
+
+def test_cancelled_follower_does_not_stop_the_leader():
+    flights = SingleFlight()
+
+    async def pipeline():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.create_task(flights.run("rfp", pipeline))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(flights.run("rfp", pipeline))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_identical_uploads_are_analyzed_once(monkeypatch):
+    calls = []
+
+    async def run_pipeline(self, file_path=None, file_paths=None, url=None, enrich_allowed=False, use_cache=True):
+        calls.append((enrich_allowed, use_cache))
+        await asyncio.sleep(0.1)
+        return {"final_json": ClientContext(client_name="ACME").model_dump(), "log": []}
+
+    monkeypatch.setattr(CoordinatorAgent, "run_pipeline", run_pipeline)
+    app.state.single_flight = SingleFlight()
+
+    async def post(client, enrich, bypass_cache=False):
+        files = {"files": ("rfp.txt", b"ACME Logistics RFP: integrate the WMS with SAP.", "text/plain")}
+        data = {"enrich_allowed": str(enrich).lower(), "bypass_cache": str(bypass_cache).lower()}
+        return await client.post("/context/analyze", files=files, data=data)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(post(client, False) for _ in range(4)), post(client, True), post(client, False, bypass_cache=True))
+            stats = (await client.get("/context/dedup/stats")).json()
+        return responses, stats
+
+    try:
+        responses, stats = asyncio.run(scenario())
+    finally:
+        del app.state.single_flight
+    assert all(r.status_code == 200 and r.json()["summary"]["client_name"] == "ACME" for r in responses)
+    # One run per distinct (contents, enrich_allowed, bypass_cache)
+    assert sorted(calls) == [(False, False), (False, True), (True, True)]
+    assert stats["coalesced"] == 3 and stats["leaders"] == 3
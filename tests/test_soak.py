@@ -0,0 +1,43 @@
+import asyncio
+import gc
+import tracemalloc
+from app.core.config import settings
+from app.services.agentic.registry import AgentRegistry
+
+
+def test_shared_agents_keep_memory_and_prompt_size_flat(monkeypatch):
+    monkeypatch.setattr(settings, "fake_model_latency_ms", 0.0)
+    monkeypatch.setattr(settings, "fake_model_latency_jitter_ms", 0.0)
+    monkeypatch.setattr(settings, "fake_model_tokens_per_second", 0.0)
+    registry = AgentRegistry(model_backend="fake")
+    client = registry.model_client().inner
+
+    async def run(requests, offset=0):
+        prompt_tokens = set()
+        for i in range(offset, offset + requests):
+            blocks = [{"text": f"Brief {i:06d}: ACME Logistics wants to integrate its WMS with SAP.", "anchor": "page_1"}]
+            extracted, validated = await asyncio.gather(
+                registry.extractor().extract(blocks, {"file_type": "pdf"}),
+                registry.validator().validate({"client_name": f"ACME {i:06d}", "engagement_age": "2 years"}),
+            )
+            assert validated["engagement_age"] == 24  # months
+            prompt_tokens.add(client.actual_usage().prompt_tokens)
+        return prompt_tokens
+
+    async def soak():
+        await run(200)  # warm up caches (tokenizer, pydantic models, metric label sets)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            prompt_tokens = await run(3000, offset=200)
+            gc.collect()
+            return tracemalloc.get_traced_memory()[0] - baseline, prompt_tokens
+        finally:
+            tracemalloc.stop()
+
+    growth, prompt_tokens = asyncio.run(soak())
+    assert len(prompt_tokens) == 1  # every request sends the same-sized prompt: no history carried over
+    assert client.calls == {"extractor": 3200}
+    assert growth < 256 * 1024, f"memory grew by {growth} bytes over 3000 requests"
+    assert registry.extractor() is registry.extractor()
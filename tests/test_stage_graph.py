@@ -0,0 +1,119 @@
+import asyncio
+import time
+import pytest
+from app.core.config import settings
+from app.services.agentic.coordinator_agent import CoordinatorAgent
+from app.services.agentic.extractor_agent import ExtractorAgent
+from app.services.agentic.fake_model_client import CANNED_RESPONSES, FakeChatCompletionClient
+from app.services.agentic.merge import merge_research, research_request
+from app.services.agentic.registry import AgentRegistry
+from app.services.agentic.researcher_agent import ResearcherAgent
+from app.services.agentic.stage_graph import StageGraph
+
+ROUND_TRIP = 0.3
+EXTRACTED = {**CANNED_RESPONSES["extractor"], "company_info": None, "potential_future_opportunities": []}
+
+
+def _collect(graph):
+    async def run():
+        return [name async for name, _, _ in graph.run()]
+    return asyncio.run(run())
+
+
+def test_independent_stages_overlap_and_dependents_wait():
+    async def slow(value):
+        await asyncio.sleep(0.1)
+        return value
+
+    graph = StageGraph({"extract": 1})
+    graph.add("validate", lambda r: slow(r["extract"] + 1), after=("extract",))
+    graph.add("research", lambda r: slow(r["extract"] + 2), after=("extract",))
+    graph.add("merge", lambda r: slow(r["validate"] + r["research"]), after=("validate", "research"))
+    started = time.perf_counter()
+    order = _collect(graph)
+    assert time.perf_counter() - started < 0.28  # two waves of 0.1s, not three
+    assert order[-1] == "merge" and graph.results["merge"] == 5
+
+    with pytest.raises(ValueError):
+        StageGraph().add("merge", slow, after=("missing",))
+
+
+def test_failing_stage_cancels_the_others():
+    cancelled = []
+
+    async def hang(_):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def fail(_):
+        raise RuntimeError("boom")
+
+    graph = StageGraph().add("research", hang).add("validate", fail)
+    with pytest.raises(RuntimeError, match="boom"):
+        _collect(graph)
+    assert cancelled == [True]
+
+
+def test_merge_prefers_document_values():
+    document = {**EXTRACTED, "industry": "Logistics", "company_info": None, "engagement_age": 0}
+    research = {"industry": "Transportation", "company_info": "3PL with 40 warehouses.", "engagement_age": 4,
+                "objectives": ["Something else"], "sources": {"company_info": "https://example.com/acme", "industry": "x"}}
+
+    merged, report = merge_research(document, research)
+
+    assert merged["industry"] == "Logistics"
+    assert merged["objectives"] == document["objectives"]
+    assert merged["company_info"] == "3PL with 40 warehouses."
+    assert merged["engagement_age"] == 0  # only the documents can say how long the engagement is
+    assert merged["sources"] == {"company_info": "https://example.com/acme"}
+    assert report["filled"] == ["company_info"]
+    assert report["conflicts"] == [{"field": "industry", "document": "Logistics", "research": "Transportation"}]
+    assert any("industry" in note for note in merged["notes"])
+    assert research_request({"industry": "Logistics"}) is None
+    assert "engagement_age" not in research_request({"client_name": "ACME", "engagement_age": 0})["missing"]
+
+
+class SlowValidator:
+    """Stands in for a validator that has to ask the model for a repair."""
+    async def validate(self, data):
+        await asyncio.sleep(ROUND_TRIP)
+        return {**data, "company_info": None}
+
+
+def _pipeline_seconds(tmp_path, monkeypatch, speculative):
+    monkeypatch.setattr(settings, "speculative_research_enabled", speculative)
+    monkeypatch.setattr(settings, "extract_mode", "single")
+    registry = AgentRegistry(model_backend="fake")
+    researcher_client = FakeChatCompletionClient(latency_ms=ROUND_TRIP * 1000)
+    registry._agents = {
+        "extractor": ExtractorAgent(model_client=FakeChatCompletionClient(responses={"extractor": EXTRACTED})),
+        "validator": SlowValidator(),
+        "researcher": ResearcherAgent(model_client=researcher_client),
+    }
+    path = tmp_path / "brief.txt"
+    path.write_text("ACME Logistics S.A. wants to integrate its WMS with SAP S/4HANA.")
+
+    async def run():
+        started = time.perf_counter()
+        events = [e async for e in CoordinatorAgent(registry=registry).stream_pipeline(file_path=str(path), enrich_allowed=True, use_cache=False)]
+        elapsed = time.perf_counter() - started
+        await registry.aclose()
+        return elapsed, events
+
+    elapsed, events = asyncio.run(run())
+    final = events[-1]["final_json"]
+    assert final["company_info"] == CANNED_RESPONSES["researcher"]["company_info"]
+    assert final["sources"] == {"company_info": "https://example.com/acme"}
+    assert researcher_client.calls == {"researcher": 1}
+    return elapsed, [e["stage"] for e in events if e["event"] == "stage"]
+
+
+def test_research_overlaps_validation(tmp_path, monkeypatch):
+    sequential, stages = _pipeline_seconds(tmp_path, monkeypatch, speculative=False)
+    assert stages[-2:] == ["validate", "research"]
+    speculative, stages = _pipeline_seconds(tmp_path, monkeypatch, speculative=True)
+    assert {"validate", "research"} <= set(stages)
+    assert sequential - speculative > ROUND_TRIP * 0.6
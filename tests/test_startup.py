@@ -0,0 +1,58 @@
+import asyncio
+from benchmarks.startup import import_profile
+from app.services.agentic.ingestion import IngestionExecutor
+from app.services.agentic.registry import AgentRegistry
+
+
+def test_app_import_defers_heavy_libraries():
+    # The import-time budget is checked by `python -m benchmarks.startup`, not here: wall-clock
+    # limits are too noisy for a unit test.
+    assert import_profile("app.main")["deferred_loaded"] == []
+
+
+def test_warmup_builds_what_the_first_request_would():
+    async def scenario():
+        registry = AgentRegistry(model_backend="fake")
+        registry._ingestion = IngestionExecutor(process_workers=0)
+        try:
+            report = await registry.warmup()
+            assert report["agents"] == ["extractor", "validator", "researcher"]
+            assert report["process_workers"] == 0
+            assert registry.extractor() is registry._agents["extractor"]  # built once, reused by requests
+        finally:
+            await registry.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_request_during_warmup_reuses_its_pools():
+    async def scenario():
+        registry = AgentRegistry(model_backend="fake")
+        registry._ingestion = IngestionExecutor(process_workers=0)
+        try:
+            warmup = asyncio.create_task(registry.warmup())
+            await asyncio.sleep(0)
+            # What a request arriving mid-warmup touches first
+            client = registry.ingestion.url_fetcher.http_client
+            extractor = registry.extractor()
+            await warmup
+            assert registry.ingestion.url_fetcher.http_client is client
+            assert registry.extractor() is extractor
+        finally:
+            await registry.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_warmup_without_api_key_leaves_agents_to_first_use(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    async def scenario():
+        registry = AgentRegistry(model_backend="openai")
+        registry._ingestion = IngestionExecutor(process_workers=0)
+        try:
+            assert (await registry.warmup())["agents"] == []
+        finally:
+            await registry.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,64 @@
+import asyncio
+import io
+import os
+import pytest
+from starlette.datastructures import UploadFile
+from app.services.uploads import UploadSpool, UploadTooLargeError
+
+
+def _upload(name, size):
+    return UploadFile(file=io.BytesIO(b"x" * size), filename=name)
+
+
+def test_spool_streams_in_chunks_and_cleans_up(tmp_path):
+    async def scenario():
+        async with UploadSpool(spool_dir=str(tmp_path), chunk_bytes=1024) as spool:
+            pdf = await spool.add_upload(_upload("../../RFP.PDF", 5000))
+            txt = spool.add_text("ACME busca optimizar su cadena")
+            assert os.path.getsize(pdf) == 5000
+            assert pdf.endswith(".pdf") and os.path.dirname(pdf).startswith(str(tmp_path))
+            assert open(txt, encoding="utf-8").read() == "ACME busca optimizar su cadena"
+        return pdf
+
+    pdf = asyncio.run(scenario())
+    assert not os.path.exists(os.path.dirname(pdf))
+
+
+def test_spool_enforces_limits_and_cleans_up_on_error(tmp_path):
+    async def scenario(spool, sizes):
+        async with spool:
+            for i, size in enumerate(sizes):
+                await spool.add_upload(_upload(f"f{i}.txt", size))
+
+    with pytest.raises(UploadTooLargeError, match="per file"):
+        asyncio.run(scenario(UploadSpool(spool_dir=str(tmp_path), max_file_bytes=100, chunk_bytes=10), [101]))
+    with pytest.raises(UploadTooLargeError, match="per request"):
+        asyncio.run(scenario(UploadSpool(spool_dir=str(tmp_path), max_file_bytes=100, max_request_bytes=150, chunk_bytes=10), [100, 60]))
+    assert os.listdir(tmp_path) == []
+
+
+def test_oversized_request_is_refused_before_parsing():
+    from fastapi import FastAPI, File, UploadFile as FastAPIUploadFile
+    from fastapi.testclient import TestClient
+    from app.services.uploads import RequestSizeLimitMiddleware
+
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, max_bytes=1000, path_limits={"/big": 10_000})
+    parsed = []
+
+    @app.post("/upload")
+    @app.post("/big")
+    async def upload(files: list[FastAPIUploadFile] = File(...)):
+        parsed.append(len(files))
+        return {"files": len(files)}
+
+    client = TestClient(app)
+    small = [("files", ("rfp.txt", b"x" * 100, "text/plain"))]
+    large = [("files", ("rfp.txt", b"x" * 2000, "text/plain"))]
+    assert client.post("/upload", files=small).status_code == 200
+    assert client.post("/upload", files=large).status_code == 413
+    assert client.post("/big", files=large).status_code == 200
+    # No Content-Length (chunked): counted as it arrives
+    chunked = client.post("/upload", content=(b"x" * 500 for _ in range(4)), headers={"content-type": "multipart/form-data; boundary=b"})
+    assert chunked.status_code == 413
+    assert parsed == [1, 1]
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import time
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.agentic.ingestor_agent import IngestorAgent
+from app.services.agentic.url_fetcher import HttpCacheStore, UrlFetcher, UrlFetchError
+
+PAGE = b"""<html><head><title>ACME Logistics | About</title><style>body{color:red}</style>
+<script>var tracking = "do not ingest";</script></head><body>
+<header><nav><a href="/">Home</a> <a href="/careers">Careers</a></nav></header>
+<main>
+  <h1>About ACME Logistics</h1>
+  <p>ACME Logistics   operates 40 regional warehouses
+     across Spain and Portugal.</p>
+  <ul><li><p>Third-party logistics</p></li><li>Route optimisation</li></ul>
+  <h2>Objectives</h2>
+  <p>Integrate the WMS with SAP S/4HANA.</p>
+</main>
+<footer>Copyright 2024 ACME. Cookie settings.</footer>
+</body></html>"""
+
+
+async def _public_dns(host):
+    return ["93.184.216.34"]
+
+
+def _server(requests, delay=0.0):
+    async def handler(request):
+        requests.append(request)
+        await asyncio.sleep(delay)
+        if request.url.path == "/moved":
+            return httpx.Response(302, headers={"location": "http://169.254.169.254/latest/meta-data/"})
+        if request.url.path == "/big":
+            return httpx.Response(200, content=b"x" * 5000, headers={"content-type": "text/plain"})
+        if request.url.path == "/missing":
+            return httpx.Response(404)
+        if request.url.path == "/old":
+            return httpx.Response(301, headers={"location": "https://cdn.example/about"})
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304, headers={"etag": '"v1"'})
+        return httpx.Response(200, content=PAGE, headers={"content-type": "text/html; charset=utf-8", "etag": '"v1"'})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_conditional_get_reuses_stored_body(tmp_path):
+    requests = []
+
+    async def scenario():
+        fetcher = UrlFetcher(http_client=_server(requests), cache_dir=str(tmp_path), resolver=_public_dns)
+        first = await fetcher.fetch("https://acme.example/about")
+        second = await fetcher.fetch("https://acme.example/about")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert not first["cached"] and second["cached"]
+    assert second["body"] == first["body"] == PAGE
+    assert "if-none-match" not in requests[0].headers and requests[1].headers["if-none-match"] == '"v1"'
+
+
+def test_conditional_headers_are_not_sent_to_redirect_targets(tmp_path):
+    requests = []
+
+    async def scenario():
+        fetcher = UrlFetcher(http_client=_server(requests), cache_dir=str(tmp_path), resolver=_public_dns)
+        await fetcher.fetch("https://acme.example/old")  # stored under the requested URL
+        return await fetcher.fetch("https://acme.example/old")
+
+    again = asyncio.run(scenario())
+    assert [(r.url.host, r.headers.get("if-none-match")) for r in requests[2:]] == [("acme.example", '"v1"'), ("cdn.example", None)]
+    assert not again["cached"] and again["body"] == PAGE
+
+
+def test_size_cap_status_and_scheme_errors(tmp_path):
+    async def fetch(url):
+        return await UrlFetcher(http_client=_server([]), max_bytes=1000, cache_dir=None, resolver=_public_dns).fetch(url)
+
+    with pytest.raises(UrlFetchError, match="limit is 1000"):
+        asyncio.run(fetch("https://acme.example/big"))
+    with pytest.raises(UrlFetchError, match="HTTP 404"):
+        asyncio.run(fetch("https://acme.example/missing"))
+    with pytest.raises(UrlFetchError, match="http"):
+        asyncio.run(fetch("file:///etc/passwd"))
+
+
+def test_internal_hosts_are_rejected_directly_and_after_redirects():
+    requests = []
+
+    async def fetch(url, **options):
+        resolver = options.pop("resolver", None)
+        return await UrlFetcher(http_client=_server(requests), cache_dir=None, resolver=resolver, **options).fetch(url)
+
+    for url in ("http://127.0.0.1:8000/", "http://169.254.169.254/latest/", "http://10.0.0.5/", "http://[::1]/"):
+        with pytest.raises(UrlFetchError, match="non-public"):
+            asyncio.run(fetch(url))
+    with pytest.raises(UrlFetchError, match="169.254.169.254"):
+        asyncio.run(fetch("https://acme.example/moved", resolver=_public_dns))
+    assert [r.url.path for r in requests] == ["/moved"]  # the metadata address was never requested
+
+    with pytest.raises(UrlFetchError, match="not an allowed host"):
+        asyncio.run(fetch("https://evil.example/", allowed_hosts=["acme.example"]))
+    assert asyncio.run(fetch("https://www.acme.example/about", allowed_hosts=["acme.example"]))["body"] == PAGE
+
+
+def test_fetch_many_runs_concurrently_in_order():
+    requests = []
+
+    async def scenario():
+        fetcher = UrlFetcher(http_client=_server(requests, delay=0.2), cache_dir=None, max_concurrency=4, resolver=_public_dns)
+        return await fetcher.fetch_many([f"https://acme.example/page{i}" for i in range(4)])
+
+    started = time.perf_counter()
+    results = asyncio.run(scenario())
+    assert time.perf_counter() - started < 0.6  # four 200ms fetches overlap
+    assert [r["url"] for r in results] == [f"https://acme.example/page{i}" for i in range(4)]
+
+
+def test_concurrency_limit_holds_across_separate_fetches():
+    requests = []
+
+    async def scenario():
+        fetcher = UrlFetcher(http_client=_server(requests, delay=0.2), cache_dir=None, max_concurrency=2, resolver=_public_dns)
+        # As ingest_many does it: one fetch() per URL, not fetch_many
+        return await asyncio.gather(*(fetcher.fetch(f"https://acme.example/page{i}") for i in range(4)))
+
+    started = time.perf_counter()
+    asyncio.run(scenario())
+    assert time.perf_counter() - started >= 0.4  # two rounds of two
+
+
+def test_http_cache_prunes_by_age_and_size(tmp_path):
+    store = HttpCacheStore(str(tmp_path), max_bytes=3000, max_age_seconds=3600)
+    meta = {"etag": '"v1"'}
+    store.set("https://acme.example/old", meta, b"x" * 1000)
+    stale = store._path("https://acme.example/old", ".json")
+    os.utime(stale, (time.time() - 7200, time.time() - 7200))
+    store.set("https://acme.example/a", meta, b"x" * 1000)
+    assert store.get("https://acme.example/old") is None  # unused for longer than max_age
+
+    store.set("https://acme.example/b", meta, b"x" * 1000)
+    past = time.time() - 60
+    os.utime(store._path("https://acme.example/b", ".json"), (past, past))
+    store.get("https://acme.example/a")  # a hit counts as a use
+    store.set("https://acme.example/c", meta, b"x" * 1000)  # over max_bytes: drop the least recently used
+    assert store.get("https://acme.example/b") is None
+    assert store.get("https://acme.example/a") is not None and store.get("https://acme.example/c") is not None
+
+
+def test_html_becomes_clean_section_blocks():
+    result = IngestorAgent().ingest_web({"url": "https://acme.example/about", "content_type": "text/html", "body": PAGE})
+    text = "\n".join(result["text_blocks"].texts)
+
+    assert result["text_blocks"].texts[0].startswith("About ACME Logistics\nACME Logistics operates 40 regional warehouses across Spain")
+    assert "Third-party logistics\nRoute optimisation" in text
+    for noise in ("tracking", "color:red", "Careers", "Cookie", "<p>"):
+        assert noise not in text
+    assert result["text_blocks"].anchors == ["block_1-4", "block_5-6"]
+    assert result["metadata"]["title"] == "ACME Logistics | About"
+    assert result["metadata"]["sections"] == 2
+
+
+def test_url_input_is_disabled_by_default():
+    client = TestClient(app)
+    response = client.post("/context/analyze", data={"urls": "http://169.254.169.254/latest/meta-data/"})
+    assert response.status_code == 403
@@ -0,0 +1,70 @@
+import asyncio
+import json
+from autogen_ext.models.replay import ReplayChatCompletionClient
+from app.models.context import ClientContext
+from app.services.agentic.coercion import ValidationStats, coerce_to_schema
+from app.services.agentic.validator_agent import ValidatorAgent
+
+
+def test_coerce_unwraps_value_evidence_pairs_and_fixes_types():
+    raw = {
+        "client_name": {"value": "ACME Corp", "evidence": "line_1"},
+        "industry": ["Logistics", "Retail"],
+        "engagement_age": None,
+        "objectives": "- Reduce costs\n- Integrate SAP\n- reduce costs",
+        "additional_context_questions": None,
+        "potential_future_opportunities": [{"value": "Advanced analytics", "evidence": ["line_4", "line_5"]}],
+        "evidence": {"objectives": "line_2"},
+    }
+    values, evidence = coerce_to_schema(raw, ClientContext)
+    ctx = ClientContext(**values)
+    assert ctx.client_name == "ACME Corp"
+    assert ctx.industry == "Logistics; Retail"
+    assert ctx.engagement_age == 0
+    assert ctx.objectives == ["Reduce costs", "Integrate SAP"]
+    assert ctx.additional_context_questions == []
+    assert ctx.potential_future_opportunities == ["Advanced analytics"]
+    assert evidence == {"client_name": ["line_1"], "objectives": ["line_2"], "potential_future_opportunities": ["line_4", "line_5"]}
+
+
+def test_coerce_parses_engagement_age_strings_and_wrappers():
+    values, _ = coerce_to_schema({"data": {"engagement_age": "3 years", "location": 42}}, ClientContext)
+    assert values == {"engagement_age": 36, "location": "42"}  # engagement_age is in months
+    assert coerce_to_schema({"engagement_age": "18 meses"}, ClientContext)[0] == {"engagement_age": 18}
+    assert coerce_to_schema({"engagement_age": "1,5 años"}, ClientContext)[0] == {"engagement_age": 18}
+    assert coerce_to_schema({"engagement_age": "about 7"}, ClientContext)[0] == {"engagement_age": 7}
+
+
+def test_validator_skips_model_when_local_coercion_succeeds():
+    stats = ValidationStats()
+    # An empty replay client fails if the validator ever calls the model
+    validator = ValidatorAgent(model_client=ReplayChatCompletionClient([]), stats=stats)
+    result = asyncio.run(validator.validate({"client_name": {"value": "ACME", "evidence": "page_1"}, "objectives": None}))
+    assert result["client_name"] == "ACME"
+    assert result["evidence"] == {"client_name": ["page_1"]}
+    assert stats.snapshot()["coerced"] == 1
+    assert stats.snapshot()["repair_rate"] == 0.0
+
+
+def test_validator_falls_back_to_model_repair():
+    stats = ValidationStats()
+    validator = ValidatorAgent(model_client=ReplayChatCompletionClient([json.dumps({"client_name": "ACME"})]), stats=stats)
+    result = asyncio.run(validator.validate(["not", "an", "object"]))
+    assert result == ClientContext(client_name="ACME").model_dump()  # the repair is checked against the schema too
+    assert stats.snapshot() == {"validations": 1, "valid": 0, "coerced": 0, "model_repaired": 1, "repair_failed": 0, "repair_rate": 1.0}
+
+
+def test_invalid_model_repair_is_an_error():
+    from pydantic import BaseModel
+
+    class Named(BaseModel):
+        client_name: str
+
+    stats = ValidationStats()
+    replies = [json.dumps({"industry": "Logistics"}), "[1, 2]"]
+    validator = ValidatorAgent(model_client=ReplayChatCompletionClient(replies), stats=stats)
+    result = asyncio.run(validator.validate({"industry": "Logistics"}, schema_model=Named))
+    assert result["error"].startswith("Model repair is still invalid")
+    result = asyncio.run(validator.validate({"industry": "Logistics"}, schema_model=Named))
+    assert result["error"] == "Model repair did not return a JSON object."
+    assert stats.snapshot()["repair_failed"] == 2 and stats.snapshot()["model_repaired"] == 0